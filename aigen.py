@@ -0,0 +1,54 @@
+# aigen.py
+#
+# Description: Single command-line entry point for the AIGEN toolchain.
+# Each command's module is imported only when that command runs, and the
+# modules themselves import PyYAML, the manifest cache, NumPy and Pillow
+# on first use, so 'aigen.py --help', 'aigen.py translate --help' and
+# small translations start quickly ('python benchmark.py startup' keeps
+# an eye on it).
+# Usage: python aigen.py translate IN.aigen OUT.json [options]
+#        python aigen.py reverse IN.json [OUT.aigen]
+#        python aigen.py fix-images [IMAGES...]
+#        python aigen.py inspect-manifest QUERY | --show EFFECT
+#        python aigen.py watch IN.aigen [OUT.json]
+#        python aigen.py template TEMPLATE.aigen ROWS.csv OUT_DIR
+#        python aigen.py probe FILES...
+#        python aigen.py diff LEFT.json RIGHT.json
+#
+
+import argparse
+import importlib
+import sys
+
+# command -> (module, help); the module provides add_arguments(parser) and run(args, parser).
+COMMANDS = {
+    "translate": ("aigen_to_json_translator",
+                  "Translate an AIGEN (YAML) file, or every .aigen file in a directory, into JSON blueprints."),
+    "reverse": ("json_to_aigen", "Convert exporter (or blueprint) JSON back into an AIGEN file."),
+    "fix-images": ("fix_images", "Convert images to RGBA PNG using the shared image pipeline."),
+    "inspect-manifest": ("inspect_manifest", "Search the effects manifest or show an effect's properties."),
+    "watch": ("watch_translate", "Watch AIGEN files and re-translate them on every save."),
+    "template": ("template_batch", "Render one AIGEN template for every row of a CSV/JSONL file."),
+    "probe": ("asset_probe", "Print the width/height/duration/frameRate read from media file headers."),
+    "diff": ("project_diff", "Structural diff of two project JSON files (exports or blueprints)."),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="aigen", description="AIGEN toolchain.")
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+    subparsers = {name: sub.add_parser(name, help=help, description=help)
+                  for name, (_, help) in COMMANDS.items()}
+    # Only the chosen command's module is imported (for its options); '--help' alone imports none.
+    command = argv[0] if argv else None
+    module = None
+    if command in COMMANDS:
+        module = importlib.import_module(COMMANDS[command][0])
+        module.add_arguments(subparsers[command])
+    args = parser.parse_args(argv)
+    module.run(args, subparsers[command])
+
+
+if __name__ == "__main__":
+    main()
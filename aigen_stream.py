@@ -0,0 +1,333 @@
+# aigen_stream.py
+#
+# Description: Streaming helpers for very large AIGEN files.
+# Reads the top-level sections of an AIGEN document from YAML parser events
+# (C-accelerated CSafeLoader when available) so that 'compositions' can be
+# constructed and handed out one at a time, and writes the blueprint JSON
+# incrementally: pretty-printed like json.dump(indent=2), minified, or
+# chunked (one file per composition). orjson does the encoding when it is
+# installed; the standard json module is the fallback.
+#
+
+import gzip
+import json
+import os
+import re
+import shutil
+
+import yaml
+from yaml.events import (AliasEvent, MappingEndEvent, MappingStartEvent, ScalarEvent,
+                         SequenceEndEvent, SequenceStartEvent, StreamEndEvent)
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode
+
+# Fall back to the pure-Python loader when LibYAML is not compiled in.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+STREAMED_SECTION = "compositions"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+OUTPUT_FORMATS = ("pretty", "minified", "chunked")
+CHUNK_NAME = re.compile(r"^\d{4,}\.json$")
+
+
+def encode_json(value, pretty=True):
+    """
+    JSON text for 'value', indented by 2 or minified. Uses orjson when
+    installed, and json for values orjson rejects (e.g. huge integers).
+    """
+    if orjson is not None:
+        try:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+            return orjson.dumps(value, option=option).decode("utf-8")
+        except TypeError:
+            pass
+    if pretty:
+        return json.dumps(value, indent=2)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _compose(loader, anchors):
+    """Builds one node (and its children) from parser events, resolving tags like the Composer does."""
+    event = loader.get_event()
+    if isinstance(event, AliasEvent):
+        if event.anchor not in anchors:
+            raise yaml.composer.ComposerError(None, None, f"found undefined alias {event.anchor!r}", event.start_mark)
+        return anchors[event.anchor]
+
+    if isinstance(event, ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(ScalarNode, event.value, event.implicit)
+        node = ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+    elif isinstance(event, SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(SequenceNode, None, event.implicit)
+        node = SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(SequenceEndEvent):
+            node.value.append(_compose(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+        return node
+    elif isinstance(event, MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(MappingNode, None, event.implicit)
+        node = MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(MappingEndEvent):
+            key_node = _compose(loader, anchors)
+            value_node = _compose(loader, anchors)
+            node.value.append((key_node, value_node))
+        node.end_mark = loader.get_event().end_mark
+        return node
+    else:
+        raise yaml.composer.ComposerError(None, None, f"unexpected event {event!r}", event.start_mark)
+
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+def _skip(loader, anchors):
+    """Consumes one value's events without building nodes (anchored subtrees are still composed)."""
+    event = loader.peek_event()
+    if not isinstance(event, AliasEvent) and event.anchor is not None:
+        _compose(loader, anchors)
+        return
+    event = loader.get_event()
+    if isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+        end_event = SequenceEndEvent if isinstance(event, SequenceStartEvent) else MappingEndEvent
+        while not loader.check_event(end_event):
+            _skip(loader, anchors)
+        loader.get_event()
+
+
+def _iter_top_level(path):
+    """
+    Yields (loader, key, anchors) for each top-level key of the document,
+    leaving the value's events unread. The caller must consume the value.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        loader = SafeLoader(f)
+        try:
+            loader.get_event()  # StreamStart
+            if loader.check_event(StreamEndEvent):
+                return
+            loader.get_event()  # DocumentStart
+            if not loader.check_event(MappingStartEvent):
+                raise yaml.YAMLError("AIGEN document must be a mapping at the top level.")
+            loader.get_event()
+            anchors = {}
+            while not loader.check_event(MappingEndEvent):
+                key = loader.construct_document(_compose(loader, anchors))
+                yield loader, key, anchors
+        finally:
+            loader.dispose()
+
+
+def load_header(path):
+    """Loads every top-level section except the compositions."""
+    header = {}
+    for loader, key, anchors in _iter_top_level(path):
+        if key == STREAMED_SECTION:
+            _skip(loader, anchors)  # built one at a time by iter_compositions
+        else:
+            header[key] = loader.construct_document(_compose(loader, anchors))
+    return header
+
+
+def iter_compositions(path):
+    """Yields each composition dict in document order, constructing only one at a time."""
+    for loader, key, anchors in _iter_top_level(path):
+        if key != STREAMED_SECTION:
+            # Only anchored subtrees are kept, so later aliases stay resolvable.
+            _skip(loader, anchors)
+            continue
+        if not loader.check_event(SequenceStartEvent):
+            value = loader.construct_document(_compose(loader, anchors))
+            for comp_data in value or []:
+                yield comp_data
+            continue
+        loader.get_event()
+        while not loader.check_event(SequenceEndEvent):
+            yield loader.construct_document(_compose(loader, anchors))
+        loader.get_event()
+
+
+class BlueprintWriter:
+    """
+    Writes a blueprint JSON object section by section, pretty-printed with
+    the same layout as json.dump(blueprint, f, indent=2) (byte-identical
+    without orjson), or minified.
+    """
+
+    def __init__(self, output_path, minified=False):
+        self.output_path = output_path
+        self.minified = minified
+        self.files = []  # extra files written next to the blueprint (chunked layout only)
+        self._encoder = json.JSONEncoder(indent=2)
+        self._f = None
+        self._sections = 0
+        self._items = 0
+
+    def __enter__(self):
+        self._f = open(self.output_path, 'w', encoding='utf-8')
+        self._f.write("{")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._f.write(self._newline(0) if self._sections else "")
+            self._f.write("}")
+        self._f.close()
+        return False
+
+    def _newline(self, indent):
+        return "" if self.minified else "\n" + " " * indent
+
+    def _write_encoded(self, value, indent):
+        if self.minified:
+            self._f.write(encode_json(value, pretty=False))
+            return
+        newline = self._newline(indent)
+        if orjson is None:
+            for chunk in self._encoder.iterencode(value):
+                self._f.write(chunk.replace("\n", newline))
+        else:
+            self._f.write(encode_json(value).replace("\n", newline))
+
+    def _key(self, key):
+        self._f.write(("," if self._sections else "") + self._newline(2))
+        self._f.write(json.dumps(key) + (":" if self.minified else ": "))
+        self._sections += 1
+
+    def write_section(self, key, value):
+        self._key(key)
+        self._write_encoded(value, 2)
+
+    def begin_list(self, key):
+        self._key(key)
+        self._f.write("[")
+        self._items = 0
+
+    def write_item(self, value):
+        self._f.write(("," if self._items else "") + self._newline(4))
+        self._write_encoded(value, 4)
+        self._items += 1
+
+    @staticmethod
+    def encode_item(value, minified=False):
+        """Returns a list item pre-encoded exactly as write_item would write it."""
+        if minified:
+            return encode_json(value, pretty=False)
+        return encode_json(value).replace("\n", "\n    ")
+
+    def write_encoded_item(self, text, name=None):
+        self._f.write(("," if self._items else "") + self._newline(4))
+        self._f.write(text)
+        self._items += 1
+
+    def end_list(self):
+        self._f.write((self._newline(2) if self._items else "") + "]")
+
+
+class ChunkedBlueprintWriter:
+    """
+    Writes a chunked blueprint: every composition goes to its own minified
+    file in a '<name>_comps' folder next to the blueprint, and the blueprint
+    itself lists them as {"name", "chunk"} entries (paths relative to it),
+    so the engine parses one composition at a time.
+    'final_path' is where the blueprint ends up when 'output_path' is a
+    temporary file that gets renamed.
+    """
+
+    def __init__(self, output_path, final_path=None):
+        final_path = final_path or output_path
+        base = os.path.splitext(os.path.basename(final_path))[0]
+        self.chunk_dirname = f"{base}_comps"
+        self.chunk_dir = os.path.join(os.path.dirname(os.path.abspath(final_path)), self.chunk_dirname)
+        self.files = []
+        self._blueprint = BlueprintWriter(output_path)
+
+    def __enter__(self):
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        self._blueprint.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._blueprint.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self._remove_stale_chunks()
+        return False
+
+    def _remove_stale_chunks(self):
+        """Removes chunk files (and their sidecars) left over from a build with more compositions."""
+        written = {os.path.basename(path) for path in self.files}
+        for entry in os.listdir(self.chunk_dir):
+            chunk = entry[:-3] if entry.endswith(".gz") else entry
+            if CHUNK_NAME.match(chunk) and chunk not in written:
+                os.remove(os.path.join(self.chunk_dir, entry))
+
+    def write_section(self, key, value):
+        self._blueprint.write_section(key, value)
+
+    def begin_list(self, key):
+        self._blueprint.begin_list(key)
+
+    def write_item(self, value):
+        self.write_encoded_item(encode_json(value, pretty=False), value.get("name") if isinstance(value, dict) else None)
+
+    def write_encoded_item(self, text, name=None):
+        chunk = f"{len(self.files) + 1:04d}.json"
+        path = os.path.join(self.chunk_dir, chunk)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.files.append(path)
+        self._blueprint.write_item({"name": name, "chunk": f"{self.chunk_dirname}/{chunk}"})
+
+    def end_list(self):
+        self._blueprint.end_list()
+
+
+def blueprint_writer(output_path, output_format="pretty", final_path=None):
+    """The writer for an OUTPUT_FORMATS layout."""
+    if output_format == "chunked":
+        return ChunkedBlueprintWriter(output_path, final_path)
+    return BlueprintWriter(output_path, minified=output_format == "minified")
+
+
+def encode_item(value, output_format="pretty"):
+    """A composition pre-encoded for the write_encoded_item of an OUTPUT_FORMATS layout."""
+    return BlueprintWriter.encode_item(value, minified=output_format != "pretty")
+
+
+def write_blueprint(output_path, blueprint, output_format="pretty"):
+    """Writes a whole blueprint dict in one of OUTPUT_FORMATS. Returns the writer (for its .files)."""
+    with blueprint_writer(output_path, output_format) as writer:
+        for key, value in blueprint.items():
+            if key == STREAMED_SECTION and isinstance(value, list):
+                writer.begin_list(key)
+                for item in value:
+                    writer.write_item(item)
+                writer.end_list()
+            else:
+                writer.write_section(key, value)
+    return writer
+
+
+def write_gzip_sidecars(paths):
+    """Writes '<path>.gz' next to every path (for archival); the originals stay as they are."""
+    for path in paths:
+        tmp_path = f"{path}.gz.{os.getpid()}.tmp"
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(filename=os.path.basename(path), mode='wb', compresslevel=6, fileobj=raw,
+                               mtime=0) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp_path, f"{path}.gz")
@@ -1,50 +1,188 @@
 # aigen_to_json_translator.py
 #
 # Description: Advanced AIGEN v3.1 Translator.
-# NOW OFFLINE: Reads 'effects_manifest.json' locally.
-# FEATURES: Auto-fixes PNG images using Pillow.
+# NOW OFFLINE: Reads 'effects_manifest.json' locally (via a compiled cache).
+# FEATURES: Auto-fixes PNG images using Pillow (content-addressed, in parallel).
 #
 
-import yaml
+import argparse
 import json
 import sys
 import re
 import os
-from collections.abc import MutableMapping
-from PIL import Image  # Added for image fixing
+from component_engine import ComponentEngine
+from project_model import Composition, Effect, Layer
+import image_pipeline
+import image_proxies
+import translation_metrics
+# PyYAML (aigen_stream), the manifest cache, NumPy stages and Pillow are imported when first used,
+# so '--help' and small translations start quickly.
 
 # નામ ફિક્સ કર્યું છે - આ ફાઈલ સ્ક્રિપ્ટની બાજુમાં જ હોવી જોઈએ
 MANIFEST_FILENAME = "effects_manifest.json"
 
-def deep_merge(d1, d2):
-    """Recursively merges dictionary d2 into d1."""
-    for k, v in d2.items():
-        if k in d1 and isinstance(d1[k], dict) and isinstance(v, MutableMapping):
-            deep_merge(d1[k], v)
-        else:
-            d1[k] = v
-    return d1
-
 def get_from_dict(data_dict, map_list):
     for k in map_list:
         data_dict = data_dict[k]
     return data_dict
 
-def resolve_globals(data_node, globals_map):
-    if isinstance(data_node, dict):
-        return {k: resolve_globals(v, globals_map) for k, v in data_node.items()}
-    elif isinstance(data_node, list):
-        return [resolve_globals(item, globals_map) for item in data_node]
-    elif isinstance(data_node, str):
-        match = re.match(r'^\$globals\.([\w\.]+)', data_node)
+_GLOBAL_REF = re.compile(r'^\$globals\.([\w\.]+)')
+_GLOBAL_INTERPOLATION = re.compile(r'\$\{globals\.([\w\.]+)\}')
+
+class GlobalsResolver:
+    """
+    Resolves '$globals.a.b' references and '${globals.a.b}' interpolations.
+    Each path is resolved once and memoized. Globals may reference other
+    globals (cycles are reported and left unresolved). Subtrees without
+    references are returned as the very same objects, so only the nodes on
+    the path to a reference are rebuilt.
+    """
+
+    def __init__(self, globals_map):
+        self.globals_map = globals_map or {}
+        self.used = set()
+        self._cache = {}
+        self._resolving = []
+
+    def lookup(self, path):
+        """Returns (found, value) for a dotted globals path."""
+        self.used.add(path)
+        if path in self._cache:
+            return True, self._cache[path]
+        if path in self._resolving:
+            chain = " -> ".join(self._resolving[self._resolving.index(path):] + [path])
+            print(f"Warning: Circular global reference: {chain}", file=sys.stderr)
+            return False, None
+        try:
+            raw = get_from_dict(self.globals_map, path.split('.'))
+        except (KeyError, TypeError):
+            return False, None
+        self._resolving.append(path)
+        try:
+            value = self.resolve(raw)
+        finally:
+            self._resolving.pop()
+        self._cache[path] = value
+        return True, value
+
+    def _resolve_string(self, text):
+        if '$' not in text:
+            return text
+        match = _GLOBAL_REF.match(text)
         if match:
-            try:
-                keys = match.group(1).split('.')
-                return get_from_dict(globals_map, keys)
-            except (KeyError, TypeError):
-                print(f"Warning: Global variable '{data_node}' not found.", file=sys.stderr)
-                return data_node
-    return data_node
+            found, value = self.lookup(match.group(1))
+            if found:
+                return value
+            if not self._resolving:
+                print(f"Warning: Global variable '{text}' not found.", file=sys.stderr)
+            return text
+        if '${globals.' not in text:
+            return text
+
+        def substitute(m):
+            found, value = self.lookup(m.group(1))
+            if not found:
+                print(f"Warning: Global variable '{m.group(0)}' not found.", file=sys.stderr)
+                return m.group(0)
+            return value if isinstance(value, str) else json.dumps(value)
+        return _GLOBAL_INTERPOLATION.sub(substitute, text)
+
+    def resolve(self, data_node):
+        # Scalars are checked inline; only containers and '$'-strings cost a call.
+        node_type = type(data_node)
+        if node_type is dict:
+            rebuilt = None
+            for k, v in data_node.items():
+                value_type = type(v)
+                if value_type is dict or value_type is list:
+                    resolved = self.resolve(v)
+                elif value_type is str and '$' in v:
+                    resolved = self._resolve_string(v)
+                else:
+                    continue
+                if resolved is not v:
+                    if rebuilt is None:
+                        rebuilt = dict(data_node)
+                    rebuilt[k] = resolved
+            return data_node if rebuilt is None else rebuilt
+        if node_type is list:
+            rebuilt = None
+            for i, item in enumerate(data_node):
+                item_type = type(item)
+                if item_type is dict or item_type is list:
+                    resolved = self.resolve(item)
+                elif item_type is str and '$' in item:
+                    resolved = self._resolve_string(item)
+                else:
+                    continue
+                if resolved is not item:
+                    if rebuilt is None:
+                        rebuilt = list(data_node)
+                    rebuilt[i] = resolved
+            return data_node if rebuilt is None else rebuilt
+        if isinstance(data_node, str):
+            return self._resolve_string(data_node)
+        return data_node
+
+def resolve_globals(data_node, globals_map):
+    return GlobalsResolver(globals_map).resolve(data_node)
+
+def _file_contains(path, markers):
+    """Cheap byte scan for any of 'markers'."""
+    overlap = max(len(marker) for marker in markers) - 1
+    tail = b""
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            window = tail + chunk
+            if any(marker in window for marker in markers):
+                return True
+            tail = window[-overlap:] if overlap else b""
+    return False
+
+def has_global_references(path):
+    """Cheap byte scan: False means the resolve pass can be skipped entirely."""
+    return _file_contains(path, (b"$globals.", b"${globals."))
+
+def has_audio_specs(path):
+    """Cheap byte scan: False means no property asks for audio baking."""
+    return _file_contains(path, (b"audio:", b'"audio":'))
+
+def has_keyframe_runs(path):
+    """Cheap byte scan: False means no compact keyframe run needs expanding."""
+    return _file_contains(path, (b"values",))
+
+def expand_keyframe_runs(node):
+    """
+    Expands compact 'keyframes: {start, step, values}' runs (written by
+    json_to_aigen.py) into regular keyframe lists. Copy-on-write: untouched
+    subtrees are returned as they are.
+    """
+    if isinstance(node, dict):
+        rebuilt = None
+        for k, v in node.items():
+            if k == "keyframes" and isinstance(v, dict) and "values" in v:
+                start, step = v.get("start", 0), v.get("step", 0)
+                new = [{"time": start + i * step, "value": value} for i, value in enumerate(v["values"] or [])]
+            elif isinstance(v, (dict, list)):
+                new = expand_keyframe_runs(v)
+            else:
+                continue
+            if new is not v:
+                if rebuilt is None:
+                    rebuilt = dict(node)
+                rebuilt[k] = new
+        return node if rebuilt is None else rebuilt
+    if isinstance(node, list):
+        rebuilt = None
+        for i, v in enumerate(node):
+            if isinstance(v, (dict, list)):
+                new = expand_keyframe_runs(v)
+                if new is not v:
+                    if rebuilt is None:
+                        rebuilt = list(node)
+                    rebuilt[i] = new
+        return node if rebuilt is None else rebuilt
+    return node
 
 def load_local_manifest(filename):
     """Loads the effects manifest from a local file."""
@@ -52,288 +190,423 @@ def load_local_manifest(filename):
         print(f"CRITICAL ERROR: '{filename}' not found in the script directory.", file=sys.stderr)
         print("Please create this JSON file manually.", file=sys.stderr)
         return None
+    from manifest_cache import load_manifest
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            print(f"Loaded local effects manifest: {filename}")
-            return json.load(f)
+        manifest = load_manifest(filename)
+        print(f"Loaded local effects manifest: {filename}")
+        return manifest
     except Exception as e:
         print(f"Error reading manifest file: {e}", file=sys.stderr)
         return None
 
-def translate_effect(effect_data, manifest):
-    user_effect_name = effect_data.get('type')
-    # Fallback: If effect not in manifest, assume the user gave the exact MatchName
+def translate_effect(effect, index, unknown=None):
+    """
+    Translates one AIGEN-form Effect (project_model) into a blueprint-form
+    Effect using the flattened ManifestIndex. The effect is looked up by
+    'type' (display name) first, then by 'matchName'. Properties that cannot
+    be mapped are appended to 'unknown' instead of being silently dropped.
+    """
+    user_effect_name = effect.type or effect.match_name
     if not user_effect_name: return None
-    
-    if user_effect_name not in manifest:
+    name = effect.name if effect.has('name') else user_effect_name
+
+    effect_name = index.resolve_effect(effect.type) or index.resolve_effect(effect.match_name)
+    if effect_name is None:
         # SMART LOGIC: If not found in manifest, use the name as is.
         # This allows advanced users to use MatchNames directly in YAML.
-        return {
-            "matchName": user_effect_name,
-            "name": effect_data.get('name', user_effect_name),
-            "properties": [] # Cannot map properties without manifest, assumes defaults or explicit matchnames
-        }
-
-    effect_info = manifest[user_effect_name]
-    translated_effect = {
-        "matchName": effect_info["matchName"],
-        "name": effect_data.get('name', user_effect_name),
-        "properties": []
-    }
-    if 'properties' in effect_data:
-        for user_prop_name, prop_value in effect_data['properties'].items():
-            prop_found = False
-            for group in effect_info.get("groups", []):
-                if user_prop_name in group.get("properties", {}):
-                    prop_details = group["properties"][user_prop_name]
-                    translated_effect["properties"].append({
-                        "index": prop_details["index"],
-                        "value_data": prop_value
-                    })
-                    prop_found = True
-                    break
-    return translated_effect
-
-def fix_image(image_path):
+        if unknown is not None:
+            unknown.append({"effect": user_effect_name, "property": None})
+        # Cannot map properties without manifest, assumes defaults or explicit matchnames
+        return Effect.blueprint(effect.match_name if effect.has('matchName') else user_effect_name, name, [])
+
+    properties = index.properties(effect_name)
+    translated_properties = []
+    for user_prop_name, prop in (effect.properties or {}).items():
+        prop_info = properties.get(user_prop_name)
+        if prop_info is None:
+            if unknown is not None:
+                unknown.append({"effect": effect_name, "property": user_prop_name})
+            continue
+        translated_properties.append((prop_info.index, prop))
+    return Effect.blueprint(index.manifest[effect_name]["matchName"], name, translated_properties)
+
+def translate_composition_effects(comp, index):
+    """
+    Batch-translates the effects of every layer of a Composition against the index.
+    Returns a list of unknown effect/property reports for this composition.
     """
-    Reads an image, converts it to RGBA, and saves it as a new PNG 
-    in a 'changed' directory to ensure compatibility.
+    unknown = []
+    for layer in comp.layers:
+        if not layer.has('effects'):
+            continue
+        layer_unknown = []
+        translated_effects = [translate_effect(e, index, layer_unknown) for e in layer.effects]
+        layer.effects = [te for te in translated_effects if te is not None]
+        for entry in layer_unknown:
+            entry["composition"] = comp.name
+            entry["layer"] = layer.name
+        unknown.extend(layer_unknown)
+    return unknown
+
+def report_unknown_effects(unknown, manifest_path=MANIFEST_FILENAME):
     """
+    Prints every unknown effect and property of a file in one batch, each
+    once (with the first place it was used), plus "did you mean" suggestions
+    from the manifest search index.
+    """
+    if not unknown:
+        return
+    places = {}
+    for entry in unknown:
+        places.setdefault((entry["effect"], entry["property"]), []).append(
+            f"layer '{entry['layer']}' in '{entry['composition']}'")
     try:
-        # Create 'changed' directory if it doesn't exist
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        changed_dir = os.path.join(script_dir, "changed")
-        if not os.path.exists(changed_dir):
-            os.makedirs(changed_dir)
-
-        # Open and process image
-        with Image.open(image_path) as img:
-            # Convert to RGBA to ensure transparency is handled correctly and format is standard
-            img = img.convert("RGBA")
-            
-            # Generate new filename
-            filename = os.path.basename(image_path)
-            name, ext = os.path.splitext(filename)
-            new_filename = f"{name}_fixed.png"
-            new_path = os.path.join(changed_dir, new_filename)
-            
-            # Save the fixed image
-            img.save(new_path, "PNG")
-            print(f"  [Auto-Fix] Image saved to: {new_path}")
-            
-            # Return the absolute path using backslashes for Windows/AE compatibility
-            return os.path.abspath(new_path).replace(os.sep, '\\')
-            
-    except Exception as e:
-        print(f"  [Auto-Fix Error] Could not process {image_path}: {e}")
-        return image_path # Return original if failure
+        import manifest_search
+        search = manifest_search.load_search_index(manifest_path)
+    except OSError as e:
+        print(f"Warning: No suggestions available, cannot read the manifest ({e}).", file=sys.stderr)
+        search = None
+    print(f"Warning: Unknown effects/properties in this file ({len(places)}):", file=sys.stderr)
+    for (effect, prop), where in places.items():
+        more = f" and {len(where) - 1} more" if len(where) > 1 else ""
+        if prop is None:
+            message = f"  Effect '{effect}' not in manifest ({where[0]}{more}); using it as a matchName."
+            suggestions = search.suggest_effect(effect) if search else []
+        else:
+            message = f"  Unknown property '{prop}' on effect '{effect}' ({where[0]}{more}); skipped."
+            suggestions = search.suggest_property(effect, prop) if search else []
+        if suggestions:
+            message += " Did you mean " + " or ".join(f"'{s}'" for s in suggestions) + "?"
+        print(message, file=sys.stderr)
 
-def main(input_path, output_path):
-    print("--- Starting AIGEN v3.1 Translation (Offline Mode) ---")
-    
-    try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            aigen_data = yaml.safe_load(f)
-    except Exception as e:
-        print(f"Error loading AIGEN file: {e}", file=sys.stderr)
-        sys.exit(1)
+def fix_image(image_path):
+    """
+    Returns an AE-compatible RGBA PNG path for 'image_path'.
+    See image_pipeline.fix_images for the batch version used by main().
+    """
+    return image_pipeline.fix_image(image_path)
 
-    # Resolve Globals
-    globals_map = aigen_data.get("globals", {})
-    if globals_map:
-        aigen_data = resolve_globals(aigen_data, globals_map)
-
-    # Merge Components
-    components_map = {comp['id']: comp for comp in aigen_data.get("components", [])}
-    if components_map:
-        for comp_data in aigen_data.get("compositions", []):
-            for layer_data in comp_data.get("layers", []):
-                if "useComponents" in layer_data:
-                    merged_properties = {}
-                    for comp_id in layer_data["useComponents"]:
-                        if comp_id in components_map:
-                            comp_props = json.loads(json.dumps(components_map[comp_id].get("properties", {})))
-                            deep_merge(merged_properties, comp_props)
-                    layer_props = layer_data.get("properties", {})
-                    deep_merge(merged_properties, layer_props)
-                    layer_data["properties"] = merged_properties
-                    del layer_data["useComponents"]
-
-    # Load Manifest Locally
+def load_effects_index():
+    from manifest_cache import ManifestIndex
     effects_manifest = load_local_manifest(MANIFEST_FILENAME)
     if not effects_manifest:
         # If manifest fails, we create an empty one so script doesn't crash,
         # but effects translation relies on direct matchnames.
         effects_manifest = {}
-
-    # Build Blueprint
-# aigen_to_json_translator.py
-#
-# Description: Advanced AIGEN v3.1 Translator.
-# NOW OFFLINE: Reads 'effects_manifest.json' locally.
-# FEATURES: Auto-fixes PNG images using Pillow.
-#
-
-import yaml
-import json
-import sys
-import re
-import os
-from collections.abc import MutableMapping
-from PIL import Image  # Added for image fixing
-
-# નામ ફિક્સ કર્યું છે - આ ફાઈલ સ્ક્રિપ્ટની બાજુમાં જ હોવી જોઈએ
-MANIFEST_FILENAME = "effects_manifest.json"
-
-def deep_merge(d1, d2):
-    """Recursively merges dictionary d2 into d1."""
-    for k, v in d2.items():
-        if k in d1 and isinstance(d1[k], dict) and isinstance(v, MutableMapping):
-            deep_merge(d1[k], v)
-        else:
-            d1[k] = v
-    return d1
-
-def get_from_dict(data_dict, map_list):
-    for k in map_list:
-        data_dict = data_dict[k]
-    return data_dict
-
-def resolve_globals(data_node, globals_map):
-    if isinstance(data_node, dict):
-        return {k: resolve_globals(v, globals_map) for k, v in data_node.items()}
-    elif isinstance(data_node, list):
-        return [resolve_globals(item, globals_map) for item in data_node]
-    elif isinstance(data_node, str):
-        match = re.match(r'^\$globals\.([\w\.]+)', data_node)
-        if match:
-            try:
-                keys = match.group(1).split('.')
-                return get_from_dict(globals_map, keys)
-            except (KeyError, TypeError):
-                print(f"Warning: Global variable '{data_node}' not found.", file=sys.stderr)
-                return data_node
-    return data_node
-
-def load_local_manifest(filename):
-    """Loads the effects manifest from a local file."""
-    if not os.path.exists(filename):
-        print(f"CRITICAL ERROR: '{filename}' not found in the script directory.", file=sys.stderr)
-        print("Please create this JSON file manually.", file=sys.stderr)
+    return ManifestIndex(effects_manifest)
+
+class TranslationError(Exception):
+    """Raised for unreadable input or unwritable output; main() turns it into exit code 1."""
+
+class TranslationOptions:
+    def __init__(self, stream=False, image_jobs=None, incremental=False, simplify=None, columnar=False,
+                 bake_expressions=False, profile=False, profile_memory=True, proxies=False, dedup=False,
+                 output_format="pretty", gzip=False, probe_assets=False, clamp_out_points=False):
+        self.stream = stream
+        self.incremental = incremental  # reuse cached translations of unchanged compositions
+        self.image_jobs = image_jobs  # None = one process per CPU; batch workers pass 1
+        self.simplify = simplify  # keyframe reduction tolerance (None = keep every keyframe)
+        self.columnar = columnar  # emit resolved times/values arrays instead of keyframe lists
+        self.bake_expressions = bake_expressions  # replace supported expressions with keyframes
+        self.proxies = proxies  # downscaled proxies for images shown well below their size
+        self.dedup = dedup  # wrap structurally identical compositions around the first one
+        self.probe_assets = probe_assets  # fill in asset width/height/duration/frameRate from file headers
+        self.clamp_out_points = clamp_out_points  # cut layer out points at the end of their media (probes too)
+        self.output_format = output_format  # one of aigen_stream.OUTPUT_FORMATS
+        self.gzip = gzip  # also write '<file>.gz' sidecars of the output
+        self.profile = profile  # collect per-stage timings and counts into summary["metrics"]
+        self.profile_memory = profile_memory  # with profile: trace peak memory too (slows Python-heavy stages)
+
+def keyframe_reducer(options):
+    """Returns a KeyframeReducer for options.simplify, or None when reduction is off."""
+    if options.simplify is None:
         return None
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            print(f"Loaded local effects manifest: {filename}")
-            return json.load(f)
-    except Exception as e:
-        print(f"Error reading manifest file: {e}", file=sys.stderr)
+        from keyframe_reduction import KeyframeReducer
+    except ImportError as e:
+        raise TranslationError(f"Keyframe reduction (--simplify) needs NumPy: {e}")
+    return KeyframeReducer(options.simplify)
+
+def keyframe_columnizer(options):
+    """Returns a KeyframeColumnizer when options.columnar is set, else None."""
+    if not options.columnar:
         return None
+    try:
+        from keyframe_columns import KeyframeColumnizer
+    except ImportError as e:
+        raise TranslationError(f"Columnar keyframes (--columnar) need NumPy: {e}")
+    return KeyframeColumnizer()
+
+def expression_baker(options):
+    """Returns an ExpressionBaker when options.bake_expressions is set, else None."""
+    if not options.bake_expressions:
+        return None
+    try:
+        from expression_baking import ExpressionBaker
+    except ImportError as e:
+        raise TranslationError(f"Expression baking (--bake-expressions) needs NumPy: {e}")
+    return ExpressionBaker()
+
+def asset_source_paths(assets, input_path):
+    """Maps asset id -> source path, resolved like process_assets (before images are redirected)."""
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    return {asset.get("id"): os.path.normpath(os.path.join(base_dir, asset.get("path", "")))
+            for asset in assets or [] if isinstance(asset, dict)}
+
+def audio_baker(asset_paths, input_path):
+    """Returns an AudioBaker when the file has 'audio' specs, else None."""
+    if not has_audio_specs(input_path):
+        return None
+    try:
+        from audio_baking import AudioBaker
+    except ImportError as e:
+        print(f"Warning: Audio baking needs NumPy ({e}); 'audio' specs are left unbaked.", file=sys.stderr)
+        return None
+    return AudioBaker(asset_paths)
 
-def translate_effect(effect_data, manifest):
-    user_effect_name = effect_data.get('type')
-    # Fallback: If effect not in manifest, assume the user gave the exact MatchName
-    if not user_effect_name: return None
-    
-    if user_effect_name not in manifest:
-        # SMART LOGIC: If not found in manifest, use the name as is.
-        # This allows advanced users to use MatchNames directly in YAML.
-        return {
-            "matchName": user_effect_name,
-            "name": effect_data.get('name', user_effect_name),
-            "properties": [] # Cannot map properties without manifest, assumes defaults or explicit matchnames
-        }
-
-    effect_info = manifest[user_effect_name]
-    translated_effect = {
-        "matchName": effect_info["matchName"],
-        "name": effect_data.get('name', user_effect_name),
-        "properties": []
-    }
-    if 'properties' in effect_data:
-        for user_prop_name, prop_value in effect_data['properties'].items():
-            prop_found = False
-            for group in effect_info.get("groups", []):
-                if user_prop_name in group.get("properties", {}):
-                    prop_details = group["properties"][user_prop_name]
-                    translated_effect["properties"].append({
-                        "index": prop_details["index"],
-                        "value_data": prop_value
-                    })
-                    prop_found = True
-                    break
-    return translated_effect
+def proxy_planner(options, assets):
+    """Returns a ProxyPlanner when options.proxies is set and there are image assets, else None."""
+    if not options.proxies:
+        return None
+    planner = image_proxies.ProxyPlanner(assets)
+    return planner if planner.images else None
 
-def fix_image(image_path):
+def asset_prober(options, asset_paths):
+    """Returns an AssetProber (already probing in the background) when probing or clamping is on, else None."""
+    if not (options.probe_assets or options.clamp_out_points):
+        return None
+    from asset_probe import AssetProber
+    return AssetProber(asset_paths, clamp=options.clamp_out_points, jobs=options.image_jobs)
+
+def finish_output(output_path, writer, options):
+    """Writes the gzip sidecars of a finished blueprint (and its chunk files) when options.gzip is set."""
+    if options.gzip:
+        import aigen_stream
+        aigen_stream.write_gzip_sidecars([output_path] + writer.files)
+
+def composition_deduplicator(options, input_path):
+    """Returns a CompositionDeduplicator when options.dedup is set, else None."""
+    if not options.dedup:
+        return None
+    from composition_dedup import CompositionDeduplicator, expression_references
+    return CompositionDeduplicator(expression_references(input_path))
+
+def finish_summary(summary, reducer, baker=None, columnizer=None, expressions=None, dedup=None, prober=None):
+    """Adds the probing, dedup, baking, keyframe reduction and columnar totals to a translation summary and prints them."""
+    if prober is not None:
+        prober.report()
+        summary["assetFieldsFilled"] = prober.filled
+        summary["layersClamped"] = prober.clamped
+    if dedup is not None:
+        dedup.report()
+        summary["compositionsDeduplicated"] = dedup.duplicates
+    if baker is not None:
+        baker.report()
+        summary["audioKeyframes"] = baker.keyframes
+    if expressions is not None:
+        expressions.report()
+        summary["expressionsBaked"] = expressions.baked
+    if reducer is not None:
+        reducer.report()
+        summary["keyframesRemoved"] = reducer.removed
+        summary["keyframeMaxError"] = reducer.max_error
+    if columnizer is not None:
+        columnizer.report()
+        summary["columnarKeyframes"] = columnizer.keyframes
+    return summary
+
+def process_assets(assets, input_path, image_jobs=None, stats=None):
+    """Resolves asset paths relative to the AIGEN file and auto-fixes images ('stats' gets the image counts)."""
+    print("Processing Assets...")
+    # Get base directory of the input AIGEN file
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+
+    processed = []
+    image_assets = []
+    for asset in assets or []:
+        original_path = asset.get("path", "")
+
+        # Resolve relative path
+        if not os.path.isabs(original_path):
+            full_path = os.path.join(base_dir, original_path)
+        else:
+            full_path = original_path
+
+        # Check if it's an image that might need fixing
+        if image_pipeline.is_image_path(original_path):
+            print(f"  Checking image: {full_path}")
+            image_assets.append((asset, full_path))
+
+        processed.append(asset)
+
+    # Fix all images in one batch (hash-cached, parallel)
+    if image_assets:
+        fixed_paths = image_pipeline.fix_images([full_path for _, full_path in image_assets], jobs=image_jobs,
+                                                stats=stats)
+        for asset, full_path in image_assets:
+            asset["path"] = fixed_paths[full_path]
+    return processed
+
+def translate_composition(comp_data, manifest_index, expand_runs=True, reducer=None, baker=None, columnizer=None,
+                          expressions=None, prober=None):
+    """Returns (translated composition, unknown effect reports)."""
+    if expand_runs:
+        comp_data = expand_keyframe_runs(comp_data)
+    if prober is not None:
+        comp_data = prober.clamp_composition(comp_data)
+    if baker is not None:
+        comp_data = baker.bake(comp_data)
+    if expressions is not None:
+        comp_data = expressions.bake(comp_data)
+    if reducer is not None:
+        comp_data = reducer.reduce(comp_data)
+    if columnizer is not None:
+        comp_data = columnizer.columnize(comp_data)
+    # The model is built from (and emits) new objects, so layers that resolved globals share between
+    # compositions are never translated in place.
+    comp = Composition.parse(comp_data)
+    unknown = []
+    if comp.has('layers'):
+        comp.layers = [layer for layer in comp.layers if isinstance(layer, Layer)]
+        unknown = translate_composition_effects(comp, manifest_index)
+    return comp.to_dict(), unknown
+
+def _translate_streaming(input_path, output_path, manifest_index, options, metrics=translation_metrics.DISABLED):
     """
-    Reads an image, converts it to RGBA, and saves it as a new PNG 
-    in a 'changed' directory to ensure compatibility.
+    Streaming translation: the AIGEN file is read one composition at a time
+    (CSafeLoader events) and each translated composition is written to the
+    output JSON immediately, so peak memory tracks the largest composition.
     """
+    import yaml
+    import aigen_stream
     try:
-        # Create 'changed' directory if it doesn't exist
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        changed_dir = os.path.join(script_dir, "changed")
-        if not os.path.exists(changed_dir):
-            os.makedirs(changed_dir)
-
-        # Open and process image
-        with Image.open(image_path) as img:
-            # Convert to RGBA to ensure transparency is handled correctly and format is standard
-            img = img.convert("RGBA")
-            
-            # Generate new filename
-            filename = os.path.basename(image_path)
-            name, ext = os.path.splitext(filename)
-            new_filename = f"{name}_fixed.png"
-            new_path = os.path.join(changed_dir, new_filename)
-            
-            # Save the fixed image
-            img.save(new_path, "PNG")
-            print(f"  [Auto-Fix] Image saved to: {new_path}")
-            
-            # Return the absolute path using backslashes for Windows/AE compatibility
-            return os.path.abspath(new_path).replace(os.sep, '\\')
-            
+        with metrics.stage("parse"):
+            header = aigen_stream.load_header(input_path)
     except Exception as e:
-        print(f"  [Auto-Fix Error] Could not process {image_path}: {e}")
-        return image_path # Return original if failure
+        raise TranslationError(f"Error loading AIGEN file: {e}")
 
-def main(input_path, output_path):
-    print("--- Starting AIGEN v3.1 Translation (Offline Mode) ---")
-    
+    # Resolve Globals (sections now, compositions as they stream in)
+    globals_map = header.get("globals", {})
+    if globals_map and not has_global_references(input_path):
+        globals_map = {}
+    resolver = GlobalsResolver(globals_map)
+    if globals_map:
+        with metrics.stage("globals"):
+            header = resolver.resolve(header)
+    with metrics.stage("components"):
+        components = ComponentEngine(header.get("components", []))
+    expand_runs = has_keyframe_runs(input_path)
+    reducer = keyframe_reducer(options)
+    columnizer = keyframe_columnizer(options)
+    expressions = expression_baker(options)
+    dedup = composition_deduplicator(options, input_path)
+
+    unknown_effects = []
+    comp_count = 0
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            aigen_data = yaml.safe_load(f)
+        with aigen_stream.blueprint_writer(output_path, options.output_format) as writer:
+            writer.write_section("projectSettings", header.get("projectSettings", {}))
+            asset_paths = asset_source_paths(header.get("assets"), input_path)
+            baker = audio_baker(asset_paths, input_path)
+            planner = proxy_planner(options, header.get("assets"))
+            with metrics.stage("probe"):
+                prober = asset_prober(options, asset_paths)
+
+            def write_assets():
+                with metrics.stage("assets"):
+                    assets = process_assets(header["assets"], input_path, options.image_jobs,
+                                            metrics.counter()) if "assets" in header else []
+                    if planner is not None:
+                        image_proxies.attach_proxies(assets, asset_paths, planner, options.image_jobs,
+                                                     metrics.counter())
+                if prober is not None:
+                    with metrics.stage("probe"):
+                        prober.fill(assets)
+                writer.write_section("assets", assets)
+
+            if planner is None:
+                write_assets()
+            if prober is not None and prober.clamp:
+                with metrics.stage("probe"):
+                    prober.wait()
+            writer.begin_list("compositions")
+            for comp_data in metrics.iterate("parse", aigen_stream.iter_compositions(input_path)):
+                if globals_map:
+                    with metrics.stage("globals"):
+                        comp_data = resolver.resolve(comp_data)
+                if components:
+                    with metrics.stage("components"):
+                        comp_data = components.expand_composition(comp_data)
+                if dedup is not None:
+                    with metrics.stage("dedup"):
+                        comp_data = dedup.process(comp_data)
+                if planner is not None:
+                    planner.add_composition(comp_data)
+                with metrics.stage("translate"):
+                    translated_comp, unknown = translate_composition(comp_data, manifest_index, expand_runs, reducer,
+                                                                     baker, columnizer, expressions, prober)
+                metrics.count_composition(translated_comp)
+                unknown_effects.extend(unknown)
+                with metrics.stage("write"):
+                    writer.write_item(translated_comp)
+                comp_count += 1
+            writer.end_list()
+            if planner is not None:
+                # Proxy sizes depend on every composition, so the assets go last.
+                write_assets()
+        with metrics.stage("write"):
+            finish_output(output_path, writer, options)
+    except yaml.YAMLError as e:
+        raise TranslationError(f"Error loading AIGEN file: {e}")
+    except IOError as e:
+        raise TranslationError(f"Error writing JSON: {e}")
+    report_unknown_effects(unknown_effects)
+    metrics.count_unknown(unknown_effects)
+    return finish_summary({"compositions": comp_count, "unknown": len(unknown_effects)}, reducer, baker,
+                          columnizer, expressions, dedup, prober)
+
+def _translate_in_memory(input_path, output_path, manifest_index, options, metrics=translation_metrics.DISABLED):
+    import yaml
+    import aigen_stream
+    try:
+        with metrics.stage("parse"), open(input_path, 'r', encoding='utf-8') as f:
+            aigen_data = yaml.load(f, Loader=aigen_stream.SafeLoader)  # LibYAML's CSafeLoader when available
     except Exception as e:
-        print(f"Error loading AIGEN file: {e}", file=sys.stderr)
-        sys.exit(1)
+        raise TranslationError(f"Error loading AIGEN file: {e}")
 
-    # Resolve Globals
+    blueprint, summary = translate_data(aigen_data, input_path, manifest_index, options, metrics)
+    try:
+        with metrics.stage("write"):
+            writer = aigen_stream.write_blueprint(output_path, blueprint, options.output_format)
+            finish_output(output_path, writer, options)
+    except IOError as e:
+        raise TranslationError(f"Error writing JSON: {e}")
+    return summary
+
+def translate_data(aigen_data, input_path, manifest_index, options, metrics=translation_metrics.DISABLED):
+    """
+    Translates an already parsed AIGEN document; 'input_path' is where it
+    came from (assets resolve relative to it). Returns (blueprint, summary).
+    """
+    # Resolve Globals (skipped when the file never references them)
     globals_map = aigen_data.get("globals", {})
-    if globals_map:
-        aigen_data = resolve_globals(aigen_data, globals_map)
-
-    # Merge Components
-    components_map = {comp['id']: comp for comp in aigen_data.get("components", [])}
-    if components_map:
-        for comp_data in aigen_data.get("compositions", []):
-            for layer_data in comp_data.get("layers", []):
-                if "useComponents" in layer_data:
-                    merged_properties = {}
-                    for comp_id in layer_data["useComponents"]:
-                        if comp_id in components_map:
-                            comp_props = json.loads(json.dumps(components_map[comp_id].get("properties", {})))
-                            deep_merge(merged_properties, comp_props)
-                    layer_props = layer_data.get("properties", {})
-                    deep_merge(merged_properties, layer_props)
-                    layer_data["properties"] = merged_properties
-                    del layer_data["useComponents"]
-
-    # Load Manifest Locally
-    effects_manifest = load_local_manifest(MANIFEST_FILENAME)
-    if not effects_manifest:
-        # If manifest fails, we create an empty one so script doesn't crash,
-        # but effects translation relies on direct matchnames.
-        effects_manifest = {}
+    if globals_map and has_global_references(input_path):
+        with metrics.stage("globals"):
+            aigen_data = resolve_globals(aigen_data, globals_map)
+
+    # Merge Components (flattened once, shared structurally between users)
+    with metrics.stage("components"):
+        components = ComponentEngine(aigen_data.get("components", []))
+        if components:
+            aigen_data["compositions"] = [components.expand_composition(comp_data)
+                                          for comp_data in aigen_data.get("compositions", [])]
+
+    # Wrap duplicate compositions around the first of their kind
+    dedup = composition_deduplicator(options, input_path)
+    if dedup is not None:
+        with metrics.stage("dedup"):
+            aigen_data["compositions"] = [dedup.process(comp_data)
+                                          for comp_data in aigen_data.get("compositions") or []]
 
     # Build Blueprint
     blueprint = {
@@ -343,51 +616,168 @@ def main(input_path, output_path):
     }
 
     # Process Assets with Auto-Fix
+    asset_paths = asset_source_paths(aigen_data.get("assets"), input_path)
+    baker = audio_baker(asset_paths, input_path)
+    planner = proxy_planner(options, aigen_data.get("assets"))
+    with metrics.stage("probe"):
+        prober = asset_prober(options, asset_paths)  # runs while images are fixed
     if "assets" in aigen_data:
-        print("Processing Assets...")
-        # Get base directory of the input AIGEN file
-        base_dir = os.path.dirname(os.path.abspath(input_path))
-        
-        for asset in aigen_data["assets"]:
-            original_path = asset.get("path", "")
-            
-            # Resolve relative path
-            if not os.path.isabs(original_path):
-                full_path = os.path.join(base_dir, original_path)
-            else:
-                full_path = original_path
-
-            # Check if it's an image that might need fixing
-            if original_path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-                print(f"  Checking image: {full_path}")
-                # Attempt to fix/re-save using the full path
-                fixed_path = fix_image(full_path)
-                asset["path"] = fixed_path
-            
-            blueprint["assets"].append(asset)
-
-    if "compositions" in aigen_data:
-        for comp_data in aigen_data.get("compositions", []):
-            translated_comp = comp_data.copy()
-            if 'layers' in comp_data:
-                layers = [l for l in comp_data['layers'] if isinstance(l, dict)]
-                for layer in layers:
-                    if 'effects' in layer:
-                        translated_effects = [translate_effect(e, effects_manifest) for e in layer['effects']]
-                        layer['effects'] = [te for te in translated_effects if te is not None]
-                translated_comp['layers'] = layers
+        with metrics.stage("assets"):
+            blueprint["assets"] = process_assets(aigen_data["assets"], input_path, options.image_jobs,
+                                                 metrics.counter())
+            if planner is not None:
+                for comp_data in aigen_data.get("compositions") or []:
+                    planner.add_composition(comp_data)
+                image_proxies.attach_proxies(blueprint["assets"], asset_paths, planner, options.image_jobs,
+                                             metrics.counter())
+    if prober is not None:
+        with metrics.stage("probe"):
+            prober.fill(blueprint["assets"])
+
+    unknown_effects = []
+    expand_runs = has_keyframe_runs(input_path)
+    reducer = keyframe_reducer(options)
+    columnizer = keyframe_columnizer(options)
+    expressions = expression_baker(options)
+    with metrics.stage("translate"):
+        for comp_data in aigen_data.get("compositions") or []:
+            translated_comp, unknown = translate_composition(comp_data, manifest_index, expand_runs, reducer, baker,
+                                                             columnizer, expressions, prober)
+            unknown_effects.extend(unknown)
             blueprint["compositions"].append(translated_comp)
-
+    for translated_comp in blueprint["compositions"]:
+        metrics.count_composition(translated_comp)
+    report_unknown_effects(unknown_effects)
+    metrics.count_unknown(unknown_effects)
+    return blueprint, finish_summary({"compositions": len(blueprint["compositions"]),
+                                      "unknown": len(unknown_effects)}, reducer, baker, columnizer, expressions, dedup,
+                                     prober)
+
+def translate_file(input_path, output_path, manifest_index=None, options=None):
+    """
+    Translates one AIGEN file. Pass a preloaded 'manifest_index' to avoid
+    loading the manifest again (batch and watch modes do this).
+    Returns a small summary dict; raises TranslationError on failure.
+    With options.profile the summary also holds per-stage 'metrics'.
+    """
+    options = options or TranslationOptions()
+    metrics = (translation_metrics.TranslationMetrics(memory=options.profile_memory) if options.profile
+               else translation_metrics.DISABLED)
+    metrics.start()
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(blueprint, f, indent=2)
-        print(f"Success! Blueprint created: {output_path}")
-    except IOError as e:
-        print(f"Error writing JSON: {e}", file=sys.stderr)
+        if manifest_index is None:
+            # Load Manifest Locally
+            with metrics.stage("manifest"):
+                manifest_index = load_effects_index()
+        if options.incremental:
+            import incremental_build
+            summary = incremental_build.translate_incremental(input_path, output_path, manifest_index, options, metrics)
+        elif options.stream:
+            summary = _translate_streaming(input_path, output_path, manifest_index, options, metrics)
+        else:
+            summary = _translate_in_memory(input_path, output_path, manifest_index, options, metrics)
+    finally:
+        metrics.stop()
+    if metrics.enabled:
+        summary["metrics"] = metrics.to_dict()
+    return summary
+
+def main(input_path, output_path, options=None, show_profile=False, metrics_path=None, cprofile_path=None):
+    options = options or TranslationOptions()
+    if options.stream:
+        print("--- Starting AIGEN v3.1 Translation (Offline Mode, Streaming) ---")
+    else:
+        print("--- Starting AIGEN v3.1 Translation (Offline Mode) ---")
+    profiler = None
+    if cprofile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        summary = translate_file(input_path, output_path, options=options)
+    except TranslationError as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            print(f"cProfile stats written to {cprofile_path} (view with: python -m pstats {cprofile_path})")
+    print(f"Success! Blueprint created: {output_path}")
+    if "metrics" in summary:
+        metrics = translation_metrics.TranslationMetrics.from_dict(summary["metrics"])
+        if show_profile:
+            metrics.report()
+        if metrics_path:
+            metrics.write(metrics_path, input=input_path, output=output_path,
+                          mode="incremental" if options.incremental else "stream" if options.stream else "memory",
+                          summary={k: v for k, v in summary.items() if k not in ("metrics", "assets")})
+            print(f"Metrics written to {metrics_path}")
+
+def add_arguments(parser):
+    """Adds the translator's command-line options to an argparse parser (also used by aigen.py)."""
+    parser.add_argument("input", help="Input .aigen file, or a directory of .aigen files")
+    parser.add_argument("output", help="Output .json blueprint, or an output directory in batch mode")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream compositions to the output one at a time (for very large files).")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Batch mode: number of worker processes (default: CPU count).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only retranslate compositions whose inputs changed since the last build.")
+    parser.add_argument("--simplify", type=float, default=None, metavar="TOL",
+                        help="Drop keyframes that linear interpolation reproduces within TOL (needs NumPy).")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Resolve keyframe times offline (markers, in points, stretch, frame snapping) "
+                             "and emit times/values arrays (needs NumPy).")
+    parser.add_argument("--bake-expressions", action="store_true",
+                        help="Replace wiggle/loopOut/linear/ease/valueAtTime expressions with baked keyframes "
+                             "(needs NumPy; combine with --simplify to thin them).")
+    parser.add_argument("--proxies", action="store_true",
+                        help="Attach downscaled proxies to images that are only shown well below their size "
+                             "(needs Pillow).")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Build structurally identical compositions once; the copies become wrappers "
+                             "holding a Pre-comp layer of the first.")
+    parser.add_argument("--probe-assets", action="store_true",
+                        help="Fill in missing asset width/height/duration/frameRate from the files' headers "
+                             "(read concurrently, cached by path, mtime and size).")
+    parser.add_argument("--clamp-out-points", action="store_true",
+                        help="Cut Footage/Audio layer outPoint and duration values that run past the end of "
+                             "their media (probes the assets).")
+    parser.add_argument("--format", choices=("pretty", "minified", "chunked"), default="pretty",
+                        help="Blueprint layout: indented JSON (default), minified JSON, or 'chunked': "
+                             "a blueprint listing one minified file per composition in '<name>_comps/', "
+                             "which the engine loads one at a time.")
+    parser.add_argument("--gzip", action="store_true",
+                        help="Also write a gzip-compressed '<file>.gz' next to every output file, for archival.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print wall time, CPU time and peak memory (tracemalloc) per stage, plus counts.")
+    parser.add_argument("--metrics", default=None, metavar="OUT.json",
+                        help="Write the per-stage metrics and counts as JSON (batch mode: one entry per file).")
+    parser.add_argument("--cprofile", default=None, metavar="OUT.prof",
+                        help="Run under cProfile and dump the stats to OUT.prof.")
+
+def run(args, parser):
+    """Runs a translation (or a batch) from parsed command-line arguments."""
+    options = TranslationOptions(stream=args.stream, incremental=args.incremental, simplify=args.simplify,
+                                 columnar=args.columnar, bake_expressions=args.bake_expressions,
+                                 profile=args.profile or bool(args.metrics), proxies=args.proxies,
+                                 dedup=args.dedup, output_format=args.format, gzip=args.gzip,
+                                 probe_assets=args.probe_assets, clamp_out_points=args.clamp_out_points)
+    if os.path.isdir(args.input):
+        import batch_translate
+        if args.cprofile:
+            print("Warning: --cprofile is ignored in batch mode (translation runs in worker processes).",
+                  file=sys.stderr)
+        ok = batch_translate.translate_directory(args.input, args.output, jobs=args.jobs, options=options,
+                                                 show_profile=args.profile, metrics_path=args.metrics)
+        sys.exit(0 if ok else 1)
+    main(args.input, args.output, options, show_profile=args.profile, metrics_path=args.metrics,
+         cprofile_path=args.cprofile)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python aigen_to_json_translator.py <input.aigen> <output.json>")
-        sys.exit(1)
-    main(sys.argv[1], sys.argv[2])
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Translate an AIGEN (YAML) file into a JSON blueprint, "
+                    "or every .aigen file in a directory (batch mode).")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
@@ -0,0 +1,511 @@
+# asset_probe.py
+#
+# Description: Asset metadata probing (--probe-assets, --clamp-out-points).
+# Reads width and height from image headers (PNG, JPEG, GIF, BMP, WebP, PSD)
+# and duration, frame rate and frame size from media containers (WAV/AIFF
+# chunks, MP3 frame headers with their Xing/Info/VBRI frame counts, MP4/MOV
+# atoms) without decoding any pixels or samples; a probe is a few small
+# reads. Files are probed concurrently by a thread pool that starts as soon
+# as the asset list is known, while images are fixed and compositions
+# translated, and results are cached by path, mtime and size in
+# '.aigen_cache/asset_probe.json', so unchanged files are not opened again.
+#
+# Probed values fill in the blueprint's assets where the AIGEN file left
+# them out (explicit values always win). With clamping, Footage and Audio
+# layers whose numeric outPoint or duration runs past the end of their
+# media are cut at it, so After Effects doesn't have to find out at build
+# time.
+# Usage: python asset_probe.py FILE [FILE ...]
+#
+
+import argparse
+import json
+import os
+import struct
+import sys
+
+import manifest_cache
+
+PROBE_FORMAT = 1
+PROBE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), manifest_cache.CACHE_DIRNAME,
+                           "asset_probe.json")
+PROBE_THREADS = 8   # probing waits on the disk, not the CPU
+FIELDS = ("width", "height", "duration", "frameRate")
+CLAMP_TYPES = ("Footage", "Audio")
+HEAD_BYTES = 64 * 1024  # enough for any image header and to find the first MP3 frame
+
+# MPEG audio: kbps by [MPEG-1?][layer], sample rates by version bits
+_MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+_MP4_CONTAINERS = (b"moov", b"trak", b"mdia", b"minf", b"stbl")
+_MP4_FIRST_ATOMS = (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot")
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# (path, mtime_ns, size) -> probed info, shared by every translation in the process
+_probed = {}
+_disk_loaded = set()  # cache files already merged into _probed
+
+
+class ProbeError(Exception):
+    pass
+
+
+def _png(head):
+    if head[12:16] != b"IHDR":
+        raise ProbeError("PNG without an IHDR chunk")
+    width, height = struct.unpack(">II", head[16:24])
+    return {"width": width, "height": height}
+
+
+def _jpeg(head):
+    pos = 2
+    while pos + 9 <= len(head):
+        if head[pos] != 0xFF:
+            raise ProbeError("corrupt JPEG marker")
+        marker = head[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+            return {"width": width, "height": height}
+        pos += 2 + struct.unpack(">H", head[pos + 2:pos + 4])[0]
+    raise ProbeError("no JPEG frame header in the first bytes")
+
+
+def _gif(head):
+    width, height = struct.unpack("<HH", head[6:10])
+    return {"width": width, "height": height}
+
+
+def _bmp(head):
+    if struct.unpack("<I", head[14:18])[0] == 12:  # OS/2 header
+        width, height = struct.unpack("<HH", head[18:22])
+    else:
+        width, height = struct.unpack("<ii", head[18:26])
+    return {"width": abs(width), "height": abs(height)}
+
+
+def _webp(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return {"width": width & 0x3FFF, "height": height & 0x3FFF}
+    if chunk == b"VP8L":
+        bits = struct.unpack("<I", head[21:25])[0]
+        return {"width": (bits & 0x3FFF) + 1, "height": ((bits >> 14) & 0x3FFF) + 1}
+    if chunk == b"VP8X":
+        return {"width": int.from_bytes(head[24:27], "little") + 1, "height": int.from_bytes(head[27:30], "little") + 1}
+    raise ProbeError(f"unknown WebP chunk {chunk!r}")
+
+
+def _psd(head):
+    height, width = struct.unpack(">II", head[14:22])
+    return {"width": width, "height": height}
+
+
+def _riff_chunks(f, start, end, little_endian):
+    """Yields (chunk id, data offset, data size) of the RIFF (little endian) or IFF chunks between 'start' and 'end'."""
+    fmt = "<I" if little_endian else ">I"
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        size = struct.unpack(fmt, head[4:8])[0]
+        yield head[:4], pos + 8, size
+        pos += 8 + size + (size & 1)
+
+
+def _wav(f, file_size):
+    byte_rate = None
+    for chunk, offset, size in _riff_chunks(f, 12, file_size, True):
+        if chunk == b"fmt ":
+            f.seek(offset)
+            byte_rate = struct.unpack("<I", f.read(12)[8:12])[0]
+        elif chunk == b"data":
+            if byte_rate is None or byte_rate == 0:
+                raise ProbeError("WAV data before its format chunk")
+            size = min(size, file_size - offset)  # streamed files leave the size at 0xFFFFFFFF
+            return {"duration": size / byte_rate}
+    raise ProbeError("WAV without a data chunk")
+
+
+def _extended(raw):
+    """An 80-bit IEEE extended float (AIFF sample rates)."""
+    exponent, mantissa = struct.unpack(">HQ", raw)
+    if exponent & 0x7FFF == 0 and mantissa == 0:
+        return 0.0
+    value = mantissa * 2.0 ** ((exponent & 0x7FFF) - 16383 - 63)
+    return -value if exponent & 0x8000 else value
+
+
+def _aiff(f, file_size):
+    for chunk, offset, _ in _riff_chunks(f, 12, file_size, False):
+        if chunk == b"COMM":
+            f.seek(offset)
+            comm = f.read(18)
+            frames = struct.unpack(">I", comm[2:6])[0]
+            rate = _extended(comm[8:18])
+            if rate <= 0:
+                raise ProbeError("AIFF with a zero sample rate")
+            return {"duration": frames / rate}
+    raise ProbeError("AIFF without a COMM chunk")
+
+
+def _mp3_frame(head, pos):
+    """(frame length, samples per frame, sample rate, bitrate bps, MPEG-1?, mono?) of a frame header, or None."""
+    if pos + 4 > len(head) or head[pos] != 0xFF or head[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (head[pos + 1] >> 3) & 3
+    layer = 4 - ((head[pos + 1] >> 1) & 3)
+    bitrate_index = head[pos + 2] >> 4
+    rate_index = (head[pos + 2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    rate = _MP3_RATES[version][rate_index]
+    padding = (head[pos + 2] >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or mpeg1 else 576
+        length = samples // 8 * bitrate // rate + padding
+    return length, samples, rate, bitrate, mpeg1, head[pos + 3] >> 6 == 3
+
+
+def _mp3(f, file_size):
+    f.seek(0)
+    head = f.read(HEAD_BYTES)
+    start = 0
+    if head.startswith(b"ID3") and len(head) >= 10:
+        size = 0
+        for byte in head[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        start = 10 + size + (10 if head[5] & 0x10 else 0)
+        f.seek(start)
+        head = f.read(HEAD_BYTES)
+    pos = 0
+    while pos + 4 <= len(head):
+        frame = _mp3_frame(head, pos)
+        # A real frame is followed by another one (or the end of what we read)
+        if frame is not None and (pos + frame[0] + 4 > len(head) or _mp3_frame(head, pos + frame[0]) is not None):
+            break
+        pos += 1
+    else:
+        raise ProbeError("no MPEG audio frame found")
+    length, samples, rate, bitrate, mpeg1, mono = frame
+    side = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    tag = head[pos + 4 + side:pos + 4 + side + 12]
+    if tag[:4] in (b"Xing", b"Info") and struct.unpack(">I", tag[4:8])[0] & 1:
+        return {"duration": struct.unpack(">I", tag[8:12])[0] * samples / rate}
+    vbri = head[pos + 36:pos + 54]
+    if vbri[:4] == b"VBRI":
+        return {"duration": struct.unpack(">I", vbri[14:18])[0] * samples / rate}
+    audio_bytes = file_size - start - pos
+    f.seek(max(0, file_size - 128))
+    if f.read(3) == b"TAG":  # ID3v1
+        audio_bytes -= 128
+    return {"duration": audio_bytes * 8 / bitrate}
+
+
+def _atoms(f, start, end):
+    """Yields (type, payload offset, payload end) of the MP4 atoms between 'start' and 'end'."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        size, kind = struct.unpack(">I4s", head)
+        payload = pos + 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            payload += 8
+        elif size == 0:
+            size = end - pos
+        if size < payload - pos:
+            raise ProbeError("corrupt MP4 atom size")
+        yield kind, payload, pos + size
+        pos += size
+
+
+def _full_atom(f, offset, v0, v1):
+    """Unpacks a version 0/1 full atom body (after its version and flags) with struct formats 'v0'/'v1'."""
+    f.seek(offset)
+    version = f.read(4)[0]
+    fmt = v1 if version == 1 else v0
+    return struct.unpack(fmt, f.read(struct.calcsize(fmt)))
+
+
+def _mp4(f, file_size):
+    info = {}
+    tracks = []
+
+    def walk(start, end, track):
+        for kind, offset, stop in _atoms(f, start, end):
+            if kind in _MP4_CONTAINERS:
+                if kind == b"trak":
+                    track = {}
+                    tracks.append(track)
+                walk(offset, stop, track)
+            elif kind == b"mvhd":
+                _, _, timescale, duration = _full_atom(f, offset, ">IIII", ">QQIQ")
+                if timescale:
+                    info["duration"] = duration / timescale
+            elif track is None:
+                continue
+            elif kind == b"tkhd":
+                fields = _full_atom(f, offset, ">IIIII8x2x2x2x2x36xII", ">QQIIQ8x2x2x2x2x36xII")
+                track["width"], track["height"] = fields[-2] >> 16, fields[-1] >> 16
+            elif kind == b"hdlr":
+                f.seek(offset + 8)
+                track["handler"] = f.read(4)
+            elif kind == b"mdhd":
+                track["timescale"] = _full_atom(f, offset, ">III", ">QQI")[2]
+            elif kind == b"stts":
+                f.seek(offset + 4)
+                count = struct.unpack(">I", f.read(4))[0]
+                data = f.read(count * 8)
+                samples = ticks = 0
+                for n, delta in struct.iter_unpack(">II", data[:len(data) // 8 * 8]):
+                    samples += n
+                    ticks += n * delta
+                track["samples"], track["ticks"] = samples, ticks
+
+    walk(0, file_size, None)
+    for track in tracks:
+        if track.get("handler") == b"vide" and track.get("width"):
+            info["width"], info["height"] = track["width"], track["height"]
+            if track.get("ticks") and track.get("timescale"):
+                info["frameRate"] = round(track["samples"] * track["timescale"] / track["ticks"], 3)
+            break
+    if not info:
+        raise ProbeError("no movie header found")
+    return info
+
+
+def probe_file(path):
+    """Width/height/duration/frameRate read from the file's headers (whichever apply); raises ProbeError or OSError."""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                info = _png(head)
+            elif head.startswith(b"\xff\xd8"):
+                info = _jpeg(head)
+            elif head[:6] in (b"GIF87a", b"GIF89a"):
+                info = _gif(head)
+            elif head.startswith(b"BM") and path.lower().endswith((".bmp", ".dib")):
+                info = _bmp(head)
+            elif head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+                info = _webp(head)
+            elif head.startswith(b"8BPS"):
+                info = _psd(head)
+            elif head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+                info = _wav(f, file_size)
+            elif head.startswith(b"FORM") and head[8:12] in (b"AIFF", b"AIFC"):
+                info = _aiff(f, file_size)
+            elif head[4:8] in _MP4_FIRST_ATOMS:
+                info = _mp4(f, file_size)
+            elif head.startswith(b"ID3") or path.lower().endswith((".mp3", ".mp2", ".mpa")):
+                info = _mp3(f, file_size)
+            else:
+                raise ProbeError("unsupported file type")
+        except (struct.error, IndexError, KeyError) as e:
+            raise ProbeError(f"truncated or corrupt header ({e})")
+    if "duration" in info:
+        info["duration"] = round(info["duration"], 6)
+    return info
+
+
+def _load_disk_cache(cache_path):
+    if cache_path is None or cache_path in _disk_loaded:
+        return
+    _disk_loaded.add(cache_path)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return
+    if not isinstance(stored, dict) or stored.get("format") != PROBE_FORMAT:
+        return
+    for path, (mtime_ns, size, info) in (stored.get("files") or {}).items():
+        _probed.setdefault((path, mtime_ns, size), info)
+
+
+def _save_disk_cache(cache_path):
+    """Writes the probes of files that still exist (newest per path), atomically."""
+    files = {}
+    for (path, mtime_ns, size), info in _probed.items():
+        if info is not None and (path not in files or files[path][0] < mtime_ns):
+            files[path] = [mtime_ns, size, info]
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"format": PROBE_FORMAT, "files": files}, f, separators=(",", ":"))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write the asset probe cache '{cache_path}': {e}", file=sys.stderr)
+
+
+def _probe_cached(key):
+    try:
+        return probe_file(key[0])
+    except (OSError, ProbeError) as e:
+        print(f"  [Probe] Could not read {key[0]}: {e}")
+        return None
+
+
+class AssetProber:
+    """
+    Probes the assets of one file in the background from construction on;
+    fill() and clamp() wait for the results when they first need them.
+    """
+
+    def __init__(self, asset_paths, clamp=False, jobs=None, cache_path=PROBE_CACHE):
+        self.clamp = clamp
+        self.cache_path = cache_path
+        self.filled = 0
+        self.clamped = 0
+        self.cached = 0
+        self.info = None  # asset id -> probed info (None when unreadable), once wait() returned
+        self._keys = {}
+        self._futures = {}
+        self._pool = None
+        _load_disk_cache(cache_path)
+        pending = set()
+        for asset_id, path in asset_paths.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = self._keys[asset_id] = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+            if key in _probed:
+                self.cached += 1
+            else:
+                pending.add(key)
+        if len(pending) > 1 and jobs != 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=min(jobs or PROBE_THREADS, len(pending)))
+            self._futures = {key: self._pool.submit(_probe_cached, key) for key in pending}
+        else:
+            self._futures = {key: None for key in pending}
+
+    def wait(self):
+        """Returns asset id -> probed info once every probe finished (and stores new results on disk)."""
+        if self.info is not None:
+            return self.info
+        for key, future in self._futures.items():
+            _probed[key] = future.result() if future is not None else _probe_cached(key)
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._futures and self.cache_path is not None:
+            _save_disk_cache(self.cache_path)
+        self.info = {asset_id: _probed.get(key) for asset_id, key in self._keys.items()}
+        return self.info
+
+    @property
+    def probed(self):
+        return len(self._futures)
+
+    def fill(self, assets):
+        """Sets the probed fields an asset doesn't have yet."""
+        info = self.wait()
+        for asset in assets or []:
+            if not isinstance(asset, dict):
+                continue
+            for field, value in (info.get(asset.get("id")) or {}).items():
+                if field in FIELDS and asset.get(field) is None:
+                    asset[field] = value
+                    self.filled += 1
+        return assets
+
+    def _media_end(self, layer):
+        """(end time in the composition, media length in layer time) of a Footage/Audio layer, or None."""
+        if layer.get("type") not in CLAMP_TYPES:
+            return None
+        duration = (self.info.get(layer.get("assetId")) or {}).get("duration")
+        start = layer.get("startTime", 0)
+        stretch = layer.get("stretch", 100)
+        if not duration or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (start, stretch)):
+            return None  # stills, or times resolved from markers at build time
+        if stretch <= 0:
+            return None
+        length = duration * stretch / 100.0
+        return start + length, length
+
+    def clamp_composition(self, comp_data):
+        """Cuts layer outPoint/duration values that run past the end of their media (copy-on-write)."""
+        layers = comp_data.get("layers")
+        if not self.clamp or not isinstance(layers, list):
+            return comp_data
+        self.wait()
+        rebuilt = None
+        for i, layer in enumerate(layers):
+            if not isinstance(layer, dict):
+                continue
+            media = self._media_end(layer)
+            if media is None:
+                continue
+            changes = {}
+            out_point, in_point = layer.get("outPoint"), layer.get("inPoint", 0)
+            if (isinstance(out_point, (int, float)) and out_point > media[0] + 1e-6
+                    and (not isinstance(in_point, (int, float)) or in_point < media[0])):
+                changes["outPoint"] = round(media[0], 6)
+            duration = layer.get("duration")
+            if isinstance(duration, (int, float)) and duration > media[1] + 1e-6:
+                changes["duration"] = round(media[1], 6)
+            if changes:
+                if rebuilt is None:
+                    rebuilt = list(layers)
+                rebuilt[i] = dict(layer, **changes)
+                self.clamped += 1
+        if rebuilt is None:
+            return comp_data
+        comp_data = dict(comp_data)
+        comp_data["layers"] = rebuilt
+        return comp_data
+
+    def report(self):
+        clamped = f", {self.clamped} layer(s) clamped to their media" if self.clamp else ""
+        print(f"Asset probing: {self.probed} file(s) probed, {self.cached} from cache, "
+              f"{self.filled} field(s) filled{clamped}")
+
+
+def add_arguments(parser):
+    parser.add_argument("files", nargs="+", help="Image, audio or video files to probe")
+    parser.add_argument("--jobs", type=int, default=None, help=f"Probe threads (default: {PROBE_THREADS}).")
+
+
+def run(args, parser):
+    prober = AssetProber({path: path for path in args.files}, jobs=args.jobs, cache_path=None)
+    info = prober.wait()
+    for path in args.files:
+        fields = info.get(path)
+        if fields is None:
+            print(f"{path}: -")
+        else:
+            print(f"{path}: " + ", ".join(f"{k}={fields[k]}" for k in FIELDS if k in fields))
+    sys.exit(0 if all(info.get(path) is not None for path in args.files) else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the width/height/duration/frameRate read from file headers.")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
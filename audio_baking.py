@@ -0,0 +1,330 @@
+# audio_baking.py
+#
+# Description: Offline audio amplitude baking (a local "Convert Audio to
+# Keyframes"). A property whose value has an 'audio' spec gets one keyframe
+# per composition frame of its layer's range (in point to out point), timed
+# relative to the in point like any other keyframes:
+#
+#   "Slider":
+#     audio:
+#       assetId: "asset_audio"   # audio asset to analyse
+#       channel: "both"          # both (average), left or right
+#       measure: "rms"           # rms or peak
+#       band: [20, 250]          # optional frequency band in Hz (rfft per frame)
+#       scale: 100               # value = level * scale (level 1.0 = full scale)
+#       start: 0                 # seconds into the audio at the layer's startTime
+#
+# Audio is decoded by an ffmpeg subprocess as a stream of float PCM (any
+# format ffmpeg reads); without ffmpeg, .wav files are read with the wave
+# module. Samples are analysed in chunks with vectorized NumPy windows, so
+# memory stays bounded for tracks of any length. Each asset is decoded once
+# per composition, for all of its specs together.
+#
+
+import math
+import os
+import shutil
+import subprocess
+import sys
+import wave
+
+import numpy as np
+
+from keyframe_columns import composition_markers, resolve_seconds
+
+ANALYSIS_RATE = 48000  # ffmpeg resamples to this rate
+CHUNK_SAMPLES = 1 << 16
+CHANNELS = ("both", "left", "right")
+MEASURES = ("rms", "peak")
+DEFAULT_SCALE = 100
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def _ffmpeg_chunks(path, ffmpeg):
+    cmd = [ffmpeg, "-v", "error", "-nostdin", "-i", path, "-f", "f32le", "-acodec", "pcm_f32le",
+           "-ac", "2", "-ar", str(ANALYSIS_RATE), "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        chunk_bytes = CHUNK_SAMPLES * 2 * 4
+        pending = b""
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 8
+            pending = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype="<f4").reshape(-1, 2)
+        if proc.wait() != 0:
+            message = proc.stderr.read().decode("utf-8", "replace").strip()
+            raise AudioDecodeError(f"ffmpeg failed on {path}: {message}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def _wave_samples(raw, width):
+    if width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if width == 3:
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        return values.astype(np.float32) / float(1 << 23)
+    if width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    raise AudioDecodeError(f"Unsupported WAV sample width: {width} bytes")
+
+
+def _wave_chunks(wav):
+    channels = wav.getnchannels()
+    width = wav.getsampwidth()
+    with wav:
+        while True:
+            raw = wav.readframes(CHUNK_SAMPLES)
+            if not raw:
+                break
+            samples = _wave_samples(raw, width).reshape(-1, channels)
+            # Mono is used for both sides; extra channels (surround) are ignored.
+            yield samples[:, [0, 0]] if channels == 1 else samples[:, :2]
+
+
+def open_pcm(path):
+    """Returns (sample_rate, iterator of (n, 2) float32 chunks)."""
+    if not os.path.exists(path):
+        raise AudioDecodeError(f"Audio file not found: {path}")
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        return ANALYSIS_RATE, _ffmpeg_chunks(path, ffmpeg)
+    try:
+        wav = wave.open(path, 'rb')
+    except (wave.Error, EOFError):
+        raise AudioDecodeError(f"Cannot decode {os.path.basename(path)}: ffmpeg is not installed "
+                               f"and the stdlib fallback only reads PCM .wav files")
+    return wav.getframerate(), _wave_chunks(wav)
+
+
+class AudioSpec:
+    """A validated 'audio' spec. Specs with equal keys share one analysis."""
+
+    def __init__(self, spec):
+        self.asset_id = spec.get("assetId")
+        self.channel = str(spec.get("channel", "both")).lower()
+        self.measure = str(spec.get("measure", "rms")).lower()
+        band = spec.get("band")
+        self.band = tuple(float(f) for f in band) if band is not None else None
+        self.scale = float(spec.get("scale", DEFAULT_SCALE))
+        self.start = float(spec.get("start", 0))
+        if self.asset_id is None:
+            raise ValueError("'assetId' is required")
+        if self.channel not in CHANNELS:
+            raise ValueError(f"channel must be one of {', '.join(CHANNELS)}")
+        if self.measure not in MEASURES:
+            raise ValueError(f"measure must be one of {', '.join(MEASURES)}")
+        if self.band is not None and (len(self.band) != 2 or not 0 <= self.band[0] < self.band[1]):
+            raise ValueError("band must be [low, high] in Hz with low < high")
+
+    @property
+    def key(self):
+        return self.channel, self.measure, self.band
+
+
+def analyze(path, fps, frame_count, keys, start=0.0):
+    """
+    Returns {(channel, measure, band): levels} with one level (0..1 for full
+    scale) per frame. Frame i covers the samples from (start + i / fps) on;
+    all frames use the same window of ceil(sample_rate / fps) samples.
+    """
+    sample_rate, chunks = open_pcm(path)
+    window = int(math.ceil(sample_rate / fps))
+    starts = np.floor((start + np.arange(frame_count) / fps) * sample_rate).astype(np.int64)
+    hann = np.hanning(window).astype(np.float32)
+    hann_power = float(np.sum(hann * hann))
+    freqs = np.fft.rfftfreq(window, 1.0 / sample_rate)
+    levels = {key: np.zeros(frame_count) for key in keys}
+
+    def process(first, last, buffer, buffer_start):
+        idx = (starts[first:last] - buffer_start)[:, None] + np.arange(window)
+        frames = buffer[idx]  # (frames, window, 2)
+        signals, spectra = {}, {}
+        for key in keys:
+            channel, measure, band = key
+            if channel not in signals:
+                signals[channel] = frames.mean(axis=2) if channel == "both" else frames[:, :, CHANNELS.index(channel) - 1]
+            signal = signals[channel]
+            if band is None:
+                if measure == "peak":
+                    level = np.abs(signal).max(axis=1)
+                else:
+                    level = np.sqrt(np.mean(np.square(signal, dtype=np.float64), axis=1))
+            else:
+                if channel not in spectra:
+                    spectra[channel] = np.square(np.abs(np.fft.rfft(signal * hann, axis=1)))
+                mask = (freqs >= band[0]) & (freqs < band[1])
+                # Parseval (one-sided, Hann-compensated) gives the band's RMS; peak assumes a sine crest factor.
+                level = np.sqrt(2.0 * spectra[channel][:, mask].sum(axis=1) / (window * hann_power))
+                if measure == "peak":
+                    level = level * math.sqrt(2.0)
+            levels[key][first:last] = level
+
+    buffer_start = min(0, int(starts[0])) if frame_count else 0
+    buffer = np.zeros((-buffer_start, 2), dtype=np.float32)
+    frame = 0
+    exhausted = False
+    while frame < frame_count:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            exhausted = True
+            # Past the end of the audio: pad with silence so the remaining frames complete.
+            needed = int(starts[-1]) + window - (buffer_start + len(buffer))
+            chunk = np.zeros((max(needed, 0), 2), dtype=np.float32)
+        buffer = np.concatenate([buffer, chunk]) if len(buffer) else chunk
+        buffer_end = buffer_start + len(buffer)
+        ready = int(np.searchsorted(starts + window, buffer_end, side="right"))
+        if ready > frame:
+            process(frame, ready, buffer, buffer_start)
+            frame = ready
+        if frame < frame_count:
+            cut = int(starts[frame]) - buffer_start
+            if cut > 0:
+                buffer = buffer[cut:]
+                buffer_start += cut
+        elif exhausted:
+            break
+    chunks.close()
+    return levels
+
+
+def _frame_time(i, fps, in_point):
+    """Composition frame i as a keyframe time, relative to the layer's in point like the builder reads it."""
+    time = round(i / fps - in_point, 9)
+    return int(time) if time == int(time) else time
+
+
+class AudioBaker:
+    """Replaces 'audio' specs in a composition with baked keyframes (copy-on-write)."""
+
+    def __init__(self, asset_paths):
+        self.asset_paths = asset_paths  # asset id -> resolved source path
+        self.properties = 0
+        self.keyframes = 0
+
+    def _find_specs(self, node, found):
+        if isinstance(node, dict):
+            spec = node.get("audio")
+            if isinstance(spec, dict) and "assetId" in spec:
+                found.append(spec)
+            for v in node.values():
+                if isinstance(v, (dict, list)):
+                    self._find_specs(v, found)
+        elif isinstance(node, list):
+            for v in node:
+                if isinstance(v, (dict, list)):
+                    self._find_specs(v, found)
+        return found
+
+    def _replace(self, node, baked):
+        if isinstance(node, dict):
+            spec = node.get("audio")
+            if isinstance(spec, dict) and id(spec) in baked:
+                replaced = {k: v for k, v in node.items() if k != "audio"}
+                replaced["keyframes"] = baked[id(spec)]
+                return replaced
+            rebuilt = None
+            for k, v in node.items():
+                if isinstance(v, (dict, list)):
+                    new = self._replace(v, baked)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = dict(node)
+                        rebuilt[k] = new
+            return node if rebuilt is None else rebuilt
+        if isinstance(node, list):
+            rebuilt = None
+            for i, v in enumerate(node):
+                if isinstance(v, (dict, list)):
+                    new = self._replace(v, baked)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = list(node)
+                        rebuilt[i] = new
+            return node if rebuilt is None else rebuilt
+        return node
+
+    def bake(self, comp_data):
+        name = comp_data.get("name")
+        fps = float(comp_data.get("frameRate", 30))
+        duration = resolve_seconds(comp_data.get("duration", 0), {})
+        markers = None
+
+        # Frames are composition frames over each layer's range (in point to out point);
+        # the audio time of composition time t is spec.start + t - layer startTime.
+        parsed, groups = {}, {}
+        for layer in comp_data.get("layers") or []:
+            specs = self._find_specs(layer, []) if isinstance(layer, dict) else []
+            if not specs:
+                continue
+            if markers is None:
+                markers = composition_markers(comp_data)
+            in_point = resolve_seconds(layer.get("inPoint", layer.get("startTime", 0)), markers)
+            out_point = resolve_seconds(layer["outPoint"], markers) if "outPoint" in layer else duration
+            start_time = resolve_seconds(layer.get("startTime", 0), markers)
+            for raw in specs:
+                try:
+                    if in_point is None or out_point is None or start_time is None:
+                        raise ValueError(f"timing of layer '{layer.get('name')}' can't be resolved offline")
+                    spec = AudioSpec(raw)
+                    path = self.asset_paths.get(spec.asset_id)
+                    if path is None:
+                        raise ValueError(f"asset '{spec.asset_id}' not found")
+                except (TypeError, ValueError) as e:
+                    print(f"Warning: Invalid audio spec in '{name}': {e}; property left unbaked.", file=sys.stderr)
+                    parsed[id(raw)] = None
+                    continue
+                first = int(math.ceil(in_point * fps - 1e-9))
+                last = max(first, int(math.ceil(out_point * fps - 1e-9)))
+                offset = spec.start - start_time
+                parsed[id(raw)] = (spec, path, offset, first, last, in_point)
+                group = groups.setdefault((path, offset), [set(), first, last])
+                group[0].add(spec.key)
+                group[1] = min(group[1], first)
+                group[2] = max(group[2], last)
+
+        # Each asset is decoded once per offset, over the union of its layers' frames.
+        levels = {}
+        for (path, offset), (keys, first, last) in groups.items():
+            try:
+                analyzed = analyze(path, fps, last - first, sorted(keys, key=repr), offset + first / fps)
+            except AudioDecodeError as e:
+                print(f"Warning: {e}; audio specs in '{name}' left unbaked.", file=sys.stderr)
+                continue
+            for key, series in analyzed.items():
+                levels[(path, offset, key)] = (first, series)
+
+        baked = {}  # specs that failed are not in here and stay as they are
+        for raw_id, entry in parsed.items():
+            if entry is None:
+                continue
+            spec, path, offset, first, last, in_point = entry
+            found = levels.get((path, offset, spec.key))
+            if found is None:
+                continue
+            group_first, series = found
+            values = np.round(series[first - group_first:last - group_first] * spec.scale, 4).tolist()
+            baked[raw_id] = [{"time": _frame_time(first + i, fps, in_point), "value": value}
+                             for i, value in enumerate(values)]
+            self.properties += 1
+            self.keyframes += len(values)
+        return self._replace(comp_data, baked) if baked else comp_data
+
+    def report(self):
+        if self.properties:
+            print(f"Audio baking: {self.keyframes} keyframes on {self.properties} properties")
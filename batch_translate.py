@@ -0,0 +1,138 @@
+# batch_translate.py
+#
+# Description: Translates every .aigen file under a directory in parallel.
+# The effects manifest is loaded once in the parent. Workers inherit it via
+# fork where available; on spawn-only platforms (Windows) each worker opens
+# the compiled, memory-mapped manifest cache, whose pages the OS shares.
+#
+# Usage: python aigen_to_json_translator.py --jobs N <input_dir> <output_dir>
+#
+
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aigen_to_json_translator as translator
+import translation_metrics
+
+_WORKER_INDEX = None
+
+
+def find_aigen_files(input_dir):
+    """Returns input paths (sorted) of every .aigen file below 'input_dir'."""
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".aigen"):
+                found.append(os.path.join(root, name))
+    return found
+
+
+def output_path_for(input_path, input_dir, output_dir):
+    relative = os.path.relpath(input_path, input_dir)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + ".json")
+
+
+def _init_worker():
+    global _WORKER_INDEX
+    if _WORKER_INDEX is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _WORKER_INDEX = translator.load_effects_index()
+
+
+def _translate_one(input_path, output_path, options):
+    """Worker: returns (input_path, ok, seconds, summary or error, captured log)."""
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            summary = translator.translate_file(input_path, output_path, _WORKER_INDEX, options)
+        return input_path, True, time.perf_counter() - start, summary, log.getvalue()
+    except Exception as e:
+        return input_path, False, time.perf_counter() - start, str(e), log.getvalue()
+
+
+def translate_directory(input_dir, output_dir, jobs=None, options=None, show_profile=False, metrics_path=None):
+    """
+    Translates a directory tree of AIGEN files. Returns True if every file succeeded.
+    With options.profile, per-file metrics are summed into one profile and can be written to 'metrics_path'.
+    """
+    global _WORKER_INDEX
+    options = options or translator.TranslationOptions()
+    options.image_jobs = 1  # one process per file already; don't nest pools
+
+    inputs = find_aigen_files(input_dir)
+    if not inputs:
+        print(f"No .aigen files found in {input_dir}")
+        return True
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(inputs)))
+    print(f"--- AIGEN v3.1 Batch Translation: {len(inputs)} file(s), {jobs} worker(s) ---")
+
+    wall_start = time.perf_counter()
+    _WORKER_INDEX = translator.load_effects_index()
+
+    tasks = [(path, output_path_for(path, input_dir, output_dir)) for path in inputs]
+    width = max(len(os.path.relpath(path, input_dir)) for path in inputs)
+    results = []
+    if jobs == 1:
+        for input_path, output_path in tasks:
+            results.append(_translate_one(input_path, output_path, options))
+            _print_result(results[-1], input_dir, width)
+    else:
+        # fork shares the already-loaded index; spawn re-opens the mmap'ed cache in _init_worker.
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        context = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker) as pool:
+            futures = [pool.submit(_translate_one, input_path, output_path, options)
+                       for input_path, output_path in tasks]
+            for future in futures:
+                results.append(future.result())
+                _print_result(results[-1], input_dir, width)
+
+    wall = time.perf_counter() - wall_start
+    failed = [r for r in results if not r[1]]
+    busy = sum(r[2] for r in results)
+    print(f"Summary: {len(results) - len(failed)} succeeded, {len(failed)} failed, "
+          f"wall {wall:.2f} s, per-file total {busy:.2f} s, "
+          f"mean {busy / len(results) * 1000:.1f} ms/file")
+    if options.profile:
+        _report_metrics(results, input_dir, wall, show_profile, metrics_path)
+    return not failed
+
+
+def _report_metrics(results, input_dir, wall, show_profile, metrics_path):
+    traced = [detail["metrics"].get("memory", True) for _, ok, _, detail, _ in results if ok and "metrics" in detail]
+    combined = translation_metrics.TranslationMetrics(memory=any(traced))
+    files = {}
+    for input_path, ok, seconds, detail, _ in results:
+        name = os.path.relpath(input_path, input_dir)
+        if ok and "metrics" in detail:
+            combined.merge(translation_metrics.TranslationMetrics.from_dict(detail["metrics"]))
+            files[name] = dict(detail["metrics"], ok=True, seconds=seconds)
+        else:
+            files[name] = {"ok": False, "seconds": seconds}
+    combined.total = {"wallSeconds": wall, "cpuSeconds": sum(s["cpuSeconds"] for s in combined.stages.values()),
+                      "peakBytes": translation_metrics.max_peak(*(s["peakBytes"] for s in combined.stages.values()))}
+    if show_profile:
+        combined.report()
+    if metrics_path:
+        combined.write(metrics_path, input=input_dir, mode="batch", files=files)
+        print(f"Metrics written to {metrics_path}")
+
+
+def _print_result(result, input_dir, width):
+    input_path, ok, seconds, detail, log = result
+    name = os.path.relpath(input_path, input_dir)
+    if ok:
+        warnings = f", {detail['unknown']} unknown effect/property" if detail["unknown"] else ""
+        print(f"  [OK]   {name:<{width}}  {seconds * 1000:8.1f} ms  ({detail['compositions']} comps{warnings})")
+    else:
+        print(f"  [FAIL] {name:<{width}}  {seconds * 1000:8.1f} ms  {detail}")
+        if log.strip():
+            print("         " + log.strip().replace("\n", "\n         "), file=sys.stderr)
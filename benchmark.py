@@ -0,0 +1,745 @@
+# benchmark.py
+#
+# Description: Performance benchmarks for the AIGEN toolchain.
+# Usage: python benchmark.py manifest [--repeat N]
+#        python benchmark.py scaling [--axis AXIS] [--scales 1,2,4,8] [--base key=N,...]
+#                                    [--output RESULTS.json] [--compare OLD.json]
+#        python benchmark.py output [BLUEPRINT.json] [--scale N] [--repeat N]
+#        python benchmark.py startup [--repeat N]
+#        python benchmark.py template [--template T.aigen] [--rows N] [--jobs N]
+#        python benchmark.py diff [BLUEPRINT.json] [--scale N] [--repeat N]
+#        python benchmark.py model [PROJECT.json] [--scale N] [--repeat N]
+#
+# 'scaling' translates synthetic projects (synthetic_project.py) of growing
+# size, times every translator stage plus the JSON -> AIGEN conversion, and
+# fits a growth exponent per stage: ~1 is linear, clearly above 1 is where
+# the pipeline turns superlinear. Results are saved as JSON; pass an older
+# results file to --compare to see regressions between versions.
+#
+# 'output' writes one blueprint (a synthetic one by default) in every output
+# format and compares serialize time and size with plain json.dump(indent=2).
+#
+# 'startup' runs 'aigen.py --help', 'aigen.py translate --help' and a small
+# translation in fresh interpreters, and exits with 1 when one of them takes
+# longer than its budget above bare interpreter start-up, or imports a heavy
+# dependency it doesn't need.
+#
+# 'template' renders a template for N generated rows (template_batch.py) and
+# compares its throughput with writing an AIGEN file per row and translating
+# it; the first rows of both must produce the same blueprints.
+#
+# 'diff' diffs a blueprint against an identical copy, a copy with a few
+# edits and one with a reordered layer stack (project_diff.py), next to the
+# plain recursive walk roundtrip_check.py uses, and checks what it finds.
+#
+# 'model' loads a project JSON (a synthetic blueprint by default) as plain
+# dicts and as the slotted project model (project_model.py), fully parsed
+# and lazily opened, compares their memory (tracemalloc) and load times,
+# times parsing one composition on first access, and checks that the model
+# gives back exactly the data it was parsed from.
+#
+
+import argparse
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import manifest_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIR, "effects_manifest.json")
+
+# A handful of lookups, roughly what a typical blueprint touches.
+SAMPLE_EFFECTS = ["Transform", "Slider Control", "Glow", "Motion Tile", "Fill", "Gaussian Blur"]
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(label, samples):
+    print(f"  {label:<28} median {statistics.median(samples) * 1000:9.3f} ms"
+          f"   min {min(samples) * 1000:9.3f} ms   ({len(samples)} runs)")
+    return {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000, "runs": len(samples)}
+
+
+def bench_manifest(manifest_path, repeat):
+    """Compares plain json.load against cold and warm compiled-cache loads."""
+    cache_path = os.path.join(SCRIPT_DIR, manifest_cache.CACHE_DIRNAME, "benchmark.mcache")
+
+    def json_path():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        for name in SAMPLE_EFFECTS:
+            manifest.get(name)
+
+    def cold_path():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        manifest = manifest_cache.load_manifest(manifest_path, cache_path)
+        for name in SAMPLE_EFFECTS:
+            manifest.get(name)
+        manifest.close()
+
+    def warm_path():
+        manifest = manifest_cache.load_manifest(manifest_path, cache_path)
+        for name in SAMPLE_EFFECTS:
+            manifest.get(name)
+        manifest.close()
+
+    print(f"Manifest: {manifest_path} ({os.path.getsize(manifest_path) / 1024:.0f} KiB)")
+    results = {
+        "json_load": _report("json.load (current)", _timed(json_path, repeat)),
+        "compiled_cold": _report("compiled cache, cold", _timed(cold_path, repeat)),
+        "compiled_warm": _report("compiled cache, warm", _timed(warm_path, repeat)),
+    }
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    speedup = results["json_load"]["median_ms"] / max(results["compiled_warm"]["median_ms"], 1e-9)
+    print(f"  Warm speedup over json.load: {speedup:.1f}x")
+    return results
+
+
+SCALING_FORMAT = 1
+SCALING_AXES = ("compositions", "layers", "effects", "keyframes", "components", "globals", "images")
+# Base project for the sweep: small enough that the largest scale still finishes in minutes.
+SCALING_BASE = {"compositions": 4, "layers": 10, "effects": 2, "keyframes": 8, "components": 4, "globals": 10,
+                "images": 4}
+SUPERLINEAR = 1.2     # growth exponents above this are flagged
+MIN_FIT_MS = 5.0      # stages faster than this at the largest scale are too noisy to fit
+REGRESSION = 1.25     # --compare flags stages this much slower than before...
+MIN_COMPARE_MS = 20.0  # ...if they take at least this long
+
+
+def _version():
+    """Commit of the tree being measured (None outside a git checkout)."""
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True,
+                             text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def growth_exponent(scales, times):
+    """Least-squares slope of log(time) over log(scale): 1 = linear, 2 = quadratic."""
+    points = [(math.log(x), math.log(t)) for x, t in zip(scales, times) if x > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def _scaled_size(base, axis, scale):
+    return dict(base, **{axis: base[axis] * scale})
+
+
+def _run_scale(manifest_index, size, repeat, stream, memory, work_dir):
+    """Times one project size; returns {stage: median seconds} plus the translation counts."""
+    import synthetic_project
+    from aigen_to_json_translator import TranslationOptions, translate_file
+    from json_to_aigen import convert_json_to_aigen
+
+    project = os.path.join(work_dir, "synthetic.aigen")
+    blueprint = os.path.join(work_dir, "synthetic.json")
+    reverse = os.path.join(work_dir, "synthetic-re.aigen")
+    synthetic_project.write_project(project, manifest_index, size)
+    options = TranslationOptions(stream=stream, profile=True, profile_memory=memory)
+    samples, peaks, counts = {}, {}, {}
+    for _ in range(repeat):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            summary = translate_file(project, blueprint, manifest_index, options)
+            start = time.perf_counter()
+            ok = convert_json_to_aigen(blueprint, reverse)
+            reverse_time = time.perf_counter() - start
+        if not ok:
+            raise RuntimeError(f"JSON -> AIGEN conversion failed for {blueprint}")
+        metrics = summary["metrics"]
+        for stage, record in metrics["stages"].items():
+            samples.setdefault(stage, []).append(record["wallSeconds"])
+            if memory:
+                peaks[stage] = max(peaks.get(stage, 0), record["peakBytes"])
+        samples.setdefault("translate total", []).append(metrics["total"]["wallSeconds"])
+        samples.setdefault("json_to_aigen", []).append(reverse_time)
+        counts = metrics["counts"]
+    result = {"size": size, "inputBytes": os.path.getsize(project), "outputBytes": os.path.getsize(blueprint),
+              "counts": counts, "seconds": {stage: statistics.median(t) for stage, t in samples.items()}}
+    if memory:
+        result["peakBytes"] = peaks
+    return result
+
+
+def _print_scaling(results):
+    runs = results["runs"]
+    stages = list(dict.fromkeys(stage for run in runs for stage in run["seconds"]))
+    print(f"  {'stage':<16}" + "".join(f"{'x' + str(run['scale']):>11}" for run in runs) + f"{'exponent':>10}")
+    for stage in stages:
+        cells = "".join(f"{run['seconds'].get(stage, 0) * 1000:9.1f}ms" for run in runs)
+        exponent = results["exponents"].get(stage)
+        if exponent is None:
+            note = f"{'-':>10}"
+        else:
+            note = f"{exponent:10.2f}" + ("  <- superlinear" if exponent > SUPERLINEAR else "")
+        print(f"  {stage:<16}{cells}{note}")
+    print(f"  {'keyframes':<16}" + "".join(f"{run['counts'].get('keyframes', 0):>11}" for run in runs))
+    print(f"  {'input KiB':<16}" + "".join(f"{run['inputBytes'] / 1024:>11.0f}" for run in runs))
+
+
+def compare_scaling(results, previous):
+    """Prints the stages that got slower than in 'previous' (same settings and scales). Returns their count."""
+    settings = ("axis", "base", "stream", "memory")
+    different = [key for key in settings if previous.get(key) != results[key]]
+    if different:
+        print(f"Not comparable with {previous.get('version') or 'unknown version'}: "
+              f"different {', '.join(different)}.")
+        return 0
+    old_runs = {run["scale"]: run for run in previous.get("runs", [])}
+    regressions = 0
+    print(f"Compared with {previous.get('version') or 'unknown version'} ({previous.get('date', '?')}):")
+    for run in results["runs"]:
+        old = old_runs.get(run["scale"])
+        if old is None:
+            continue
+        for stage, seconds in run["seconds"].items():
+            before = old["seconds"].get(stage)
+            if not before or max(seconds, before) * 1000 < MIN_COMPARE_MS:
+                continue
+            ratio = seconds / before
+            if ratio > REGRESSION:
+                regressions += 1
+                print(f"  x{run['scale']:<4} {stage:<16} {before * 1000:9.1f} ms -> {seconds * 1000:9.1f} ms"
+                      f"  ({ratio:.2f}x slower)")
+    if not regressions:
+        print(f"  No stage is more than {REGRESSION:.2f}x slower.")
+    return regressions
+
+
+def bench_scaling(manifest_path, axis, scales, base, repeat, stream=False, memory=False, keep_dir=None):
+    """Translates synthetic projects of growing size; returns the results dict (see --output)."""
+    manifest = manifest_cache.load_manifest(manifest_path)
+    manifest_index = manifest_cache.ManifestIndex(manifest)
+    work_dir = keep_dir or tempfile.mkdtemp(prefix="aigen-scaling-")
+    print(f"Scaling sweep: axis '{axis}', scales {', '.join(map(str, scales))}, {repeat} run(s) each"
+          f"{', streaming' if stream else ''}{', tracing memory' if memory else ''}")
+    print("  base: " + ", ".join(f"{k} {v}" for k, v in base.items()))
+    runs = []
+    try:
+        for scale in scales:
+            scale_dir = os.path.join(work_dir, f"x{scale}")
+            os.makedirs(scale_dir, exist_ok=True)
+            start = time.perf_counter()
+            run = _run_scale(manifest_index, _scaled_size(base, axis, scale), repeat, stream, memory, scale_dir)
+            run["scale"] = scale
+            runs.append(run)
+            print(f"  x{scale}: done in {time.perf_counter() - start:.1f} s")
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"  Projects kept in {keep_dir}")
+        if hasattr(manifest, "close"):
+            manifest.close()
+
+    exponents = {}
+    for stage in dict.fromkeys(stage for run in runs for stage in run["seconds"]):
+        points = [(run["scale"], run["seconds"][stage]) for run in runs if stage in run["seconds"]]
+        if len(points) < 2 or points[-1][1] * 1000 < MIN_FIT_MS:
+            exponents[stage] = None
+            continue
+        exponents[stage] = growth_exponent([x for x, _ in points], [t for _, t in points])
+    results = {
+        "format": SCALING_FORMAT,
+        "version": _version(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "axis": axis,
+        "base": base,
+        "stream": stream,
+        "memory": memory,
+        "repeat": repeat,
+        "runs": runs,
+        "exponents": exponents,
+    }
+    _print_scaling(results)
+    return results
+
+
+def _files_size(paths):
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def _synthetic_blueprint(manifest_path, scale, work_dir):
+    """Translates a synthetic project with 'scale' times the scaling base's compositions; returns its path."""
+    import synthetic_project
+    from aigen_to_json_translator import TranslationOptions, translate_file
+    manifest = manifest_cache.load_manifest(manifest_path)
+    manifest_index = manifest_cache.ManifestIndex(manifest)
+    project = os.path.join(work_dir, "synthetic.aigen")
+    blueprint_path = os.path.join(work_dir, "synthetic.json")
+    size = dict(SCALING_BASE, compositions=SCALING_BASE["compositions"] * scale)
+    synthetic_project.write_project(project, manifest_index, size)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        translate_file(project, blueprint_path, manifest_index, TranslationOptions())
+    if hasattr(manifest, "close"):
+        manifest.close()
+    return blueprint_path
+
+
+def bench_output(manifest_path, blueprint_path, scale, repeat):
+    """Serialize time and size of every output format against json.dump(indent=2)."""
+    import aigen_stream
+
+    work_dir = tempfile.mkdtemp(prefix="aigen-output-")
+    try:
+        if blueprint_path is None:
+            blueprint_path = _synthetic_blueprint(manifest_path, scale, work_dir)
+        with open(blueprint_path, 'r', encoding='utf-8') as f:
+            blueprint = json.load(f)
+        print(f"Output formats: {len(blueprint.get('compositions') or [])} compositions, "
+              f"encoder {'orjson' if aigen_stream.orjson is not None else 'json'}, {repeat} run(s) each")
+
+        out = os.path.join(work_dir, "out.json")
+
+        def baseline():
+            with open(out, 'w', encoding='utf-8') as f:
+                json.dump(blueprint, f, indent=2)
+            return [out]
+
+        def layout(output_format, gzip=False):
+            def run():
+                writer = aigen_stream.write_blueprint(out, blueprint, output_format)
+                paths = [out] + writer.files
+                if not gzip:
+                    return paths
+                aigen_stream.write_gzip_sidecars(paths)
+                return [f"{path}.gz" for path in paths]
+            return run
+
+        cases = [("json.dump indent=2", baseline)]
+        cases += [(output_format, layout(output_format)) for output_format in aigen_stream.OUTPUT_FORMATS]
+        cases += [(f"{output_format} + gzip", layout(output_format, True))
+                  for output_format in aigen_stream.OUTPUT_FORMATS]
+        results, reference = {}, None
+        for label, fn in cases:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                paths = fn()
+                samples.append(time.perf_counter() - start)
+            median = statistics.median(samples)
+            reference = reference or median
+            results[label] = {"median_ms": median * 1000, "bytes": _files_size(paths), "files": len(paths)}
+            print(f"  {label:<22} median {median * 1000:9.1f} ms  ({reference / median:4.1f}x)"
+                  f"   {_files_size(paths) / 1e6:8.2f} MB in {len(paths)} file(s)")
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _diff_cases(blueprint):
+    """(label, edited copy, expected differences by kind) for the diff benchmark."""
+    import copy
+    comps = [comp for comp in blueprint.get("compositions") or [] if len(comp.get("layers") or []) > 1]
+    edited = copy.deepcopy(blueprint)
+    edits = 0
+    for comp in (edited["compositions"][i] for i in sorted({0, len(edited["compositions"]) // 2, -1})):
+        comp["duration"] = comp.get("duration", 0) + 1
+        edits += 1
+    reordered = copy.deepcopy(blueprint)
+    cases = [("identical copy", copy.deepcopy(blueprint), {}),
+             (f"{edits} values changed", edited, {"changed": edits})]
+    if comps:
+        target = next(comp for comp in reordered["compositions"] if comp.get("name") == comps[0].get("name"))
+        target["layers"].reverse()
+        cases.append(("one layer stack reversed", reordered, {"reordered": 1}))
+    return cases
+
+
+def bench_diff(manifest_path, blueprint_path, scale, repeat):
+    """Merkle diff (project_diff.py) against a plain recursive walk; returns False if a diff is wrong."""
+    import project_diff
+    import roundtrip_check
+
+    work_dir = tempfile.mkdtemp(prefix="aigen-diff-")
+    try:
+        if blueprint_path is None:
+            blueprint_path = _synthetic_blueprint(manifest_path, scale, work_dir)
+        blueprint = project_diff.load_json(blueprint_path)
+        print(f"Project diff: {os.path.getsize(blueprint_path) / 1e6:.2f} MB blueprint, "
+              f"{len(blueprint.get('compositions') or [])} compositions, {repeat} run(s) each")
+        ok = True
+        for label, other, expected in _diff_cases(blueprint):
+            walk = _timed(lambda: roundtrip_check.compare(blueprint, other), repeat)
+            differs = []
+
+            def merkle():
+                differ = project_diff.ProjectDiff()
+                differ.compare(blueprint, other)
+                differs.append(differ)
+            merkle_samples = _timed(merkle, repeat)
+            found = differs[-1].summary()["byKind"]
+            check = "ok" if found == expected else f"WRONG: {found}"
+            ok = ok and found == expected
+            print(f"  {label:<26} walk {statistics.median(walk) * 1000:8.1f} ms   merkle "
+                  f"{statistics.median(merkle_samples) * 1000:8.1f} ms   "
+                  f"({differs[-1].skipped} subtrees skipped)  {check}")
+        return ok
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _traced(build):
+    """(result, bytes still allocated by 'build' once it has returned)."""
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def _parse_all(project):
+    """Turns every layer property and keyframe list of a lazily opened project into model objects."""
+    import project_model
+
+    def touch(prop):
+        prop.keyframes
+        for child in (prop.children or {}).values():
+            touch(child)
+
+    for comp in project.compositions or []:
+        if not isinstance(comp, project_model.Composition):
+            continue
+        for layer in comp.layers or []:
+            if not isinstance(layer, project_model.Layer):
+                continue
+            for prop in (layer.properties if isinstance(layer.properties, dict) else {}).values():
+                touch(prop)
+            effects = layer.effects.values() if isinstance(layer.effects, dict) else layer.effects or []
+            for effect in effects:
+                props = effect.properties if isinstance(effect, project_model.Effect) else None
+                for prop in props.values() if isinstance(props, dict) else props or []:
+                    touch(prop[1] if type(prop) is tuple else prop)
+    return project
+
+
+def bench_model(manifest_path, project_path, scale, repeat):
+    """Project model (fully parsed and lazy) against plain dicts; returns False if a round trip differs."""
+    import project_model
+
+    def load_dicts():
+        """The project as json.load gives it, with the compositions of a chunked blueprint read in."""
+        with open(project_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data["compositions"] = [project_model.load_chunk(project_path, comp["chunk"])
+                                if isinstance(comp, dict) and "chunk" in comp else comp
+                                for comp in data.get("compositions") or []]
+        return data
+
+    def open_lazy():
+        return project_model.Project.open(project_path)
+
+    work_dir = tempfile.mkdtemp(prefix="aigen-model-")
+    try:
+        if project_path is None:
+            project_path = _synthetic_blueprint(manifest_path, scale, work_dir)
+        data, dict_bytes = _traced(load_dicts)
+        project, model_bytes = _traced(lambda: _parse_all(open_lazy()))
+        _, lazy_bytes = _traced(open_lazy)
+        comps = [comp for comp in project.compositions or [] if isinstance(comp, project_model.Composition)]
+        layers = [layer for comp in comps for layer in comp.layers or [] if isinstance(layer, project_model.Layer)]
+        print(f"Project model: {os.path.getsize(project_path) / 1e6:.2f} MB JSON, {len(comps)} compositions, "
+              f"{len(layers)} layers, {repeat} run(s) each")
+        print(f"  memory: dicts {dict_bytes / 1e6:.1f} MB   model {model_bytes / 1e6:.1f} MB "
+              f"({model_bytes / max(dict_bytes, 1):.2f} of dicts)   lazy {lazy_bytes / 1e6:.1f} MB "
+              f"({lazy_bytes / max(dict_bytes, 1):.2f} of dicts)")
+        _report("json.load (dicts)", _timed(load_dicts, repeat))
+        _report("model, all parsed", _timed(lambda: _parse_all(open_lazy()), repeat))
+        _report("model, lazy open", _timed(open_lazy, repeat))
+        if comps:
+            target = project.compositions.index(comps[len(comps) // 2])
+            samples = []
+            for _ in range(repeat):
+                comp = open_lazy().compositions[target]
+                start = time.perf_counter()
+                comp.layers
+                samples.append(time.perf_counter() - start)
+            _report("one composition, 1st use", samples)
+        same = project.to_dict() == data
+        print(f"  round trip: {'exact' if same else 'DIFFERS'}")
+        return same
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# (label, aigen.py arguments, budget in ms above 'python -c pass', modules it must not import)
+STARTUP_CASES = [
+    ("aigen --help", ["--help"], 75, ("yaml", "numpy", "PIL", "manifest_cache", "multiprocessing")),
+    ("aigen translate --help", ["translate", "--help"], 120, ("yaml", "numpy", "PIL", "manifest_cache",
+                                                              "multiprocessing")),
+    ("translate small file", ["translate", os.path.join(SCRIPT_DIR, "examples", "yaml", "ProgressBar-test.aigen"),
+                              "{out}"], 300, ("numpy", "PIL", "multiprocessing")),
+]
+
+# Runs aigen.py with the given arguments and writes the names of the imported modules to a file.
+_IMPORTS_PROBE = """
+import json, runpy, sys
+out, sys.argv = sys.argv[1], [sys.argv[2]] + sys.argv[3:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+with open(out, "w") as f:
+    json.dump(sorted(sys.modules), f)
+"""
+
+
+def _run_quiet(command):
+    subprocess.run(command, cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+
+
+def bench_startup(repeat):
+    """Start-up time of aigen.py commands in fresh interpreters; returns True if all are within budget."""
+    work_dir = tempfile.mkdtemp(prefix="aigen-startup-")
+    aigen = os.path.join(SCRIPT_DIR, "aigen.py")
+    out = os.path.join(work_dir, "out.json")
+    try:
+        if sys.dont_write_bytecode:
+            print("Note: PYTHONDONTWRITEBYTECODE is set, so every run compiles the modules from source.")
+        baseline = statistics.median(_timed(lambda: _run_quiet([sys.executable, "-c", "pass"]), repeat))
+        print(f"Start-up, {repeat} run(s) each; bare interpreter {baseline * 1000:.1f} ms")
+        ok = True
+        for label, arguments, budget_ms, forbidden in STARTUP_CASES:
+            arguments = [argument.format(out=out) for argument in arguments]
+            _run_quiet([sys.executable, aigen] + arguments)  # warm-up (bytecode, manifest cache)
+            median = statistics.median(_timed(lambda: _run_quiet([sys.executable, aigen] + arguments), repeat))
+            overhead_ms = (median - baseline) * 1000
+            modules_path = os.path.join(work_dir, "modules.json")
+            _run_quiet([sys.executable, "-c", _IMPORTS_PROBE, modules_path, aigen] + arguments)
+            with open(modules_path, 'r', encoding='utf-8') as f:
+                imported = {name.split(".")[0] for name in json.load(f)}
+            unexpected = [name for name in forbidden if name in imported]
+            within = overhead_ms <= budget_ms and not unexpected
+            ok = ok and within
+            print(f"  {label:<24} median {median * 1000:7.1f} ms  (+{overhead_ms:6.1f} ms, budget {budget_ms} ms)"
+                  f"  {'ok' if within else 'OVER BUDGET' if not unexpected else 'imports ' + ', '.join(unexpected)}")
+        return ok
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+TEMPLATE_SLOTS = ("Main Title", "Label 1", "Label 2")  # text layers of the default template
+
+
+def bench_template(manifest_path, template_path, rows, jobs, baseline_rows):
+    """Template mode blueprints/s against one full translation per row; returns False on a mismatch."""
+    import yaml
+    import template_batch
+    from aigen_to_json_translator import TranslationOptions, translate_file
+
+    manifest = manifest_cache.load_manifest(manifest_path)
+    manifest_index = manifest_cache.ManifestIndex(manifest)
+    work_dir = tempfile.mkdtemp(prefix="aigen-template-")
+    try:
+        columns = [f"text.{name}" for name in TEMPLATE_SLOTS]
+        rows_path = os.path.join(work_dir, "rows.csv")
+        with open(rows_path, 'w', encoding='utf-8') as f:
+            f.write(",".join(["name"] + columns) + "\n")
+            for i in range(rows):
+                f.write(",".join([f"row_{i:06d}"] + [f"{name} #{i}" for name in TEMPLATE_SLOTS]) + "\n")
+        print(f"Template mode: {os.path.basename(template_path)} x {rows} rows, {len(columns)} text slots")
+
+        # Today's workflow: an AIGEN file per row, each translated in full.
+        with open(template_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        full_dir = os.path.join(work_dir, "full")
+        os.makedirs(full_dir)
+        count = min(baseline_rows, rows)
+        start = time.perf_counter()
+        for number, row in template_batch.read_rows(rows_path):
+            if number > count:
+                break
+            data = yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+            for column in columns:
+                template_batch.place_slot(data, column, "text", column[len("text."):], row[column])
+            # Next to the template, so relative asset paths resolve the same way
+            aigen_path = os.path.join(os.path.dirname(os.path.abspath(template_path)), f".bench_{row['name']}.aigen")
+            try:
+                with open(aigen_path, 'w', encoding='utf-8') as f:
+                    yaml.dump(data, f, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper), sort_keys=False)
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                        contextlib.redirect_stderr(devnull):
+                    translate_file(aigen_path, os.path.join(full_dir, f"{row['name']}.json"), manifest_index,
+                                   TranslationOptions(image_jobs=1))
+            finally:
+                os.remove(aigen_path)
+        full_rate = count / (time.perf_counter() - start)
+        print(f"  {'AIGEN file + translate':<28} {full_rate:9.0f} blueprints/s  ({count} rows)")
+
+        ok = True
+        for job_count in sorted({1, jobs}):
+            out_dir = os.path.join(work_dir, f"template_{job_count}")
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                    contextlib.redirect_stderr(devnull):
+                summary = template_batch.render_rows(template_path, rows_path, out_dir, job_count,
+                                                     manifest_index=manifest_index)
+            rate = summary["blueprintsPerSecond"]
+            print(f"  {f'template, {job_count} worker(s)':<28} {rate:9.0f} blueprints/s  ({summary['written']} rows, "
+                  f"pre-translate {summary['pretranslateSeconds'] * 1000:.0f} ms, {rate / full_rate:.0f}x)")
+            for name in sorted(os.listdir(full_dir)):
+                with open(os.path.join(full_dir, name), 'r', encoding='utf-8') as a, \
+                        open(os.path.join(out_dir, name), 'r', encoding='utf-8') as b:
+                    if json.load(a) != json.load(b):
+                        print(f"  MISMATCH: {name} differs from the full translation")
+                        ok = False
+        return ok
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if hasattr(manifest, "close"):
+            manifest.close()
+
+
+def _parse_base(text):
+    base = dict(SCALING_BASE)
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        key, _, value = item.partition("=")
+        if key not in base or not value.isdigit():
+            raise argparse.ArgumentTypeError(f"expected key=N with key in {', '.join(base)}, got '{item}'")
+        base[key] = int(value)
+    return base
+
+
+def _parse_scales(text):
+    try:
+        scales = sorted({int(part) for part in text.split(",") if part.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got '{text}'")
+    if not scales or scales[0] < 1:
+        raise argparse.ArgumentTypeError("scales must be positive integers")
+    return scales
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIGEN toolchain benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_manifest = sub.add_parser("manifest", help="Manifest load: json.load vs compiled cache.")
+    p_manifest.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    p_manifest.add_argument("--repeat", type=int, default=20)
+
+    p_scaling = sub.add_parser("scaling", help="Stage timings over synthetic projects of growing size.")
+    p_scaling.add_argument("--axis", choices=SCALING_AXES, default="compositions",
+                           help="Size to multiply by the scales (default: compositions).")
+    p_scaling.add_argument("--scales", type=_parse_scales, default=[1, 2, 4, 8],
+                           help="Comma-separated multipliers of the base size (default: 1,2,4,8).")
+    p_scaling.add_argument("--base", type=_parse_base, default=dict(SCALING_BASE),
+                           help="Base size as key=N pairs, e.g. 'layers=20,keyframes=30'.")
+    p_scaling.add_argument("--repeat", type=int, default=3)
+    p_scaling.add_argument("--stream", action="store_true", help="Use the streaming translator.")
+    p_scaling.add_argument("--memory", action="store_true",
+                           help="Also record peak memory per stage (tracemalloc slows the pure-Python stages).")
+    p_scaling.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    p_scaling.add_argument("--output", default="scaling_results.json",
+                           help="Results file (default: scaling_results.json).")
+    p_scaling.add_argument("--compare", default=None, metavar="OLD.json",
+                           help="Earlier results to compare against; exits with 1 on regressions.")
+    p_scaling.add_argument("--keep", default=None, metavar="DIR",
+                           help="Write the generated projects to DIR and keep them.")
+
+    p_output = sub.add_parser("output", help="Serialize time and size per output format vs json.dump(indent=2).")
+    p_output.add_argument("blueprint", nargs="?", default=None,
+                          help="Blueprint JSON to re-serialize (default: a synthetic project's).")
+    p_output.add_argument("--scale", type=int, default=8,
+                          help="Synthetic project: multiple of the scaling base's compositions (default: 8).")
+    p_output.add_argument("--repeat", type=int, default=5)
+    p_output.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+    p_diff = sub.add_parser("diff", help="Merkle project diff vs a plain recursive walk.")
+    p_diff.add_argument("blueprint", nargs="?", default=None,
+                        help="Blueprint or export JSON to diff against edited copies (default: a synthetic one).")
+    p_diff.add_argument("--scale", type=int, default=8,
+                        help="Synthetic project: multiple of the scaling base's compositions (default: 8).")
+    p_diff.add_argument("--repeat", type=int, default=5)
+    p_diff.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+    p_model = sub.add_parser("model", help="Project model memory and load time vs plain dicts.")
+    p_model.add_argument("project", nargs="?", default=None,
+                         help="Export or blueprint JSON to load (default: a synthetic blueprint).")
+    p_model.add_argument("--scale", type=int, default=8,
+                         help="Synthetic project: multiple of the scaling base's compositions (default: 8).")
+    p_model.add_argument("--repeat", type=int, default=5)
+    p_model.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+    p_startup = sub.add_parser("startup", help="aigen.py start-up time against fixed budgets (exits 1 if over).")
+    p_startup.add_argument("--repeat", type=int, default=5)
+    p_startup.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+    p_template = sub.add_parser("template", help="Template mode throughput vs one translation per row.")
+    p_template.add_argument("--template", default=os.path.join(SCRIPT_DIR, "examples", "yaml",
+                                                              "ProgressBar-test.aigen"))
+    p_template.add_argument("--rows", type=int, default=5000)
+    p_template.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    p_template.add_argument("--baseline-rows", type=int, default=100,
+                            help="Rows translated in full for the comparison (default: 100).")
+    p_template.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+    args = parser.parse_args()
+    if not os.path.exists(args.manifest):
+        print(f"Manifest not found: {args.manifest}", file=sys.stderr)
+        sys.exit(1)
+    if args.command == "manifest":
+        bench_manifest(args.manifest, args.repeat)
+    elif args.command == "template":
+        sys.exit(0 if bench_template(args.manifest, args.template, max(args.rows, 1), max(args.jobs, 1),
+                                     max(args.baseline_rows, 1)) else 1)
+    elif args.command == "startup":
+        sys.exit(0 if bench_startup(max(args.repeat, 1)) else 1)
+    elif args.command == "diff":
+        sys.exit(0 if bench_diff(args.manifest, args.blueprint, max(args.scale, 1), max(args.repeat, 1)) else 1)
+    elif args.command == "model":
+        sys.exit(0 if bench_model(args.manifest, args.project, max(args.scale, 1), max(args.repeat, 1)) else 1)
+    elif args.command == "output":
+        bench_output(args.manifest, args.blueprint, max(args.scale, 1), max(args.repeat, 1))
+    elif args.command == "scaling":
+        previous = None
+        if args.compare:
+            try:
+                with open(args.compare, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Cannot read {args.compare}: {e}", file=sys.stderr)
+                sys.exit(1)
+        results = bench_scaling(args.manifest, args.axis, args.scales, args.base, max(args.repeat, 1),
+                                args.stream, args.memory, args.keep)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+        if previous is not None and compare_scaling(results, previous):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# component_engine.py
+#
+# Description: 'useComponents' expansion for AIGEN documents.
+# Each component is flattened once (including components that use other
+# components) and cached. Targets are merged with structural sharing: only
+# the dicts along merged paths are new, every other subtree is shared with
+# the component. Treat expanded output as read-only and copy before mutating.
+#
+# A component is any mapping with an 'id'. Everything except 'id' and
+# 'useComponents' is its body, which is deep-merged underneath the target
+# (target values win, lists are replaced, not concatenated). Components can
+# be used by compositions, layers and effects.
+#
+
+import sys
+from collections.abc import MutableMapping
+
+COMPONENT_META_KEYS = ("id", "useComponents")
+
+
+def overlay(base, override):
+    """Non-mutating deep merge of 'override' onto 'base': nested dicts merge, anything else is replaced."""
+    if not base:
+        return override
+    merged = dict(base)
+    for k, v in override.items():
+        current = merged.get(k)
+        if isinstance(current, dict) and isinstance(v, MutableMapping):
+            merged[k] = overlay(current, v)
+        else:
+            merged[k] = v
+    return merged
+
+
+class ComponentEngine:
+    def __init__(self, components):
+        self.components = {}
+        for comp in components or []:
+            if isinstance(comp, dict) and "id" in comp:
+                self.components[comp["id"]] = comp
+        self.used = set()  # ids applied since the caller last cleared it
+        self._flat = {}
+        self._stack = []
+        self._warned = set()
+
+    def __bool__(self):
+        return bool(self.components)
+
+    def _warn_once(self, key, message):
+        if key not in self._warned:
+            self._warned.add(key)
+            print(f"Warning: {message}", file=sys.stderr)
+
+    def flatten(self, comp_id):
+        """Returns the component body with its own 'useComponents' merged in (memoized)."""
+        if comp_id in self._flat:
+            return self._flat[comp_id]
+        if comp_id not in self.components:
+            self._warn_once(comp_id, f"Component '{comp_id}' not found.")
+            return None
+        if comp_id in self._stack:
+            chain = " -> ".join(self._stack[self._stack.index(comp_id):] + [comp_id])
+            self._warn_once(chain, f"Circular component reference: {chain}")
+            return None
+
+        component = self.components[comp_id]
+        body = {k: v for k, v in component.items() if k not in COMPONENT_META_KEYS}
+        self._stack.append(comp_id)
+        try:
+            base = self._combine(component.get("useComponents", []))
+        finally:
+            self._stack.pop()
+        flat = overlay(base, body)
+        self._flat[comp_id] = flat
+        return flat
+
+    def _combine(self, comp_ids):
+        merged = {}
+        for comp_id in comp_ids or []:
+            self.used.add(comp_id)
+            flat = self.flatten(comp_id)
+            if flat:
+                merged = overlay(merged, flat)
+        return merged
+
+    def apply(self, target):
+        """Returns 'target' with its 'useComponents' merged underneath it (or 'target' itself)."""
+        if not isinstance(target, dict) or "useComponents" not in target:
+            return target
+        base = self._combine(target["useComponents"])
+        # Keep the target's own key order; keys only the components provide go last.
+        merged = {}
+        for k, v in target.items():
+            if k == "useComponents":
+                continue
+            current = base.get(k)
+            if isinstance(current, dict) and isinstance(v, MutableMapping):
+                merged[k] = overlay(current, v)
+            else:
+                merged[k] = v
+        for k, v in base.items():
+            if k not in merged:
+                merged[k] = v
+        return merged
+
+    def _apply_all(self, items, expand_item):
+        rebuilt = None
+        for i, item in enumerate(items):
+            expanded = expand_item(item)
+            if expanded is not item:
+                if rebuilt is None:
+                    rebuilt = list(items)
+                rebuilt[i] = expanded
+        return items if rebuilt is None else rebuilt
+
+    def expand_layer(self, layer_data):
+        layer = self.apply(layer_data)
+        effects = layer.get("effects") if isinstance(layer, dict) else None
+        if isinstance(effects, list):
+            expanded = self._apply_all(effects, self.apply)
+            if expanded is not effects:
+                layer = dict(layer) if layer is layer_data else layer
+                layer["effects"] = expanded
+        return layer
+
+    def expand_composition(self, comp_data):
+        """Applies composition-, layer- and effect-level components. The input is not modified."""
+        comp = self.apply(comp_data)
+        layers = comp.get("layers")
+        if isinstance(layers, list):
+            expanded = self._apply_all(layers, self.expand_layer)
+            if expanded is not layers:
+                comp = dict(comp) if comp is comp_data else comp
+                comp["layers"] = expanded
+        return comp
@@ -0,0 +1,137 @@
+# composition_dedup.py
+#
+# Description: Structural deduplication of compositions (--dedup).
+# Compositions are hashed Merkle-style: every layer subtree is hashed from
+# its canonical JSON (sorted keys), and a composition's hash combines its
+# own settings (everything but its name) with its layer hashes. Pre-comp
+# references are rewired to the first composition of their kind before
+# hashing, so a composition nesting a duplicate hashes like one nesting the
+# original, and whole nested trees collapse together.
+#
+# The first composition with a given hash is kept and translated as usual.
+# Every later one becomes a wrapper: the same name, size, duration and
+# markers, holding a single Pre-comp layer of the kept composition, which
+# renders identically. Later Pre-comp layers that pointed at a duplicate
+# point at the kept composition directly. Compositions are processed in
+# file order, one at a time, so this works while streaming; duplicates are
+# never translated and After Effects builds their layers only once.
+#
+# A composition is never wrapped when an expression could reach into it by
+# name: its own layers mention the name, or an expression anywhere in the
+# file calls comp("Name") with a literal name. The raw file is scanned for
+# those calls before the first composition is processed, since components
+# and later compositions can hold them too. Names that expressions build at
+# run time (variables, concatenation, globals) are not seen; leave --dedup
+# off for such projects.
+#
+
+import hashlib
+import json
+import re
+
+REF_KEYS = ("refId", "source")
+COMP_CALL = re.compile(rb"""comp\(\s*\\?(["'])(.*?)\\?\1\s*\)""")  # quotes may be escaped in YAML/JSON
+
+
+def _digest(value):
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _mentions(node, text):
+    """True if any string below 'node' contains 'text' (e.g. an expression naming the composition)."""
+    if isinstance(node, str):
+        return text in node
+    if isinstance(node, dict):
+        return any(_mentions(v, text) for v in node.values())
+    if isinstance(node, list):
+        return any(_mentions(v, text) for v in node)
+    return False
+
+
+def expression_references(path):
+    """Names of the compositions that comp("...") calls in the file name literally."""
+    names = set()
+    with open(path, 'rb') as f:
+        for line in f:
+            if b"comp(" in line:
+                names.update(m.group(2).decode("utf-8", "replace") for m in COMP_CALL.finditer(line))
+    return names
+
+
+class CompositionDeduplicator:
+    """Replaces structurally identical compositions with wrappers around the first one."""
+
+    def __init__(self, referenced=()):
+        self.referenced = set(referenced)  # composition names expressions reach by comp("...")
+        self.canonical = {}  # composition hash -> name of the kept composition
+        self.renamed = {}    # duplicate name -> kept name
+        self.duplicates = 0
+        self.layers_saved = 0
+        self.layer_hashes = {}  # layer hash -> times seen in kept compositions (for the report)
+
+    def _rewire(self, comp_data):
+        """Points Pre-comp layers at kept compositions instead of duplicates (copy-on-write)."""
+        layers = comp_data.get("layers")
+        if not self.renamed or not isinstance(layers, list):
+            return comp_data
+        rebuilt = None
+        for i, layer in enumerate(layers):
+            if not isinstance(layer, dict) or layer.get("type") != "Pre-comp":
+                continue
+            for key in REF_KEYS:
+                target = self.renamed.get(layer.get(key)) if isinstance(layer.get(key), str) else None
+                if target is not None:
+                    if rebuilt is None:
+                        rebuilt = list(layers)
+                    if rebuilt[i] is layer:
+                        rebuilt[i] = dict(layer)
+                    rebuilt[i][key] = target
+        if rebuilt is None:
+            return comp_data
+        comp_data = dict(comp_data)
+        comp_data["layers"] = rebuilt
+        return comp_data
+
+    @staticmethod
+    def layer_hashes_of(comp_data):
+        layers = comp_data.get("layers") if isinstance(comp_data.get("layers"), list) else []
+        return [_digest(layer) for layer in layers]
+
+    @staticmethod
+    def composition_hash(comp_data, layer_hashes):
+        """Merkle hash of a composition without its name, from its settings and layer hashes."""
+        settings = {k: v for k, v in comp_data.items() if k not in ("name", "layers")}
+        return _digest([settings, layer_hashes])
+
+    def wrapper(self, comp_data, kept_name):
+        """A composition with the same settings holding one Pre-comp layer of 'kept_name'."""
+        wrapper = {k: v for k, v in comp_data.items() if k != "layers"}
+        wrapper["layers"] = [{"name": kept_name, "type": "Pre-comp", "refId": kept_name}]
+        return wrapper
+
+    def process(self, comp_data):
+        """Returns the composition to translate: itself (rewired) or a wrapper when it is a duplicate."""
+        comp_data = self._rewire(comp_data)
+        name = comp_data.get("name")
+        if not isinstance(name, str) or not name or name in self.referenced \
+                or _mentions(comp_data.get("layers"), name):
+            return comp_data  # expressions could depend on the name or on its layers
+        layer_hashes = self.layer_hashes_of(comp_data)
+        comp_hash = self.composition_hash(comp_data, layer_hashes)
+        kept = self.canonical.get(comp_hash)
+        if kept is None or kept == name:
+            self.canonical.setdefault(comp_hash, name)
+            for h in layer_hashes:
+                self.layer_hashes[h] = self.layer_hashes.get(h, 0) + 1
+            return comp_data
+        self.renamed[name] = kept
+        self.duplicates += 1
+        self.layers_saved += len(comp_data.get("layers") or [])
+        return self.wrapper(comp_data, kept)
+
+    def report(self):
+        repeated = sum(count - 1 for count in self.layer_hashes.values() if count > 1)
+        print(f"Deduplication: {self.duplicates} duplicate composition(s) wrapped around "
+              f"{len(set(self.renamed.values()))} shared one(s), {self.layers_saved} layers not rebuilt "
+              f"({repeated} identical layers remain in distinct compositions)")
@@ -0,0 +1,539 @@
+# expression_baking.py
+#
+# Description: Offline expression baking. Live expressions are a major cost
+# of previews and renders in After Effects; this stage recognizes a small
+# subset, evaluates it with NumPy at every composition frame of the layer
+# (in point to out point) and replaces the expression with keyframes:
+#
+#   wiggle(freq, amp[, octaves, amp_mult, t])   fractal value noise added to the value
+#   loopOut([type, numKeyframes])                cycle, pingpong, offset or continue
+#   linear/ease/easeIn/easeOut(t, ...)           remaps, 3- and 5-argument forms
+#   valueAtTime(t)                               the property's own value at another time
+#
+# combined with numbers, [vectors], time, value, inPoint, outPoint,
+# thisComp.frameDuration/duration, Math.* functions, clamp() and + - * / %.
+# An optional leading seedRandom(n) statement picks the wiggle seed; without
+# it the seed comes from the composition, layer and property names, so the
+# baked noise is the same on every run. ease() uses a smoothstep curve.
+#
+# loopOut keeps the authored keyframes (and their easing) and repeats them up
+# to the out point. Everything else is sampled; reading 'value' needs linear
+# (uneased) keyframes or a static value. Expressions outside the subset stay
+# live, as do expressions on time-stretched layers and on properties whose
+# value is not numeric (e.g. Source Text), which keep their value untouched.
+#
+# Self-test: python expression_baking.py   (bakes CHECK_CASES, exits 1 on a failure)
+#
+
+import ast
+import math
+import sys
+import zlib
+
+import numpy as np
+
+from keyframe_columns import composition_markers, layer_timing, resolve_seconds
+
+MAX_LOOP_KEYFRAMES = 100000
+LOOP_TYPES = ("cycle", "pingpong", "offset", "continue")
+_MASK64 = (1 << 64) - 1
+
+# (description, property, baked?): each property is baked on a one-second layer at 10 fps.
+CHECK_CASES = [
+    ("wiggle on a numeric value", {"value": [0, 0], "expression": "wiggle(2, 10)"}, True),
+    ("remap of time", {"value": 0, "expression": "linear(time, 0, 1, 0, 100)"}, True),
+    ("Source Text stays live", {"value": {"text": "Hello", "fontSize": 48},
+                                "expression": "Math.round(time*10)"}, False),
+]
+
+
+class UnsupportedExpression(Exception):
+    pass
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _numeric_vector(value):
+    """The value as a 1-D float array, or None if it isn't a number or a list of numbers."""
+    if _is_number(value):
+        return np.array([float(value)])
+    if isinstance(value, list) and value and all(map(_is_number, value)):
+        return np.array(value, dtype=float)
+    return None
+
+
+def _hash_uniform(keys, seed):
+    """Deterministic uniform numbers in [-1, 1) for integer lattice keys (splitmix64)."""
+    z = keys.astype(np.int64).view(np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15) & _MASK64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * (2.0 / (1 << 53)) - 1.0
+
+
+def value_noise(x, seed):
+    """1-D value noise in [-1, 1]: random lattice values joined by a smootherstep curve."""
+    cell = np.floor(x)
+    f = x - cell
+    fade = f * f * f * (f * (f * 6 - 15) + 10)
+    return _hash_uniform(cell, seed) * (1 - fade) + _hash_uniform(cell + 1, seed) * fade
+
+
+def wiggle_noise(t, freq, amp, octaves, amp_mult, dims, seed):
+    """(n, dims) noise like wiggle(): 'octaves' layers, each at twice the frequency and amp_mult the amplitude."""
+    noise = np.zeros((len(t), dims))
+    for d in range(dims):
+        for octave in range(octaves):
+            octave_seed = zlib.crc32(f"{seed}/{d}/{octave}".encode("utf-8"))
+            noise[:, d] += value_noise(t * freq * 2 ** octave, octave_seed) * amp_mult ** octave
+    return noise * amp
+
+
+def _remap(t, args, shape):
+    """linear()/ease() with the 3-argument (0..1) or 5-argument form."""
+    if len(args) == 3:
+        t_min, t_max, v1, v2 = 0.0, 1.0, args[1], args[2]
+    elif len(args) == 5:
+        t_min, t_max, v1, v2 = args[1:]
+    else:
+        raise UnsupportedExpression("linear/ease take 3 or 5 arguments")
+    if not isinstance(t_min, float) or not isinstance(t_max, float):
+        raise UnsupportedExpression("linear/ease bounds must be constant")
+    if t_max == t_min:
+        fraction = np.where(t >= t_max, 1.0, 0.0) + 0 * t
+    else:
+        fraction = np.clip((t - t_min) / (t_max - t_min), 0.0, 1.0)
+    fraction = shape(fraction)
+    return v1 + (v2 - v1) * fraction
+
+
+_REMAPS = {
+    "linear": lambda f: f,
+    "ease": lambda f: f * f * (3 - 2 * f),
+    "easeIn": lambda f: f * f,
+    "easeOut": lambda f: 1 - (1 - f) * (1 - f),
+}
+
+_MATH = {
+    "abs": np.abs, "sin": np.sin, "cos": np.cos, "tan": np.tan, "asin": np.arcsin, "acos": np.arccos,
+    "atan": np.arctan, "atan2": np.arctan2, "sqrt": np.sqrt, "exp": np.exp, "log": np.log,
+    "floor": np.floor, "ceil": np.ceil, "pow": np.power, "min": np.minimum, "max": np.maximum,
+    # Math.round rounds halves up, unlike np.round.
+    "round": lambda x: np.floor(np.asarray(x) + 0.5),
+}
+
+_OPERATORS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide,
+    ast.Mod: np.fmod,  # JavaScript '%' keeps the dividend's sign
+}
+
+
+class _Evaluator:
+    """Evaluates a parsed expression over all sample times at once. Values are floats or (n, d) arrays."""
+
+    def __init__(self, times, sampler, timing, seed):
+        self.times = times[:, None]
+        self.sampler = sampler  # comp times (n,) -> (n, d) pre-expression values
+        self.timing = timing  # name -> seconds (inPoint, outPoint, frameDuration, ...)
+        self.seed = seed
+
+    def column(self, value):
+        if isinstance(value, float):
+            return np.full((len(self.times), 1), value)
+        return value
+
+    def scalar(self, value, what):
+        if not isinstance(value, float):
+            raise UnsupportedExpression(f"{what} must be a constant number")
+        return value
+
+    def evaluate(self, node):
+        if isinstance(node, ast.Expression):
+            return self.evaluate(node.body)
+        if isinstance(node, ast.Constant) and _is_number(node.value):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            if node.id == "time":
+                return self.times
+            if node.id == "value":
+                return self.sampler(self.times[:, 0])
+            if node.id in self.timing:
+                return self.timing[node.id]
+            raise UnsupportedExpression(f"unsupported name '{node.id}'")
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            owner, attr = node.value.id, node.attr
+            if owner == "Math" and attr in ("PI", "E"):
+                return getattr(math, "pi" if attr == "PI" else "e")
+            if owner in ("thisComp", "thisLayer") and f"{owner}.{attr}" in self.timing:
+                return self.timing[f"{owner}.{attr}"]
+            raise UnsupportedExpression(f"unsupported attribute '{owner}.{attr}'")
+        if isinstance(node, ast.Attribute):
+            raise UnsupportedExpression("references to other layers or properties")
+        if isinstance(node, ast.List):
+            if not node.elts:
+                raise UnsupportedExpression("empty array")
+            parts = [self.column(self.evaluate(e)) for e in node.elts]
+            if any(p.shape[1] != 1 for p in parts):
+                raise UnsupportedExpression("nested arrays")
+            return np.hstack(parts)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self.evaluate(node.operand)
+            return -operand if isinstance(node.op, ast.USub) else operand
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            left, right = self.evaluate(node.left), self.evaluate(node.right)
+            if isinstance(left, np.ndarray) and isinstance(right, np.ndarray) \
+                    and 1 not in (left.shape[1], right.shape[1]) and left.shape[1] != right.shape[1]:
+                raise UnsupportedExpression("vector sizes differ")
+            result = _OPERATORS[type(node.op)](left, right)
+            return float(result) if np.ndim(result) == 0 else result
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        raise UnsupportedExpression(f"unsupported syntax '{type(node).__name__}'")
+
+    def call(self, node):
+        if node.keywords:
+            raise UnsupportedExpression("named arguments")
+        func = node.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "Math":
+            if func.attr not in _MATH:
+                raise UnsupportedExpression(f"unsupported function 'Math.{func.attr}'")
+            result = _MATH[func.attr](*[self.evaluate(a) for a in node.args])
+            return float(result) if np.ndim(result) == 0 else result
+        if not isinstance(func, ast.Name):
+            raise UnsupportedExpression("references to other layers or properties")
+        name = func.id
+        args = [self.evaluate(a) for a in node.args]
+        if name in _REMAPS:
+            return _remap(self.column(args[0]) if args else None, args, _REMAPS[name])
+        if name == "clamp" and len(args) == 3:
+            return np.clip(self.column(args[0]), args[1], args[2])
+        if name == "valueAtTime" and len(args) == 1:
+            t = self.column(args[0])
+            if t.shape[1] != 1:
+                raise UnsupportedExpression("valueAtTime takes a time")
+            return self.sampler(t[:, 0])
+        if name == "wiggle" and 2 <= len(args) <= 5:
+            freq = self.scalar(args[0], "wiggle frequency")
+            amp = self.scalar(args[1], "wiggle amplitude")
+            octaves = int(self.scalar(args[2], "wiggle octaves")) if len(args) > 2 else 1
+            amp_mult = self.scalar(args[3], "wiggle amp_mult") if len(args) > 3 else 0.5
+            t = self.column(args[4]) if len(args) > 4 else self.times
+            base = self.sampler(t[:, 0])
+            return base + wiggle_noise(t[:, 0], freq, amp, max(octaves, 1), amp_mult, base.shape[1], self.seed)
+        raise UnsupportedExpression(f"unsupported function '{name}'")
+
+
+def parse_expression(text):
+    """Returns (seed or None, parsed expression, loopOut arguments or None); raises UnsupportedExpression."""
+    statements = [s.strip() for s in text.replace("\r", "").replace("\n", ";").split(";") if s.strip()]
+    seed = None
+    if len(statements) == 2:
+        try:
+            call = ast.parse(statements[0], mode="eval").body
+        except SyntaxError:
+            raise UnsupportedExpression("statements other than seedRandom(n)")
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id == "seedRandom"
+                and 1 <= len(call.args) <= 2 and isinstance(call.args[0], ast.Constant)
+                and _is_number(call.args[0].value)):
+            raise UnsupportedExpression("statements other than seedRandom(n)")
+        if len(call.args) == 2 and not (isinstance(call.args[1], ast.Name) and call.args[1].id == "false"):
+            raise UnsupportedExpression("timeless seedRandom")
+        seed = int(call.args[0].value)
+        statements = statements[1:]
+    if len(statements) != 1:
+        raise UnsupportedExpression("multiple statements")
+    try:
+        tree = ast.parse(statements[0], mode="eval")
+    except SyntaxError:
+        raise UnsupportedExpression("not a plain expression")
+
+    body = tree.body
+    if isinstance(body, ast.Call) and isinstance(body.func, ast.Name) and body.func.id == "loopOut":
+        params = {}
+        for position, arg in enumerate(body.args):
+            params[("type", "numKeyframes")[min(position, 1)]] = arg
+        for keyword in body.keywords:
+            params[keyword.arg] = keyword.value
+        loop_type = params.get("type")
+        loop_type = loop_type.value if isinstance(loop_type, ast.Constant) else "cycle" if loop_type is None else None
+        count = params.get("numKeyframes")
+        count = count.value if isinstance(count, ast.Constant) else 0 if count is None else None
+        if loop_type not in LOOP_TYPES or not isinstance(count, int) or len(body.args) > 2 \
+                or not params.keys() <= {"type", "numKeyframes"}:
+            raise UnsupportedExpression("unsupported loopOut() arguments")
+        return seed, None, (loop_type, count)
+    return seed, tree, None
+
+
+def _linear_keyframes(keyframes):
+    """(times, (n, d) values) of plain numeric keyframes, or None if any key is eased, timed by a marker, etc."""
+    times, values = [], []
+    for kf in keyframes:
+        if not isinstance(kf, dict) or not kf.keys() <= {"time", "value"} or not _is_number(kf.get("time")):
+            return None
+        vector = _numeric_vector(kf.get("value"))
+        if vector is None or (values and len(vector) != len(values[0])):
+            return None
+        times.append(float(kf["time"]))
+        values.append(vector)
+    order = np.argsort(times, kind="stable")
+    return np.array(times)[order], np.array(values)[order]
+
+
+def _value_sampler(prop, in_point):
+    """Returns (sampler, dims, is_vector): sampler maps comp times to the property's pre-expression values."""
+    keyframes = prop.get("keyframes")
+    if isinstance(keyframes, list) and keyframes:
+        linear = _linear_keyframes(keyframes)
+        if linear is None:
+            def unsupported(t):
+                raise UnsupportedExpression("'value' of eased or non-numeric keyframes")
+            return unsupported, None, None
+        key_times, key_values = linear
+        key_times = key_times + in_point
+
+        def sample(t):
+            return np.column_stack([np.interp(t, key_times, key_values[:, d]) for d in range(key_values.shape[1])])
+        return sample, key_values.shape[1], isinstance(keyframes[0].get("value"), list)
+
+    static = _numeric_vector(prop.get("value"))
+    if static is None:
+        def missing(t):
+            raise UnsupportedExpression("'value' is not numeric")
+        return missing, None, None
+    return (lambda t: np.tile(static, (len(t), 1))), len(static), isinstance(prop.get("value"), list)
+
+
+def loop_keyframes(keyframes, loop_type, count, end):
+    """The keyframes repeated per loopOut(loop_type, count) until they pass 'end' (layer time)."""
+    for kf in keyframes:
+        if not isinstance(kf, dict) or "value" not in kf or not _is_number(kf.get("time")):
+            raise UnsupportedExpression("loopOut needs numeric keyframe times")
+    keys = sorted(keyframes, key=lambda kf: kf["time"])
+    if len(keys) < 2:
+        raise UnsupportedExpression("loopOut needs two or more keyframes")
+    segment = keys[-(count + 1):] if 0 < count < len(keys) - 1 else keys
+    first, last = segment[0], segment[-1]
+    period = float(last["time"]) - float(first["time"])
+    if period <= 0:
+        raise UnsupportedExpression("loopOut over a zero-length range")
+    cycles = int(math.ceil((end - float(last["time"])) / period))
+    if cycles <= 0:
+        return list(keyframes)
+    if cycles * len(segment) > MAX_LOOP_KEYFRAMES:
+        raise UnsupportedExpression("too many loop cycles")
+
+    if loop_type == "continue":
+        a, b = _numeric_vector(keys[-2]["value"]), _numeric_vector(last["value"])
+        if a is None or b is None or len(a) != len(b) or "inEase" in last or "outEase" in last:
+            raise UnsupportedExpression("loopOut('continue') needs a linear numeric last segment")
+        slope = (b - a) / (float(last["time"]) - float(keys[-2]["time"]))
+        value = b + slope * (end - float(last["time"]))
+        value = round(float(value[0]), 4) if _is_number(last["value"]) else np.round(value, 4).tolist()
+        return list(keys) + [{"time": round(end, 9), "value": value}]
+
+    if loop_type == "cycle" and first["value"] != last["value"]:
+        raise UnsupportedExpression("loopOut('cycle') between different first and last values")
+    shift = None
+    if loop_type == "offset":
+        a, b = _numeric_vector(first["value"]), _numeric_vector(last["value"])
+        if a is None or b is None or len(a) != len(b):
+            raise UnsupportedExpression("loopOut('offset') needs numeric values")
+        shift = b - a
+
+    start = float(first["time"])
+    looped = list(keys)
+    for cycle in range(1, cycles + 1):
+        mirrored = loop_type == "pingpong" and cycle % 2 == 1
+        sources = segment[-2::-1] if mirrored else segment[1:]
+        for kf in sources:
+            offset = float(kf["time"]) - start
+            time = start + (cycle + 1) * period - offset if mirrored else start + cycle * period + offset
+            key = {"time": round(time, 9), "value": kf["value"]}
+            if shift is not None:
+                value = _numeric_vector(kf["value"]) + shift * cycle
+                key["value"] = round(float(value[0]), 4) if _is_number(kf["value"]) else np.round(value, 4).tolist()
+            # A mirrored key is approached from the other side: its eases swap.
+            for ease_key, source_key in (("inEase", "outEase"), ("outEase", "inEase")) if mirrored \
+                    else (("inEase", "inEase"), ("outEase", "outEase")):
+                if source_key in kf:
+                    key[ease_key] = kf[source_key]
+            looped.append(key)
+    return looped
+
+
+class ExpressionBaker:
+    """Replaces supported expressions in a composition with keyframes (copy-on-write) and keeps totals."""
+
+    def __init__(self):
+        self.found = 0
+        self.baked = 0
+        self.keyframes = 0
+        self.reasons = {}
+
+    def _collect(self, node, path, found):
+        if isinstance(node, dict):
+            if isinstance(node.get("expression"), str):
+                found.append((path, node))
+                return found
+            for k, v in node.items():
+                if isinstance(v, (dict, list)):
+                    self._collect(v, f"{path}/{k}", found)
+        elif isinstance(node, list):
+            for i, v in enumerate(node):
+                if isinstance(v, (dict, list)):
+                    self._collect(v, f"{path}[{i}]", found)
+        return found
+
+    def _replace(self, node, baked):
+        if isinstance(node, dict):
+            if id(node) in baked:
+                return baked[id(node)]
+            rebuilt = None
+            for k, v in node.items():
+                if isinstance(v, (dict, list)):
+                    new = self._replace(v, baked)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = dict(node)
+                        rebuilt[k] = new
+            return node if rebuilt is None else rebuilt
+        if isinstance(node, list):
+            rebuilt = None
+            for i, v in enumerate(node):
+                if isinstance(v, (dict, list)):
+                    new = self._replace(v, baked)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = list(node)
+                        rebuilt[i] = new
+            return node if rebuilt is None else rebuilt
+        return node
+
+    def bake_property(self, prop, times, in_point, timing, seed):
+        """Returns the keyframes for one property's expression; raises UnsupportedExpression."""
+        random_seed, tree, loop = parse_expression(prop["expression"])
+        if random_seed is not None:
+            seed = zlib.crc32(str(random_seed).encode("utf-8"))
+        if loop is not None:
+            keyframes = prop.get("keyframes")
+            if not isinstance(keyframes, list):
+                raise UnsupportedExpression("loopOut without keyframes")
+            return loop_keyframes(keyframes, loop[0], loop[1], timing["outPoint"] - in_point)
+
+        sampler, dims, is_vector = _value_sampler(prop, in_point)
+        if dims is None and ("value" in prop or "keyframes" in prop):
+            raise UnsupportedExpression("non-numeric property")
+        with np.errstate(all="ignore"):
+            result = _Evaluator(times, sampler, timing, seed).evaluate(tree)
+        result = np.broadcast_to(result, (len(times), 1)) if isinstance(result, float) else result
+        if dims is not None and result.shape[1] not in (1, dims):
+            raise UnsupportedExpression("result size differs from the property")
+        if not np.all(np.isfinite(result)):
+            raise UnsupportedExpression("result is not finite")
+        rel_times = np.round(times - in_point, 9).tolist()
+        values = np.round(result, 4)
+        if result.shape[1] == 1 and not is_vector:
+            values = values[:, 0].tolist()
+        else:
+            values = np.broadcast_to(values, (len(times), dims or values.shape[1])).tolist()
+        return [{"time": t, "value": v} for t, v in zip(rel_times, values)]
+
+    def bake(self, comp_data):
+        comp_name = comp_data.get("name")
+        fps = resolve_seconds(comp_data.get("frameRate", 30), {}) or 30.0
+        duration = resolve_seconds(comp_data.get("duration"), {})
+        markers = composition_markers(comp_data)
+        layers = comp_data.get("layers") or []
+        new_layers = None
+        for position, layer in enumerate(layers):
+            if not isinstance(layer, dict):
+                continue
+            found = self._collect(layer, "", [])
+            if not found:
+                continue
+            self.found += len(found)
+            timing = layer_timing(layer, markers)
+            out_point = resolve_seconds(layer["outPoint"], markers) if "outPoint" in layer else duration
+            if timing is None or out_point is None:
+                self._skip("unresolved layer timing", len(found))
+                continue
+            in_point, scale = timing
+            if scale != 1.0:
+                self._skip("time-stretched layer", len(found))
+                continue
+            first = int(math.ceil(in_point * fps - 1e-9))
+            last = int(math.ceil(out_point * fps - 1e-9))
+            times = np.arange(first, last) / fps
+            if not len(times):
+                self._skip("empty layer range", len(found))
+                continue
+            layer_values = {"inPoint": in_point, "outPoint": out_point, "thisLayer.inPoint": in_point,
+                            "thisLayer.outPoint": out_point, "thisComp.frameDuration": 1.0 / fps,
+                            "thisComp.duration": duration if duration is not None else out_point}
+
+            baked = {}
+            for path, prop in found:
+                seed = zlib.crc32(f"{comp_name}/{layer.get('name')}{path}".encode("utf-8"))
+                try:
+                    keyframes = self.bake_property(prop, times, in_point, layer_values, seed)
+                except UnsupportedExpression as e:
+                    self._skip(str(e))
+                    continue
+                except (TypeError, ValueError, IndexError, FloatingPointError):
+                    self._skip("evaluation error")
+                    continue
+                replaced = {k: v for k, v in prop.items() if k not in ("expression", "value", "keyframes")}
+                replaced["keyframes"] = keyframes
+                baked[id(prop)] = replaced
+                self.baked += 1
+                self.keyframes += len(keyframes)
+            if baked:
+                if new_layers is None:
+                    new_layers = list(layers)
+                new_layers[position] = self._replace(layer, baked)
+        if new_layers is None:
+            return comp_data
+        baked_comp = dict(comp_data)
+        baked_comp["layers"] = new_layers
+        return baked_comp
+
+    def _skip(self, reason, count=1):
+        self.reasons[reason] = self.reasons.get(reason, 0) + count
+
+    def report(self):
+        if not self.found:
+            return
+        live = self.found - self.baked
+        print(f"Expression baking: baked {self.baked} of {self.found} expressions into {self.keyframes} keyframes"
+              + (f"; {live} left live" if live else ""))
+        for reason, count in sorted(self.reasons.items(), key=lambda item: -item[1]):
+            print(f"  {count} x {reason}")
+
+
+def check_cases():
+    """Returns a list of failed CHECK_CASES (baked when it should stay live, or the other way round)."""
+    failures = []
+    for description, prop, should_bake in CHECK_CASES:
+        comp = {"name": "Check", "frameRate": 10, "duration": 1,
+                "layers": [{"name": "Layer", "inPoint": 0, "outPoint": 1, "properties": {"Check": dict(prop)}}]}
+        baked = ExpressionBaker().bake(comp)["layers"][0]["properties"]["Check"]
+        if should_bake and ("expression" in baked or not baked.get("keyframes")):
+            failures.append(f"{description}: left live")
+        elif not should_bake and baked != prop:
+            failures.append(f"{description}: changed to {baked!r}")
+    return failures
+
+
+def main():
+    failures = check_cases()
+    for failure in failures:
+        print(f"  [FAIL] {failure}")
+    print(f"Expression baking: {len(CHECK_CASES) - len(failures)} of {len(CHECK_CASES)} case(s) as expected.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
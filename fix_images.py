@@ -1,24 +1,64 @@
+import argparse
 import os
-from PIL import Image
+import shutil
 
-image_dir = r"e:\Python\Data\images"
+import image_pipeline
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+image_dir = os.path.join(SCRIPT_DIR, "Data", "images")
 files = ["TechBG.png", "Nature.png", "City.png", "Logo.png"]
 
-print(f"Checking images in {image_dir}...")
-
-for filename in files:
-    path = os.path.join(image_dir, filename)
-    if os.path.exists(path):
-        try:
-            print(f"Processing {filename}...")
-            # Open the image
-            with Image.open(path) as img:
-                # Force convert to RGBA to ensure consistency
-                img = img.convert("RGBA")
-                # Save it back as PNG, overwriting the original
-                img.save(path, "PNG")
-            print(f"Successfully fixed {filename}")
-        except Exception as e:
-            print(f"Failed to process {filename}: {e}")
-    else:
-        print(f"File not found: {filename}")
+
+def collect_images(targets):
+    """Expands directories into the images they contain."""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            for entry in sorted(os.listdir(target)):
+                if image_pipeline.is_image_path(entry):
+                    paths.append(os.path.join(target, entry))
+        elif os.path.exists(target):
+            paths.append(target)
+        else:
+            print(f"File not found: {target}")
+    return paths
+
+
+def add_arguments(parser):
+    parser.add_argument("targets", nargs="*", help="Image files or directories (default: the Data/images set).")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for re-encoding.")
+    parser.add_argument("--in-place", action="store_true", default=True,
+                        help="Deprecated, does nothing: overwriting the originals is the default again "
+                             "(see --keep-originals).")
+    parser.add_argument("--keep-originals", dest="in_place", action="store_false",
+                        help="Leave the originals untouched and print where the fixed copies are cached.")
+
+
+def run(args, parser):
+    targets = args.targets or [os.path.join(image_dir, filename) for filename in files]
+    paths = collect_images(targets)
+    print(f"Checking {len(paths)} image(s)...")
+
+    results = image_pipeline.fix_images(paths, jobs=args.jobs)
+    for path in paths:
+        fixed = results[path]
+        if fixed == path:
+            print(f"Failed to process {os.path.basename(path)}")
+            continue
+        fixed_local = fixed.replace('\\', os.sep)
+        if args.in_place and os.path.abspath(fixed_local) != os.path.abspath(path):
+            # Overwriting changes the source hash, so the next run sniffs it as RGBA and skips it.
+            shutil.copyfile(fixed_local, path)
+            print(f"Successfully fixed {os.path.basename(path)}")
+        else:
+            print(f"{os.path.basename(path)} -> {fixed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert images to RGBA PNG using the shared image pipeline.")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
+
+
+if __name__ == "__main__":
+    main()
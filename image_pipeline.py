@@ -0,0 +1,169 @@
+# image_pipeline.py
+#
+# Description: Content-addressed image fixing engine.
+# Images are hashed and their RGBA PNG re-encodes are stored under
+# 'changed/<sha256 prefix>/<name>.png', so an unchanged source is never
+# re-encoded. Files that already are 8-bit RGBA PNGs are detected from the
+# IHDR header (no decode) and used as they are. Everything else is
+# converted in a process pool.
+#
+
+import hashlib
+import os
+import struct
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHANGED_DIR = os.path.join(SCRIPT_DIR, "changed")
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_RGBA = 6
+DIGEST_PREFIX = 16
+
+# (path, mtime_ns, size, changed_dir) -> plan, so long-running processes don't re-hash unchanged images.
+_plans = {}
+
+
+def is_image_path(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def sniff_png(path):
+    """Returns (width, height, bit_depth, color_type) from the IHDR chunk, or None if not a PNG."""
+    with open(path, 'rb') as f:
+        head = f.read(29)
+    if len(head) < 29 or not head.startswith(PNG_SIGNATURE) or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">IIBB", head[16:26])
+
+
+def is_rgba8_png(path):
+    header = sniff_png(path)
+    return header is not None and header[2] == 8 and header[3] == PNG_COLOR_RGBA
+
+
+def ae_path(path):
+    # Absolute path using backslashes for Windows/AE compatibility
+    return os.path.abspath(path).replace(os.sep, '\\')
+
+
+def cached_fix_path(digest, image_path, changed_dir=CHANGED_DIR):
+    name, _ = os.path.splitext(os.path.basename(image_path))
+    return os.path.join(changed_dir, digest[:DIGEST_PREFIX], f"{name}.png")
+
+
+def _find_cached(digest, changed_dir):
+    bucket = os.path.join(changed_dir, digest[:DIGEST_PREFIX])
+    if os.path.isdir(bucket):
+        for entry in sorted(os.listdir(bucket)):
+            if entry.endswith(".png"):
+                return os.path.join(bucket, entry)
+    return None
+
+
+def _encode_rgba(src, dest):
+    """Worker: converts 'src' to RGBA and writes it atomically to 'dest'."""
+    from PIL import Image
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    with Image.open(src) as img:
+        img.convert("RGBA").save(tmp, "PNG")
+    os.replace(tmp, dest)
+    return dest
+
+
+def plan_image(image_path, changed_dir=CHANGED_DIR):
+    """
+    Decides what to do with one image without decoding it.
+    Returns (action, path) where action is 'skip', 'cached' or 'encode'.
+    """
+    st = os.stat(image_path)
+    key = (image_path, st.st_mtime_ns, st.st_size, changed_dir)
+    plan = _plans.get(key)
+    if plan and os.path.exists(plan[1]):
+        return plan
+    if is_rgba8_png(image_path):
+        plan = "skip", image_path
+    else:
+        digest = file_digest(image_path)
+        cached = _find_cached(digest, changed_dir)
+        if not cached:
+            return "encode", cached_fix_path(digest, image_path, changed_dir)
+        plan = "cached", cached
+    _plans[key] = plan
+    return plan
+
+
+def fix_images(image_paths, jobs=None, changed_dir=CHANGED_DIR, stats=None):
+    """
+    Fixes a batch of images. Returns {source path: AE-ready path}; failed
+    images map to their original path. If 'stats' is a dict, the number of
+    images fixed, reused from the cache, skipped and failed is added to it.
+    """
+    stats = {} if stats is None else stats
+    results = {}
+    pending = {}
+    for image_path in dict.fromkeys(image_paths):
+        try:
+            action, target = plan_image(image_path, changed_dir)
+        except OSError as e:
+            print(f"  [Auto-Fix Error] Could not process {image_path}: {e}")
+            results[image_path] = image_path
+            stats["imagesFailed"] = stats.get("imagesFailed", 0) + 1
+            continue
+        if action == "skip":
+            print(f"  [Auto-Fix] Already an 8-bit RGBA PNG, using as is: {image_path}")
+            results[image_path] = ae_path(image_path)
+            stats["imagesSkipped"] = stats.get("imagesSkipped", 0) + 1
+        elif action == "cached":
+            print(f"  [Auto-Fix] Unchanged, reusing: {target}")
+            results[image_path] = ae_path(target)
+            stats["imagesReused"] = stats.get("imagesReused", 0) + 1
+        else:
+            pending[image_path] = target
+
+    if not pending:
+        return results
+
+    if len(pending) == 1 or jobs == 1:
+        outcomes = {}
+        for src, dest in pending.items():
+            try:
+                outcomes[src] = _encode_rgba(src, dest)
+            except Exception as e:
+                outcomes[src] = e
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {src: pool.submit(_encode_rgba, src, dest) for src, dest in pending.items()}
+            outcomes = {}
+            for src, future in futures.items():
+                try:
+                    outcomes[src] = future.result()
+                except Exception as e:
+                    outcomes[src] = e
+
+    for src, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            print(f"  [Auto-Fix Error] Could not process {src}: {outcome}")
+            results[src] = src
+            stats["imagesFailed"] = stats.get("imagesFailed", 0) + 1
+        else:
+            print(f"  [Auto-Fix] Image saved to: {outcome}")
+            results[src] = ae_path(outcome)
+            stats["imagesFixed"] = stats.get("imagesFixed", 0) + 1
+    return results
+
+
+def fix_image(image_path, changed_dir=CHANGED_DIR):
+    """Single-image convenience wrapper around fix_images."""
+    return fix_images([image_path], jobs=1, changed_dir=changed_dir)[image_path]
+
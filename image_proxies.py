@@ -0,0 +1,277 @@
+# image_proxies.py
+#
+# Description: Resolution-aware proxies for image assets (--proxies).
+# The largest on-screen scale of every image is worked out offline: the
+# Footage layer's Transform.Scale (the maximum over its keyframes), times a
+# Transform effect's Scale Height/Width, times the scale of its parent
+# layers, times the scale of the Pre-comp layers showing its composition, up
+# to a composition that is not nested anywhere. An image that is never shown
+# at more than MAX_PROXY_SHARE of its pixel size gets a proxy downscaled to
+# what it needs (rounded up to PROXY_STEP pixels); the builder attaches it
+# with FootageItem.setProxy, so After Effects previews use the small file
+# and the original stays available for the final render. Scales that can't
+# be known offline (expressions, audio specs, circular pre-comps) keep the
+# image at full resolution.
+# Proxies are cached by the source's content hash and the target size under
+# 'changed/proxies/' and resized in a process pool.
+#
+
+import math
+import os
+
+import image_pipeline
+
+PROXY_DIR = os.path.join(image_pipeline.CHANGED_DIR, "proxies")
+MAX_PROXY_SHARE = 0.75  # images needed at more than this share of their size are used as they are
+PROXY_STEP = 16         # proxy long sides are rounded up to a multiple of this
+TRANSFORM_EFFECTS = ("Transform", "ADBE Geometry2")
+
+# (path, mtime_ns, size) -> sha256 hex, so long-running processes don't re-hash unchanged images.
+_digests = {}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _largest(value):
+    """Largest absolute component of a scale value (number or [x, y(, z)]), None if not numeric."""
+    if _is_number(value):
+        return abs(value)
+    if isinstance(value, list) and len(value) >= 2 and all(_is_number(v) for v in value[:2]):
+        return max(abs(value[0]), abs(value[1]))
+    return None
+
+
+def max_scale(prop, default=100.0):
+    """Largest scale percentage a property ever takes, or None when it can't be known offline."""
+    if prop is None:
+        return default
+    if not isinstance(prop, dict) or prop.get("expression") or "audio" in prop:
+        return None
+    keyframes = prop.get("keyframes")
+    if isinstance(keyframes, dict):  # compact run: {start, step, values}
+        values = keyframes.get("values") or []
+    elif isinstance(keyframes, list):
+        values = [kf.get("value") if isinstance(kf, dict) else None for kf in keyframes]
+    elif "values" in prop:  # columnar
+        values = prop["values"]
+    elif "value" in prop:
+        values = [prop["value"]]
+    else:
+        return default
+    largest = [_largest(v) for v in values]
+    if not largest or None in largest:
+        return None
+    return max(largest)
+
+
+def _effect_scale(layer):
+    """Extra scale factor from Transform effects on the layer (1.0 without any), None if unknown."""
+    factor = 1.0
+    for effect in layer.get("effects") or []:
+        if not isinstance(effect, dict):
+            continue
+        if effect.get("type") not in TRANSFORM_EFFECTS and effect.get("matchName") not in TRANSFORM_EFFECTS:
+            continue
+        props = effect.get("properties") or {}
+        height = max_scale(props.get("Scale Height"))
+        width = height
+        uniform = props.get("Uniform Scale")
+        if isinstance(uniform, dict) and uniform.get("value") == 0:
+            width = max_scale(props.get("Scale Width"))
+        if height is None or width is None:
+            return None
+        factor *= max(height, width) / 100.0
+    return factor
+
+
+def image_size(path):
+    """(width, height) from the file header, or None if it can't be read."""
+    header = image_pipeline.sniff_png(path)
+    if header is not None:
+        return header[0], header[1]
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def proxy_size(size, share):
+    """Target (width, height) for an image needed at 'share' of its size, or None if no proxy is worth it."""
+    if share is None or share > MAX_PROXY_SHARE:
+        return None
+    width, height = size
+    long_side = max(width, height)
+    target = min(long_side, max(PROXY_STEP, int(math.ceil(long_side * share / PROXY_STEP)) * PROXY_STEP))
+    if target > long_side * MAX_PROXY_SHARE:
+        return None
+    ratio = target / long_side
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+class ProxyPlanner:
+    """Collects the scales images are shown at, one composition at a time (works with streaming)."""
+
+    def __init__(self, assets):
+        self.images = {asset.get("id") for asset in assets or []
+                       if isinstance(asset, dict) and image_pipeline.is_image_path(asset.get("path", ""))}
+        self.footage = {}   # composition -> [(asset id, scale factor or None)]
+        self.precomps = {}  # composition -> [(nested composition, scale factor or None)]
+
+    def _layer_scales(self, layers):
+        """id(layer) -> scale factor including its parents (None if unknown)."""
+        by_name = {layer.get("name"): layer for layer in layers}
+        scales = {}
+
+        def scale_of(layer, seen):
+            if id(layer) in scales:
+                return scales[id(layer)]
+            own = max_scale((layer.get("properties") or {}).get("Transform.Scale"))
+            effect = _effect_scale(layer)
+            factor = None if own is None or effect is None else own / 100.0 * effect
+            parent = by_name.get(layer.get("parent"))
+            if factor is not None and parent is not None:
+                if id(parent) in seen:
+                    factor = None  # circular parenting
+                else:
+                    parent_factor = scale_of(parent, seen | {id(layer)})
+                    factor = None if parent_factor is None else factor * parent_factor
+            scales[id(layer)] = factor
+            return factor
+
+        for layer in layers:
+            scale_of(layer, {id(layer)})
+        return scales
+
+    def add_composition(self, comp_data):
+        layers = [layer for layer in comp_data.get("layers") or [] if isinstance(layer, dict)]
+        scales = self._layer_scales(layers)
+        name = comp_data.get("name")
+        for layer in layers:
+            if layer.get("type") == "Footage" and layer.get("assetId") in self.images:
+                self.footage.setdefault(name, []).append((layer["assetId"], scales[id(layer)]))
+            elif layer.get("type") == "Pre-comp":
+                ref = layer.get("refId") or layer.get("source")
+                self.precomps.setdefault(name, []).append((ref, scales[id(layer)]))
+
+    def shares(self):
+        """Asset id -> largest share of its pixel size it is shown at (None = full resolution needed)."""
+        parents = {}
+        for parent, uses in self.precomps.items():
+            for child, factor in uses:
+                parents.setdefault(child, []).append((parent, factor))
+        factors = {}
+
+        def comp_factor(name, stack):
+            if name in factors:
+                return factors[name]
+            uses = parents.get(name)
+            if not uses:
+                factor = 1.0  # not nested: shown at its own size
+            else:
+                factor = 0.0
+                for parent, layer_factor in uses:
+                    parent_factor = None if parent in stack else comp_factor(parent, stack | {parent})
+                    if layer_factor is None or parent_factor is None:
+                        factor = None
+                        break
+                    factor = max(factor, layer_factor * parent_factor)
+            factors[name] = factor
+            return factor
+
+        shares = {}
+        for comp, uses in self.footage.items():
+            factor = comp_factor(comp, {comp})
+            for asset_id, layer_factor in uses:
+                share = None if factor is None or layer_factor is None else factor * layer_factor
+                if share is None or (asset_id in shares and shares[asset_id] is None):
+                    shares[asset_id] = None
+                else:
+                    shares[asset_id] = max(shares.get(asset_id, 0.0), share)
+        return shares
+
+
+def file_digest(path):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = _digests[key] = image_pipeline.file_digest(path)
+    return digest
+
+
+def cached_proxy_path(digest, image_path, size, proxy_dir=PROXY_DIR):
+    name, _ = os.path.splitext(os.path.basename(image_path))
+    return os.path.join(proxy_dir, digest[:image_pipeline.DIGEST_PREFIX], f"{name}_{size[0]}x{size[1]}.png")
+
+
+def _resize(src, dest, size):
+    """Worker: writes 'src' resized to 'size' as an RGBA PNG, atomically."""
+    from PIL import Image
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    with Image.open(src) as img:
+        img.convert("RGBA").resize(size, Image.LANCZOS).save(tmp, "PNG")
+    os.replace(tmp, dest)
+    return dest
+
+
+def attach_proxies(assets, asset_paths, planner, jobs=None, stats=None, proxy_dir=PROXY_DIR):
+    """
+    Makes (or reuses) a proxy for every image shown well below its size and
+    sets the asset's 'proxyPath'; 'path' keeps the full-resolution image.
+    If 'stats' is a dict, the number of proxies made and reused is added.
+    """
+    stats = {} if stats is None else stats
+    pending, targets = {}, {}
+    for asset_id, share in planner.shares().items():
+        src = asset_paths.get(asset_id)
+        if share is None or src is None or not os.path.exists(src):
+            continue
+        size = image_size(src)
+        target = proxy_size(size, share) if size else None
+        if target is None:
+            continue
+        try:
+            dest = cached_proxy_path(file_digest(src), src, target, proxy_dir)
+        except OSError as e:
+            print(f"  [Proxy Error] Could not read {src}: {e}")
+            continue
+        targets[asset_id] = dest
+        if os.path.exists(dest):
+            print(f"  [Proxy] Unchanged, reusing: {dest}")
+            stats["proxiesReused"] = stats.get("proxiesReused", 0) + 1
+        else:
+            pending[dest] = (src, target)
+
+    failed = set()
+    if len(pending) == 1 or (pending and jobs == 1):
+        for dest, (src, target) in pending.items():
+            try:
+                _resize(src, dest, target)
+            except Exception as e:
+                print(f"  [Proxy Error] Could not resize {src}: {e}")
+                failed.add(dest)
+    elif pending:
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {dest: pool.submit(_resize, src, dest, target) for dest, (src, target) in pending.items()}
+            for dest, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"  [Proxy Error] Could not resize {pending[dest][0]}: {e}")
+                    failed.add(dest)
+    for dest in pending:
+        if dest not in failed:
+            print(f"  [Proxy] Saved {pending[dest][1][0]}x{pending[dest][1][1]} proxy: {dest}")
+            stats["proxiesMade"] = stats.get("proxiesMade", 0) + 1
+
+    for asset in assets:
+        dest = targets.get(asset.get("id"))
+        if dest is not None and dest not in failed:
+            asset["proxyPath"] = image_pipeline.ae_path(dest)
+    return assets
@@ -0,0 +1,276 @@
+# incremental_build.py
+#
+# Description: Incremental AIGEN translation.
+# Every composition gets a fingerprint built from its resolved data, the
+# globals and components it used, the effects manifest version and the
+# content hashes of the assets its layers reference. Translated compositions
+# are stored in a local build cache as pre-encoded JSON chunks keyed by that
+# fingerprint, so only compositions whose fingerprint changed are translated
+# again. If nothing changed at all, the output file is left untouched.
+# Each output has its own chunk directory next to its build record, so
+# concurrent builds of different outputs (batch --jobs N) never delete a
+# chunk another build is about to load.
+#
+
+import hashlib
+import json
+import os
+
+import yaml
+
+import aigen_stream
+import image_pipeline
+import image_proxies
+import manifest_cache
+import aigen_to_json_translator as translator
+import translation_metrics
+from component_engine import ComponentEngine
+
+BUILD_FORMAT = 1
+BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), manifest_cache.CACHE_DIRNAME, "builds")
+
+
+def _digest(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def manifest_fingerprint(manifest_index):
+    manifest = manifest_index.manifest
+    fingerprint = getattr(manifest, "fingerprint", None)
+    if fingerprint:
+        return fingerprint
+    return _digest(manifest.get("_meta", {})) if manifest else "no-manifest"
+
+
+def referenced_asset_ids(node, ids=None):
+    """Every 'assetId' below 'node': layer footage as well as audio specs."""
+    ids = set() if ids is None else ids
+    if isinstance(node, dict):
+        if node.get("assetId") is not None and not isinstance(node["assetId"], (dict, list)):
+            ids.add(node["assetId"])
+        for v in node.values():
+            if isinstance(v, (dict, list)):
+                referenced_asset_ids(v, ids)
+    elif isinstance(node, list):
+        for v in node:
+            if isinstance(v, (dict, list)):
+                referenced_asset_ids(v, ids)
+    return ids
+
+
+class BuildCache:
+    """Per-output build record plus that output's directory of pre-encoded composition chunks."""
+
+    def __init__(self, output_path, build_dir=BUILD_DIR):
+        key = hashlib.sha1(os.path.abspath(output_path).encode("utf-8")).hexdigest()
+        self.record_path = os.path.join(build_dir, f"{key}.json")
+        self.chunk_dir = os.path.join(build_dir, key)
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        try:
+            with open(self.record_path, 'r', encoding='utf-8') as f:
+                self.record = json.load(f)
+            if self.record.get("format") != BUILD_FORMAT:
+                self.record = {}
+        except (OSError, ValueError):
+            self.record = {}
+        self._asset_stats = dict(self.record.get("assetStats", {}))
+
+    def chunk_path(self, fingerprint):
+        return os.path.join(self.chunk_dir, f"{fingerprint}.json")
+
+    def has_chunk(self, fingerprint):
+        return os.path.exists(self.chunk_path(fingerprint))
+
+    def load_chunk(self, fingerprint):
+        with open(self.chunk_path(fingerprint), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def store_chunk(self, fingerprint, text):
+        path = self.chunk_path(fingerprint)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def asset_digest(self, path):
+        """Content hash of an asset, recomputed only when its mtime or size changed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self._asset_stats.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = image_pipeline.file_digest(path)
+        self._asset_stats[path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def output_unchanged(self, output_path):
+        try:
+            st = os.stat(output_path)
+        except OSError:
+            return False
+        return self.record.get("output") == [st.st_mtime_ns, st.st_size]
+
+    def save(self, header_fp, fingerprints, unknown, output_path):
+        st = os.stat(output_path)
+        previous = set(self.record.get("fingerprints", []))
+        for stale in previous - set(fingerprints):
+            try:
+                os.remove(self.chunk_path(stale))
+            except OSError:
+                pass
+        self.record = {
+            "format": BUILD_FORMAT,
+            "header": header_fp,
+            "fingerprints": fingerprints,
+            "unknown": unknown,
+            "assetStats": self._asset_stats,
+            "output": [st.st_mtime_ns, st.st_size],
+        }
+        tmp = f"{self.record_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.record, f)
+        os.replace(tmp, self.record_path)
+
+
+def _load_document(input_path, stream):
+    """Returns (sections without compositions, iterable of raw compositions)."""
+    if stream:
+        return aigen_stream.load_header(input_path), aigen_stream.iter_compositions(input_path)
+    with open(input_path, 'r', encoding='utf-8') as f:
+        aigen_data = yaml.load(f, Loader=aigen_stream.SafeLoader) or {}
+    compositions = aigen_data.pop("compositions", None) or []
+    return aigen_data, compositions
+
+
+def translate_incremental(input_path, output_path, manifest_index, options, metrics=translation_metrics.DISABLED):
+    try:
+        with metrics.stage("parse"):
+            header, compositions = _load_document(input_path, options.stream)
+    except Exception as e:
+        raise translator.TranslationError(f"Error loading AIGEN file: {e}")
+
+    globals_map = header.get("globals", {})
+    if globals_map and not translator.has_global_references(input_path):
+        globals_map = {}
+    resolver = translator.GlobalsResolver(globals_map)
+    if globals_map:
+        with metrics.stage("globals"):
+            header = resolver.resolve(header)
+    with metrics.stage("components"):
+        components = ComponentEngine(header.get("components", []))
+    cache = BuildCache(output_path)
+    manifest_fp = manifest_fingerprint(manifest_index)
+
+    # Asset hashes come from the source files, before images are redirected to fixed copies.
+    asset_paths = translator.asset_source_paths(header.get("assets"), input_path)
+    asset_sources = list(asset_paths.values())
+    baker = translator.audio_baker(asset_paths, input_path)
+    with metrics.stage("assets"):
+        asset_digests = {asset_id: cache.asset_digest(source) for asset_id, source in asset_paths.items()}
+        prober = translator.asset_prober(options, asset_paths)
+        assets = translator.process_assets(header["assets"], input_path, options.image_jobs,
+                                           metrics.counter()) if "assets" in header else []
+    planner = translator.proxy_planner(options, header.get("assets"))
+    project_settings = header.get("projectSettings", {})
+
+    # Pass 1: fingerprint every composition, translating only the ones not in the cache.
+    previous_unknown = cache.record.get("unknown", {})
+    expand_runs = translator.has_keyframe_runs(input_path)
+    reducer = translator.keyframe_reducer(options)
+    columnizer = translator.keyframe_columnizer(options)
+    expressions = translator.expression_baker(options)
+    dedup = translator.composition_deduplicator(options, input_path)
+    fingerprints, names, unknown = [], [], {}
+    reused = retranslated = 0
+    try:
+        for comp_data in metrics.iterate("parse", compositions):
+            resolver.used.clear()
+            components.used.clear()
+            if globals_map:
+                with metrics.stage("globals"):
+                    comp_data = resolver.resolve(comp_data)
+            if components:
+                with metrics.stage("components"):
+                    comp_data = components.expand_composition(comp_data)
+            if dedup is not None:
+                with metrics.stage("dedup"):
+                    comp_data = dedup.process(comp_data)
+            if planner is not None:
+                planner.add_composition(comp_data)
+            with metrics.stage("fingerprint"):
+                fingerprint = _digest({
+                    "format": BUILD_FORMAT,
+                    "composition": comp_data,
+                    "globals": {path: resolver.lookup(path)[1] for path in sorted(resolver.used)},
+                    "components": sorted(components.used, key=str),
+                    "manifest": manifest_fp,
+                    "simplify": options.simplify,
+                    "columnar": options.columnar,
+                    "bakeExpressions": options.bake_expressions,
+                    "clampOutPoints": options.clamp_out_points,  # media lengths are covered by the asset hashes
+                    "minified": options.output_format != "pretty",  # the chunk encoding
+                    "assets": {str(asset_id): asset_digests.get(asset_id)
+                               for asset_id in sorted(referenced_asset_ids(comp_data), key=str)},
+                })
+            name = comp_data.get("name")
+            if cache.has_chunk(fingerprint):
+                reused += 1
+                metrics.count("reused")
+                unknown[fingerprint] = previous_unknown.get(fingerprint, [])
+                print(f"  [Incremental] Unchanged: {name}")
+            else:
+                retranslated += 1
+                with metrics.stage("translate"):
+                    translated_comp, comp_unknown = translator.translate_composition(comp_data, manifest_index,
+                                                                                      expand_runs, reducer, baker,
+                                                                                      columnizer, expressions, prober)
+                metrics.count_composition(translated_comp)
+                with metrics.stage("write"):
+                    cache.store_chunk(fingerprint, aigen_stream.encode_item(translated_comp, options.output_format))
+                unknown[fingerprint] = comp_unknown
+                print(f"  [Incremental] Translated: {name}")
+            fingerprints.append(fingerprint)
+            names.append(name)
+    except yaml.YAMLError as e:
+        raise translator.TranslationError(f"Error loading AIGEN file: {e}")
+    if planner is not None:
+        with metrics.stage("assets"):
+            image_proxies.attach_proxies(assets, asset_paths, planner, options.image_jobs, metrics.counter())
+    if prober is not None:
+        with metrics.stage("probe"):
+            prober.fill(assets)
+    header_fp = _digest([BUILD_FORMAT, project_settings, assets, options.output_format, options.gzip])
+
+    all_unknown = [entry for fingerprint in fingerprints for entry in unknown.get(fingerprint, [])]
+    translator.report_unknown_effects(all_unknown)
+    metrics.count_unknown(all_unknown)
+    summary = translator.finish_summary({"compositions": len(fingerprints), "unknown": len(all_unknown),
+                                         "reused": reused, "retranslated": retranslated, "assets": asset_sources},
+                                        reducer, baker, columnizer, expressions, dedup, prober)
+
+    if (header_fp == cache.record.get("header") and fingerprints == cache.record.get("fingerprints")
+            and cache.output_unchanged(output_path)):
+        print(f"Incremental build: {reused} composition(s) unchanged, blueprint is up to date.")
+        return summary
+
+    # Pass 2: assemble the blueprint from the cached chunks.
+    tmp_output = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with metrics.stage("write"):
+            with aigen_stream.blueprint_writer(tmp_output, options.output_format, output_path) as writer:
+                writer.write_section("projectSettings", project_settings)
+                writer.write_section("assets", assets)
+                writer.begin_list("compositions")
+                for fingerprint, name in zip(fingerprints, names):
+                    writer.write_encoded_item(cache.load_chunk(fingerprint), name)
+                writer.end_list()
+            os.replace(tmp_output, output_path)
+            translator.finish_output(output_path, writer, options)
+    except IOError as e:
+        raise translator.TranslationError(f"Error writing JSON: {e}")
+    cache.save(header_fp, fingerprints, unknown, output_path)
+    print(f"Incremental build: {reused} reused, {retranslated} retranslated.")
+    return summary
@@ -1,12 +1,107 @@
-import json
-
-with open('effects_manifest.json', 'r', encoding='utf-8') as f:
-    manifest = json.load(f)
-
-if 'Transform' in manifest:
-    for group in manifest['Transform']['groups']:
-        print(f"Group: {group.get('name')}")
-        for prop_name in group.get('properties', {}):
-            print(f"  - {prop_name}")
-else:
-    print("Transform not found")
+# inspect_manifest.py
+#
+# Description: Query CLI for the effects manifest.
+# Fuzzy-searches effect names, matchNames, tags and property names through
+# the persistent trigram index (manifest_search.py), and prints an effect's
+# groups and properties from the compiled manifest cache.
+# Usage: python inspect_manifest.py QUERY [--kind KIND] [--effect NAME] [--limit N]
+#        python inspect_manifest.py --show EFFECT
+#        python inspect_manifest.py --rebuild
+#
+
+import argparse
+import os
+import sys
+import time
+
+import manifest_cache
+import manifest_search
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIR, "effects_manifest.json")
+
+
+def show_effect(manifest_path, name, search):
+    """Prints the groups and properties of one effect (by display name or matchName)."""
+    manifest = manifest_cache.load_manifest(manifest_path)
+    try:
+        index = manifest_cache.ManifestIndex(manifest)
+        effect_name = index.resolve_effect(name)
+        if effect_name is None:
+            suggestions = search.suggest_effect(name)
+            hint = f" Did you mean {' or '.join(repr(s) for s in suggestions)}?" if suggestions else ""
+            print(f"Effect '{name}' not found.{hint}")
+            return False
+        info = manifest[effect_name]
+        print(f"{effect_name} ({info.get('matchName')})")
+        if info.get("tags"):
+            print(f"Tags: {', '.join(info['tags'])}")
+        for group in info.get("groups", []):
+            print(f"Group: {group.get('name')}")
+            for prop_name, details in group.get("properties", {}).items():
+                limits = ""
+                if details.get("min") is not None or details.get("max") is not None:
+                    limits = f" [{details.get('min')}, {details.get('max')}]"
+                print(f"  - {prop_name}: #{details.get('index')} {details.get('valueType')}{limits}"
+                      f"  ({details.get('matchName')})")
+        return True
+    finally:
+        if hasattr(manifest, "close"):
+            manifest.close()
+
+
+def print_matches(matches, elapsed):
+    if not matches:
+        print(f"No matches ({elapsed * 1e6:.0f} us).")
+        return
+    for match in matches:
+        effects = ", ".join(match.effects[:3]) + (f" (+{len(match.effects) - 3} more)" if len(match.effects) > 3 else "")
+        where = "" if match.kind == "effect" else f"  in {effects}"
+        print(f"  {match.score:5.3f}  {match.kind:<17} {match.text}{where}")
+    print(f"{len(matches)} match(es) in {elapsed * 1e6:.0f} us.")
+
+
+def add_arguments(parser):
+    parser.add_argument("query", nargs="?", help="Name to search for (typos and fragments are fine)")
+    parser.add_argument("--kind", action="append", choices=manifest_search.KINDS,
+                        help="Only search names of this kind (repeatable).")
+    parser.add_argument("--effect", default=None, help="Only search the names of this effect.")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--show", metavar="EFFECT", default=None, help="Print the groups and properties of EFFECT.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the search index.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+
+
+def run(args, parser):
+    try:
+        if args.rebuild:
+            start = time.perf_counter()
+            search = manifest_search.build_search_index(args.manifest)
+            print(f"Search index rebuilt: {manifest_search.search_path_for(args.manifest)} "
+                  f"({len(search.texts)} names, {time.perf_counter() - start:.2f} s)")
+        else:
+            search = manifest_search.load_search_index(args.manifest)
+    except OSError as e:
+        print(f"Cannot read the manifest: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.show:
+        sys.exit(0 if show_effect(args.manifest, args.show, search) else 1)
+    if args.query:
+        effect = args.effect
+        if effect is not None:
+            effect = manifest_cache.ManifestIndex(manifest_cache.load_manifest(args.manifest)).resolve_effect(effect)
+            if effect is None:
+                print(f"Effect '{args.effect}' not found.", file=sys.stderr)
+                sys.exit(1)
+        start = time.perf_counter()
+        matches = search.search(args.query, args.kind, effect, args.limit)
+        print_matches(matches, time.perf_counter() - start)
+    elif not args.rebuild:
+        parser.print_usage()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the effects manifest or show an effect's properties.")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
@@ -10,12 +10,17 @@
         var jsonFile = File.openDialog("Select JSON Blueprint File", "*.json");
         if (!jsonFile || !jsonFile.exists) return;
 
+        function readJSON(file) {
+            file.encoding = "UTF-8";
+            file.open('r');
+            var content = file.read();
+            file.close();
+            return JSON.parse(content);
+        }
+
         var blueprint;
         try {
-            jsonFile.open('r');
-            var jsonContent = jsonFile.read();
-            jsonFile.close();
-            blueprint = JSON.parse(jsonContent);
+            blueprint = readJSON(jsonFile);
         } catch (e) {
             alert("JSON Parse Error:\n" + e.toString());
             return;
@@ -51,6 +56,11 @@
                         var io = new ImportOptions(assetFile);
                         var item = app.project.importFile(io);
                         importedAssets[assetData.id] = item;
+                        // Downscaled proxy for previews; the original stays the footage source
+                        if (assetData.proxyPath) {
+                            var proxyFile = new File(assetData.proxyPath);
+                            if (proxyFile.exists) item.setProxy(proxyFile);
+                        }
                     } else {
                         alert("Asset Missing: " + assetFile.fsName);
                     }
@@ -60,6 +70,8 @@
             var createdComps = {};
             for (var j = 0; j < blueprint.compositions.length; j++) {
                 var compData = blueprint.compositions[j];
+                // Chunked blueprints: each composition is parsed from its own file when its turn comes
+                if (compData.chunk) compData = readJSON(new File(jsonFile.parent.fsName + "/" + compData.chunk));
                 var newComp = AEGP.buildComposition(compData, createdComps, importedAssets);
                 if (newComp) createdComps[compData.name] = newComp;
             }
@@ -1,248 +1,501 @@
-import json
-import sys
+# json_to_aigen.py
+#
+# Description: Converts project_exporter.jsx output (or a translated
+# blueprint) back into an AIGEN file.
+# The JSON is read incrementally, one composition at a time, and the AIGEN
+# text is written straight to the output file, so large exports never have
+# to fit in memory twice. Compositions are converted from the project model
+# (project_model.py): the shape of every property is worked out once, when
+# its composition is parsed. Scalars are emitted so that YAML reads back the
+# exact same values (strings JSON-escaped, floats always with a '.' or
+# exponent sign YAML 1.1 accepts). Long runs of evenly spaced keyframes are
+# written as 'keyframes: {start, step, values}', which the translator
+# expands again.
+#
+# Usage: python json_to_aigen.py <input_json_file> [output.aigen]
+#
+
+import argparse
+import math
 import os
+import re
+import sys
+from json.encoder import encode_basestring
+
+from project_model import (BARE, GROUP, KEYFRAMES, MAPPING, STREAMED_SECTION, TIME_VALUE, Composition, Keyframe,
+                           Layer, Property, read_sections)
+
+FLOW_WIDTH = 100  # value wrappers and keyframes shorter than this go on one line
+KEYFRAME_RUN_MIN = 8  # shortest run written in the compact form
+RUN_TOLERANCE = 1e-9
+PROPERTY_META_KEYS = ("matchName", "name")
+DEFAULT_INPUT = r"e:\Python\json-exported-from-AfterEffects.json"
+
+_PLAIN_KEY = re.compile(r"^[A-Za-z_][A-Za-z0-9_. \-]*$")
+_RESERVED_WORDS = {"true", "false", "yes", "no", "on", "off", "null", "y", "n", "~"}
+# Characters YAML does not allow unescaped inside a double-quoted scalar.
+_NON_PRINTABLE = re.compile("[^\x09\x0A\x0D\x20-\x7E\x85\xA0-\uD7FF\uE000-\uFFFD\U00010000-\U0010FFFF]")
+
+
+# ---------------------------------------------------------------------------
+# YAML emitting
+# ---------------------------------------------------------------------------
+
+def format_scalar(value):
+    """Formats a scalar so that YAML (1.1, as PyYAML reads it) loads back the same value."""
+    kind = type(value)
+    if kind is float:
+        text = repr(value)
+        return _format_float(value, text) if ("e" in text or "n" in text) else text
+    if kind is int:
+        return str(value)
+    if kind is str:
+        return _NON_PRINTABLE.sub(_escape_char, encode_basestring(value))
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(int(value))
+    if isinstance(value, float):
+        return format_scalar(float(value))
+    return format_scalar(str(value))
+
+
+def _format_float(value, text):
+    """Exponents, infinities and NaN: YAML 1.1 wants '1.0e-05', '.inf' and '.nan'."""
+    if math.isnan(value):
+        return ".nan"
+    if math.isinf(value):
+        return ".inf" if value > 0 else "-.inf"
+    mantissa, exponent = text.split("e")
+    if "." not in mantissa:
+        mantissa += ".0"
+    if exponent[0] not in "+-":
+        exponent = "+" + exponent
+    return f"{mantissa}e{exponent}"
+
+
+def _escape_char(match):
+    code = ord(match.group())
+    return f"\\u{code:04x}" if code <= 0xFFFF else f"\\U{code:08x}"
+
+
+_key_cache = {}
+
+
+def format_key(key):
+    text = _key_cache.get(key)
+    if text is None:
+        text = str(key)
+        if not (_PLAIN_KEY.match(text) and text == text.strip() and text.lower() not in _RESERVED_WORDS):
+            text = format_scalar(text)
+        _key_cache[key] = text
+    return text
+
+
+def _is_scalar(value):
+    kind = type(value)
+    return kind is not dict and kind is not list and kind is not Keyframe
 
-def format_value(val):
-    """Formats a value for YAML output."""
-    if isinstance(val, str):
-        return f'"{val}"'
-    if isinstance(val, bool):
-        return "true" if val else "false"
-    if isinstance(val, list):
-        # Compact list format for vectors/colors: [0, 1, 2]
-        return str(val).replace("'", '"')
-    return str(val)
-
-def indent(level):
-    return "  " * level
-
-def write_property(key, prop_data, level, lines):
-    """Recursive function to write properties to YAML lines."""
-    # Skip empty or whitespace-only keys
-    if not key or not key.strip():
-        return
-
-    indent_str = indent(level)
-    prefix = indent_str
-    
-    # If it's a simple value wrapper
-    if isinstance(prop_data, dict) and "value" in prop_data and "animated" in prop_data and not prop_data["animated"]:
-        val = prop_data["value"]
-        # Special handling for Text Document object
-        if isinstance(val, dict) and "text" in val:
-             lines.append(f"{prefix}{key}:")
-             lines.append(f"{prefix}  value:")
-             for k, v in val.items():
-                 lines.append(f"{prefix}    {k}: {format_value(v)}")
+
+def _flow_list(values):
+    """Vectors, colors and run values: lists of scalars (or of scalar lists) always go on one line."""
+    parts = []
+    for v in values:
+        if _is_scalar(v):
+            parts.append(format_scalar(v))
+        elif type(v) is list and all(map(_is_scalar, v)):
+            parts.append("[" + ", ".join(map(format_scalar, v)) + "]")
         else:
-            lines.append(f"{prefix}{key}: {{ value: {format_value(val)} }}")
-        return
-
-    # If it's animated
-    if isinstance(prop_data, dict) and "animated" in prop_data and prop_data["animated"]:
-        lines.append(f"{prefix}{key}:")
-        lines.append(f"{prefix}  animated: true")
-        if "keyframes" in prop_data:
-            lines.append(f"{prefix}  keyframes:")
-            for kf in prop_data["keyframes"]:
-                # Format keyframe compactly: - { time: 0, value: 10 }
-                kf_str = ", ".join([f"{k}: {format_value(v)}" for k, v in kf.items()])
-                lines.append(f"{prefix}    - {{ {kf_str} }}")
-        return
-
-    # If it's a group (has 'properties')
-    if isinstance(prop_data, dict) and "properties" in prop_data:
-        lines.append(f"{prefix}{key}:")
-        if "matchName" in prop_data:
-             pass # We can skip matchName in YAML if not strictly needed, or add it as comment
-        
-        # Recurse
-        for sub_key, sub_prop in prop_data["properties"].items():
-            write_property(sub_key, sub_prop, level + 1, lines)
-        return
-
-    # Fallback for direct values (if simplified)
-    lines.append(f"{prefix}{key}: {format_value(prop_data)}")
-
-def convert_json_to_aigen(json_path):
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"Error reading JSON: {e}")
-        return
-
-    lines = []
-    
-    # Project Settings
-    if "projectSettings" in data:
-        lines.append("projectSettings:")
-        for k, v in data["projectSettings"].items():
-            lines.append(f"  {k}: {v}")
-        lines.append("")
-
-    # Assets
-    if "assets" in data:
-        lines.append("assets:")
-        for asset in data["assets"]:
-            lines.append(f"  - id: \"{asset.get('id')}\"")
-            # Use the path as is (relative) or convert if needed. 
-            # AIGEN usually expects absolute or relative to project. 
-            # Since the JSON has relative paths to the sidecar folder, we can keep them.
-            # But we might want to ensure backslashes for Windows if that's the convention, 
-            # though forward slashes work in most modern contexts.
-            lines.append(f"    path: \"{asset.get('path')}\"")
-            if "width" in asset:
-                lines.append(f"    width: {asset['width']}")
-            if "height" in asset:
-                lines.append(f"    height: {asset['height']}")
-        lines.append("")
-
-    # Compositions
-    if "compositions" in data:
-        lines.append("compositions:")
-        for comp in data["compositions"]:
-            lines.append(f"  - name: \"{comp.get('name', 'Comp')}\"")
-            lines.append(f"    width: {comp.get('width', 1920)}")
-            lines.append(f"    height: {comp.get('height', 1080)}")
-            lines.append(f"    frameRate: {comp.get('frameRate', 24)}")
-            lines.append(f"    duration: {comp.get('duration', 10)}")
-            
-            if "markers" in comp:
-                lines.append("    markers:")
-                for m in comp["markers"]:
-                    lines.append(f"      - {{ name: \"{m['name']}\", time: {m['time']} }}")
-
-            if "layers" in comp:
-                lines.append("    layers:")
-                for layer in comp["layers"]:
-                    lines.append(f"      - name: \"{layer.get('name', 'Layer')}\"")
-                    lines.append(f"        type: \"{layer.get('type', 'Null')}\"")
-                    
-                    # Asset ID / Ref ID
-                    if "assetId" in layer:
-                        lines.append(f"        assetId: \"{layer['assetId']}\"")
-                    if "refId" in layer:
-                        lines.append(f"        refId: \"{layer['refId']}\"")
-
-                    if "sourceText" in layer:
-                        lines.append(f"        sourceText: \"{layer['sourceText']}\"")
-                    
-                    lines.append(f"        inPoint: {layer.get('inPoint', 0)}")
-                    lines.append(f"        outPoint: {layer.get('outPoint', 1)}")
-                    lines.append(f"        startTime: {layer.get('startTime', 0)}")
-                    
-                    # Attributes
-                    if "attributes" in layer and layer["attributes"]:
-                        attrs = []
-                        for k, v in layer["attributes"].items():
-                            attrs.append(f"{k}: {format_value(v)}")
-                        lines.append(f"        attributes: {{ {', '.join(attrs)} }}")
-
-                    # Properties (Transform, etc.)
-                    if "properties" in layer:
-                        lines.append("        properties:")
-                        for prop_group_name, prop_group_data in layer["properties"].items():
-                            # Flatten Transform group
-                            if prop_group_name == "Transform" and isinstance(prop_group_data, dict):
-                                for p_key, p_val in prop_group_data.items():
-                                    # Use dot notation: "Transform.Opacity"
-                                    # We need to pass the full key to write_property, but write_property handles indentation.
-                                    # We can manually construct the line here for the top-level flattened keys.
-                                    flat_key = f"\"{prop_group_name}.{p_key}\""
-                                    write_property(flat_key, p_val, 5, lines) # Level 5 indentation (10 spaces)
-                            else:
-                                # Normal handling for other groups or direct properties
-                                if isinstance(prop_group_data, dict):
-                                    lines.append(f"          {prop_group_name}:")
-                                    for p_key, p_val in prop_group_data.items():
-                                        write_property(p_key, p_val, 6, lines)
-
-                    # Effects
-                    if "effects" in layer:
-                        lines.append("        effects:")
-                        # Handle effects list (if it's a list in JSON) or dict (if exporter output)
-                        # The exporter outputs a dict: { "Effect Name": { ... } }
-                        # We convert this to a list for AIGEN.
-                        if isinstance(layer["effects"], dict):
-                            for eff_name, eff_data in layer["effects"].items():
-                                 lines.append(f"          - type: \"{eff_name}\"")
-                                 if "matchName" in eff_data:
-                                     lines.append(f"            matchName: \"{eff_data['matchName']}\"")
-                                 if "properties" in eff_data:
-                                     lines.append("            properties:")
-                                     for p_key, p_val in eff_data["properties"].items():
-                                         write_property(p_key, p_val, 7, lines)
-                        elif isinstance(layer["effects"], list):
-                            # If it's already a list (rare with current exporter but possible)
-                            for eff in layer["effects"]:
-                                lines.append(f"          - type: \"{eff.get('type', 'Effect')}\"")
-                                if "matchName" in eff:
-                                    lines.append(f"            matchName: \"{eff['matchName']}\"")
-                                if "properties" in eff:
-                                    lines.append("            properties:")
-                                    # Check if properties is dict or list
-                                    if isinstance(eff["properties"], dict):
-                                        for p_key, p_val in eff["properties"].items():
-                                            write_property(p_key, p_val, 7, lines)
-                                    elif isinstance(eff["properties"], list):
-                                         for p in eff["properties"]:
-                                             # Complex handling if properties are list of dicts with index/value_data
-                                             pass 
-
-                    # Text Animators
-                    if "textAnimators" in layer:
-                        lines.append("        textAnimators:")
-                        for anim in layer["textAnimators"]:
-                            lines.append(f"          - name: \"{anim.get('name', 'Animator')}\"")
-                            
-                            # Animator Properties
-                            if "animatorProperties" in anim:
-                                lines.append("            animatorProperties:")
-                                for ap in anim["animatorProperties"]:
-                                    lines.append(f"              - property: \"{ap['property']}\"")
-                                    lines.append("                value_data:")
-                                    vd = ap['value_data']
-                                    if "animated" in vd and vd["animated"]:
-                                        lines.append("                  animated: true")
-                                        if "keyframes" in vd:
-                                            lines.append("                  keyframes:")
-                                            for kf in vd["keyframes"]:
-                                                kf_str = ", ".join([f"{k}: {format_value(v)}" for k, v in kf.items()])
-                                                lines.append(f"                    - {{ {kf_str} }}")
-                                    else:
-                                        lines.append(f"                  value: {format_value(vd.get('value'))}")
-
-                            # Selectors
-                            if "selectors" in anim:
-                                lines.append("            selectors:")
-                                for sel in anim["selectors"]:
-                                    lines.append(f"              - name: \"{sel.get('name', 'Selector')}\"")
-                                    if "properties" in sel:
-                                        lines.append("                properties:")
-                                        for p_key, p_val in sel["properties"].items():
-                                            write_property(p_key, p_val, 9, lines)
-
-            lines.append("") # Spacer between comps
-
-    # Write output
-    output_path = json_path.replace(".json", ".aigen")
+            return None
+    return "[" + ", ".join(parts) + "]"
+
+
+def _flow_record(mapping, width):
+    """One-line form for value wrappers, keyframes and markers, or None if nested or too long."""
+    if "value" not in mapping and "time" not in mapping:
+        return None
+    parts = []
+    for k, v in mapping.items():
+        if _is_scalar(v):
+            text = format_scalar(v)
+        elif type(v) is list:
+            text = _flow_list(v)
+            if text is None:
+                return None
+        else:
+            return None
+        parts.append(f"{format_key(k)}: {text}")
+    text = "{ " + ", ".join(parts) + " }"
+    return text if len(text) <= width else None
+
+
+def _flow_keyframe(kf, width):
+    """_flow_record for a {time, value} Keyframe, without turning it into a dict first."""
+    if kf.keys is not TIME_VALUE:
+        return None
+    parts = []
+    for v in (kf.time, kf.value):
+        if _is_scalar(v):
+            parts.append(format_scalar(v))
+        elif type(v) is list:
+            parts.append(_flow_list(v))
+            if parts[-1] is None:
+                return None
+        else:
+            return None
+    text = f"{{ time: {parts[0]}, value: {parts[1]} }}"
+    return text if len(text) <= width else None
+
+
+class AigenWriter:
+    """Writes AIGEN block YAML to an open text stream."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write_mapping(self, mapping, indent, first_prefix=None):
+        pad = " " * indent
+        for i, (k, v) in enumerate(mapping.items()):
+            prefix = first_prefix if i == 0 and first_prefix is not None else pad
+            self.write_entry(f"{prefix}{format_key(k)}:", v, indent)
+
+    def write_entry(self, head, value, indent):
+        """Writes 'head' ('key:' with its indentation) followed by 'value'."""
+        if _is_scalar(value):
+            self._f.write(f"{head} {format_scalar(value)}\n")
+        elif isinstance(value, list):
+            flow = _flow_list(value) if value else "[]"
+            if flow is not None:
+                self._f.write(f"{head} {flow}\n")
+                return
+            self._f.write(f"{head}\n")
+            for item in value:
+                self.write_item(item, indent + 2)
+        elif not value:
+            self._f.write(f"{head} {{}}\n")
+        else:
+            flow = _flow_record(value, FLOW_WIDTH - len(head))
+            if flow is not None:
+                self._f.write(f"{head} {flow}\n")
+            else:
+                self._f.write(f"{head}\n")
+                self.write_mapping(value, indent + 2)
+
+    def write_item(self, item, indent):
+        pad = " " * indent
+        if type(item) is Keyframe:
+            flow = _flow_keyframe(item, FLOW_WIDTH - indent - 2)
+            if flow is not None:
+                self._f.write(f"{pad}- {flow}\n")
+                return
+            item = item.to_dict()
+        if isinstance(item, dict) and item:
+            flow = _flow_record(item, FLOW_WIDTH - indent - 2)
+            if flow is not None:
+                self._f.write(f"{pad}- {flow}\n")
+            else:
+                self.write_mapping(item, indent + 2, first_prefix=pad + "- ")
+        elif isinstance(item, list) and item:
+            flow = _flow_list(item)
+            if flow is not None:
+                self._f.write(f"{pad}- {flow}\n")
+            else:
+                self._f.write(f"{pad}-\n")
+                for sub_item in item:
+                    self.write_item(sub_item, indent + 2)
+        else:
+            self._f.write(f"{pad}- {format_scalar(item) if _is_scalar(item) else ('{}' if isinstance(item, dict) else '[]')}\n")
+
+    def write_section(self, key, value):
+        self.write_entry(f"{format_key(key)}:", value, 0)
+        self._f.write("\n")
+
+    def begin_list(self, key):
+        self._f.write(f"{format_key(key)}:\n")
+
+    def write_list_item(self, item):
+        self.write_item(item, 2)
+        self._f.write("\n")  # spacer between compositions
+
+
+# ---------------------------------------------------------------------------
+# Exporter JSON -> AIGEN structure
+# ---------------------------------------------------------------------------
+
+def compact_keyframes(keyframes):
+    """Returns {start, step, values} for a long, evenly spaced run of plain Keyframes, else None."""
+    if len(keyframes) < KEYFRAME_RUN_MIN:
+        return None
+    times = []
+    for kf in keyframes:
+        if type(kf) is not Keyframe or not kf.is_plain():
+            return None
+        times.append(kf.time)
+    if not all(isinstance(t, (int, float)) and not isinstance(t, bool) for t in times):
+        return None
+    start = times[0]
+    step = (times[-1] - start) / (len(times) - 1)
+    if all(isinstance(t, int) for t in times) and step == int(step):
+        step = int(step)
+    if step <= 0:
+        return None
+    for i, t in enumerate(times):
+        if abs(start + i * step - t) > RUN_TOLERANCE * max(1.0, abs(t)):
+            return None
+    return {"start": start, "step": step, "values": [kf.value for kf in keyframes]}
+
+
+def convert_property(prop, compact=True):
+    """
+    Strips exporter metadata from a Property (or property group). Keyframe
+    lists keep their Keyframes, which AigenWriter writes as they are.
+    """
+    kind = prop.kind
+    if kind is BARE:
+        return prop.value
+    if kind is GROUP:
+        return {k: convert_property(v, compact) for k, v in prop.children.items() if k.strip()}
+    if kind is MAPPING:
+        return {k: convert_property(v, compact) for k, v in prop.children.items()}
+    converted = {}
+    for k in prop.keys:
+        if k in PROPERTY_META_KEYS:
+            continue
+        if k == "keyframes" and kind is KEYFRAMES:
+            converted[k] = (compact and compact_keyframes(prop.keyframes)) or prop.keyframes
+            continue
+        v = prop.field(k)
+        if k == "animated" and not v:
+            continue
+        converted[k] = v
+    return converted
+
+
+def convert_properties(properties, compact=True):
+    """Layer properties (name -> Property): the Transform group is flattened to 'Transform.<name>' keys."""
+    converted = {}
+    for name, prop in properties.items():
+        if not name.strip():
+            continue
+        if name == "Transform" and prop.kind is not BARE and not prop.has("value"):
+            group = prop.children if prop.children is not None else _parsed(prop.to_dict())
+            for sub_name, sub_prop in group.items():
+                if sub_name not in PROPERTY_META_KEYS:
+                    converted[f"Transform.{sub_name}"] = convert_property(sub_prop, compact)
+        else:
+            converted[name] = convert_property(prop, compact)
+    return converted
+
+
+def _parsed(properties):
+    return {name: Property.parse(prop) for name, prop in properties.items()}
+
+
+class EffectNamer:
+    """Names effects and effect properties so the translator maps them back to the same matchName/index."""
+
+    def __init__(self):
+        self._index = None
+        self.skipped = []
+
+    @property
+    def index(self):
+        if self._index is None:
+            from manifest_cache import ManifestIndex, load_manifest
+            manifest_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "effects_manifest.json")
+            try:
+                self._index = ManifestIndex(load_manifest(manifest_path))
+            except (OSError, ValueError) as e:
+                print(f"Warning: Effects manifest unavailable ({e}); effects are converted by name only.",
+                      file=sys.stderr)
+                self._index = ManifestIndex({})
+        return self._index
+
+    def _flat_properties(self, properties, prefix=""):
+        for name, prop in properties.items():
+            if prop.kind is GROUP:
+                yield from self._flat_properties(prop.children, f"{prefix}{name}/")
+            else:
+                yield prefix + name, name, prop
+
+    def exported_effect(self, name, effect, compact=True):
+        """Exporter form: {'Name': {matchName, properties: {'Prop': {...}}}}."""
+        effect_name = self.index.resolve_effect(effect.match_name) or self.index.resolve_effect(name)
+        converted = {"type": effect_name or name}
+        if effect_name is None and effect.match_name:
+            converted["matchName"] = effect.match_name
+        if effect_name is not None and name != effect_name:
+            converted["name"] = name
+        properties = {}
+        known = self.index.properties(effect_name) if effect_name else {}
+        for path, prop_name, prop in self._flat_properties(effect.properties or {}):
+            match_name = prop.match_name
+            if not prop_name.strip():
+                # Some AE properties have a blank display name; the matchName still identifies them.
+                if not match_name:
+                    continue
+                prop_name = match_name
+            if effect_name is not None:
+                info = known.get(prop_name)
+                if info is None or (match_name and info.matchName != match_name):
+                    info = known.get(match_name)
+                    prop_name = match_name
+                if info is None:
+                    self.skipped.append(f"{name}/{path}")
+                    continue
+            properties[prop_name] = convert_property(prop, compact)
+        if properties:
+            converted["properties"] = properties
+        return converted
+
+    def blueprint_effect(self, effect, compact=True):
+        """Blueprint form: {matchName, name, properties: [{index, value_data}]}."""
+        effect_name = self.index.resolve_effect(effect.match_name)
+        indexed = [item if type(item) is tuple else (item.get("index"), Property.parse(item.get("value_data")))
+                   for item in effect.properties]
+        if effect_name is None:
+            converted = {"type": effect.match_name or effect.name}
+            if effect.name and effect.name != converted["type"]:
+                converted["name"] = effect.name
+            self.skipped.extend(f"{effect.name}/#{index}" for index, _ in indexed)
+            return converted
+        converted = {"type": effect_name}
+        if effect.name and effect.name != effect_name:
+            converted["name"] = effect.name
+        by_index = {}
+        for prop_name, info in self.index.properties(effect_name).items():
+            by_index.setdefault(info.index, prop_name)
+        properties = {}
+        for index, prop in indexed:
+            prop_name = by_index.get(index)
+            if prop_name is None:
+                self.skipped.append(f"{effect.name}/#{index}")
+                continue
+            properties[prop_name] = convert_property(prop, compact)
+        if properties:
+            converted["properties"] = properties
+        return converted
+
+    def convert_effects(self, effects, compact=True):
+        """A layer's Effects: name -> Effect as exported, or a list of blueprint or AIGEN form Effects."""
+        if isinstance(effects, dict):
+            return [self.exported_effect(name, effect, compact) for name, effect in effects.items()]
+        converted = []
+        for effect in effects or []:
+            if isinstance(effect.properties, list):
+                converted.append(self.blueprint_effect(effect, compact))
+            else:
+                aigen = {k: effect.field(k) for k in effect.keys if k != "properties"}
+                aigen["properties"] = convert_properties(effect.properties or {}, compact)
+                converted.append(aigen)
+        return converted
+
+
+def convert_layer(layer, namer, compact=True):
+    converted = {}
+    for k in layer.keys:
+        if k == "properties" and isinstance(layer.properties, dict):
+            v = convert_properties(layer.properties, compact)
+        elif k == "effects":
+            v = namer.convert_effects(layer.effects, compact)
+        else:
+            v = layer.field(k)
+            if k == "textAnimators" and isinstance(v, list):
+                v = [convert_text_animator(animator, compact) for animator in v]
+        converted[k] = v
+    return converted
+
+
+def convert_text_animator(animator, compact=True):
+    """Text animators stay plain dicts in the model; their properties are parsed here."""
+    converted = dict(animator)
+    if isinstance(animator.get("animatorProperties"), list):
+        converted["animatorProperties"] = [
+            dict(ap, value_data=convert_property(Property.parse(ap["value_data"]), compact))
+            if "value_data" in ap else ap
+            for ap in animator["animatorProperties"]]
+    if isinstance(animator.get("selectors"), list):
+        converted["selectors"] = [
+            dict(sel, properties=convert_properties(_parsed(sel["properties"]), compact))
+            if isinstance(sel.get("properties"), dict) else sel
+            for sel in animator["selectors"]]
+    return converted
+
+
+def convert_composition(comp, namer, compact=True):
+    """Converts a Composition (parsing it, if it wasn't yet) into its AIGEN structure."""
+    if not isinstance(comp.layers, list):
+        return comp.to_dict()
+    converted = {}
+    for k in comp.keys:
+        if k == "layers":
+            converted[k] = [convert_layer(layer, namer, compact) if type(layer) is Layer else layer
+                            for layer in comp.layers]
+        else:
+            converted[k] = comp.field(k)
+    return converted
+
+
+def convert_json_to_aigen(json_path, output_path=None, compact=True):
+    """Converts one exporter/blueprint JSON file. Returns the output path, or None on error."""
+    output_path = output_path or os.path.splitext(json_path)[0] + ".aigen"
+    namer = EffectNamer()
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    comp_count = 0
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(lines))
-        print(f"Successfully converted to: {output_path}")
-    except Exception as e:
-        print(f"Error writing AIGEN file: {e}")
+        with open(json_path, 'r', encoding='utf-8') as src, open(tmp_path, 'w', encoding='utf-8') as out:
+            writer = AigenWriter(out)
+            for key, value in read_sections(src, json_path):
+                if key == STREAMED_SECTION:
+                    for comp in value or []:
+                        if comp_count == 0:
+                            writer.begin_list(key)
+                        if isinstance(comp, Composition):  # chunk files are read here too
+                            comp = convert_composition(comp, namer, compact)
+                        writer.write_list_item(comp)
+                        comp_count += 1
+                    if comp_count == 0:
+                        writer.write_section(key, [])
+                else:
+                    writer.write_section(key, value)
+        os.replace(tmp_path, output_path)
+    except (OSError, ValueError) as e:
+        print(f"Error converting {json_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    if namer.skipped:
+        examples = ", ".join(namer.skipped[:3])
+        print(f"Note: {len(namer.skipped)} effect propert{'y' if len(namer.skipped) == 1 else 'ies'} "
+              f"not in the effects manifest were left out (e.g. {examples}).")
+    print(f"Successfully converted to: {output_path} ({comp_count} compositions)")
+    return output_path
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python json_to_aigen.py <input_json_file>")
+
+def add_arguments(parser):
+    parser.add_argument("input", nargs="?", help="JSON file written by project_exporter.jsx")
+    parser.add_argument("output", nargs="?", help="Output .aigen file (default: next to the input)")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="Write every keyframe, even for long evenly spaced runs.")
+
+
+def run(args, parser):
+    if args.input is None:
+        parser.print_usage()
         # Default for testing if no arg provided
-        default_file = r"e:\Python\json-exported-from-AfterEffects.json"
-        if os.path.exists(default_file):
-            print(f"No argument provided. Using default: {default_file}")
-            convert_json_to_aigen(default_file)
+        if os.path.exists(DEFAULT_INPUT):
+            print(f"No argument provided. Using default: {DEFAULT_INPUT}")
+            convert_json_to_aigen(DEFAULT_INPUT)
         else:
             print("Default file not found.")
     else:
-        convert_json_to_aigen(sys.argv[1])
+        ok = convert_json_to_aigen(args.input, args.output, compact=not args.no_compact)
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert exporter (or blueprint) JSON into an AIGEN file.")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
@@ -0,0 +1,245 @@
+# keyframe_columns.py
+#
+# Description: Columnar keyframes with offline time remapping.
+# The JSX builder used to place every keyframe itself: marker times were
+# looked up in markersMap, layer-relative times were offset by the layer's
+# inPoint, and easing was set key by key. Here all keyframes of a
+# composition are gathered into contiguous NumPy arrays (times, values,
+# easing) and remapped in one vectorized pass:
+#
+#   - "marker:NAME" times resolve to the composition marker's time
+#   - other times are layer-relative: scaled by the layer's 'stretch'
+#     (percent) and offset by its inPoint (or startTime when no inPoint)
+#   - every time is snapped to the composition frameRate
+#   - keys are sorted by time; keys snapped onto the same frame keep the last
+#
+# Each property then carries ready-to-use parallel arrays instead of
+# 'keyframes', which the builder hands to setValuesAtTimes as they are:
+#
+#   { times: [1.5, 2.0], values: [0, 100], inEase: [null, [0, 80]] }
+#
+# Keyframes the builder resolves differently (timecode strings, extra keys
+# such as spatial tangents, incomplete easing) are left in their list form.
+#
+
+import sys
+
+import numpy as np
+
+MARKER_PREFIX = "marker:"
+KEYFRAME_KEYS = frozenset(("time", "value", "inEase", "outEase"))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def resolve_seconds(value, markers):
+    """Resolves a time like AEGP.resolveTimeValue does for numbers, numeric strings and markers; None otherwise."""
+    if _is_number(value):
+        return float(value)
+    if isinstance(value, str):
+        if value.startswith(MARKER_PREFIX):
+            return markers.get(value[len(MARKER_PREFIX):])
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _ease(ease):
+    """(speed, influence) of an inEase/outEase, NaNs when absent, None when unusable."""
+    if ease is None:
+        return np.nan, np.nan
+    if isinstance(ease, dict) and _is_number(ease.get("speed")) and _is_number(ease.get("influence")):
+        return float(ease["speed"]), float(ease["influence"])
+    return None
+
+
+def composition_markers(comp_data):
+    """Marker name -> time in seconds, as the builder's markersMap holds them."""
+    markers = {}
+    for marker in comp_data.get("markers") or []:
+        if isinstance(marker, dict):
+            time = resolve_seconds(marker.get("time"), {})
+            markers[marker.get("name")] = 0.0 if time is None else time
+    return markers
+
+
+def layer_timing(layer, markers):
+    """(offset, scale) of a layer's keyframe times, or None if its in point can't be resolved offline."""
+    if "inPoint" in layer:
+        offset = resolve_seconds(layer["inPoint"], markers)
+    elif "startTime" in layer:
+        offset = resolve_seconds(layer["startTime"], markers)
+    else:
+        offset = 0.0
+    stretch = resolve_seconds(layer.get("stretch", 100), {})
+    if offset is None or stretch is None:
+        return None
+    return offset, stretch / 100.0
+
+
+class KeyframeColumns:
+    """One property's keyframes as parallel arrays (times ascending, one key per frame)."""
+
+    def __init__(self, times, values, ease):
+        self.times = times    # float64 (n,), composition seconds
+        self.values = values  # object (n,), values as authored
+        self.ease = ease      # float64 (n, 4): in speed, in influence, out speed, out influence (NaN = none)
+
+    def __len__(self):
+        return len(self.times)
+
+    def to_property(self, prop):
+        """Returns a copy of the property data with 'keyframes' replaced by the arrays."""
+        data = {k: v for k, v in prop.items() if k != "keyframes"}
+        data["times"] = self.times.tolist()
+        data["values"] = self.values.tolist()
+        for column, key in ((0, "inEase"), (2, "outEase")):
+            pairs = self.ease[:, column:column + 2]
+            present = ~np.isnan(pairs[:, 0])
+            if present.any():
+                data[key] = [pair if ok else None for pair, ok in zip(pairs.tolist(), present.tolist())]
+        return data
+
+
+class KeyframeColumnizer:
+    """Converts the keyframes of whole compositions to KeyframeColumns (copy-on-write) and keeps totals."""
+
+    def __init__(self):
+        self.properties = 0
+        self.keyframes = 0
+        self.merged = 0
+        self.markers = 0
+
+    def _collect(self, node, found):
+        """Appends every (property dict, keyframes) pair under 'node'."""
+        if isinstance(node, dict):
+            keyframes = node.get("keyframes")
+            if isinstance(keyframes, list) and keyframes:
+                found.append((node, keyframes))
+            for k, v in node.items():
+                if k != "keyframes" and isinstance(v, (dict, list)):
+                    self._collect(v, found)
+        elif isinstance(node, list):
+            for v in node:
+                if isinstance(v, (dict, list)):
+                    self._collect(v, found)
+        return found
+
+    def _replace(self, node, columns):
+        if isinstance(node, dict):
+            if id(node) in columns:
+                return columns[id(node)].to_property(node)
+            rebuilt = None
+            for k, v in node.items():
+                if isinstance(v, (dict, list)):
+                    new = self._replace(v, columns)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = dict(node)
+                        rebuilt[k] = new
+            return node if rebuilt is None else rebuilt
+        if isinstance(node, list):
+            rebuilt = None
+            for i, v in enumerate(node):
+                if isinstance(v, (dict, list)):
+                    new = self._replace(v, columns)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = list(node)
+                        rebuilt[i] = new
+            return node if rebuilt is None else rebuilt
+        return node
+
+    def columnize(self, comp_data):
+        """Returns the composition with every eligible keyframe list converted."""
+        name = comp_data.get("name")
+        fps = resolve_seconds(comp_data.get("frameRate", 30), {}) or 30.0
+        markers = composition_markers(comp_data)
+
+        # Gather every eligible property of the composition into flat lists.
+        raw, absolute, offsets, scales, values, eases, counts = [], [], [], [], [], [], []
+        owners = []  # (layer position, property dict) per property, in gather order
+        missing = set()
+        layers = comp_data.get("layers") or []
+        for position, layer in enumerate(layers):
+            if not isinstance(layer, dict):
+                continue
+            timing = layer_timing(layer, markers)
+            if timing is None:
+                continue
+            offset, scale = timing
+            for prop, keyframes in self._collect(layer, []):
+                rows = []
+                for kf in keyframes:
+                    if not isinstance(kf, dict) or "value" not in kf or not kf.keys() <= KEYFRAME_KEYS:
+                        break
+                    time = kf.get("time")
+                    is_marker = isinstance(time, str) and time.startswith(MARKER_PREFIX)
+                    if is_marker:
+                        seconds = markers.get(time[len(MARKER_PREFIX):])
+                        if seconds is None:
+                            # The builder places keys at unknown markers at 0; keep that.
+                            missing.add(time[len(MARKER_PREFIX):])
+                            seconds = 0.0
+                    else:
+                        seconds = resolve_seconds(time, markers)
+                    ease_in, ease_out = _ease(kf.get("inEase")), _ease(kf.get("outEase"))
+                    if seconds is None or ease_in is None or ease_out is None:
+                        break
+                    rows.append((seconds, is_marker, kf["value"], ease_in + ease_out))
+                else:
+                    for seconds, is_marker, value, ease in rows:
+                        raw.append(seconds)
+                        absolute.append(is_marker)
+                        values.append(value)
+                        eases.append(ease)
+                    offsets.append(offset)
+                    scales.append(scale)
+                    counts.append(len(rows))
+                    owners.append((position, prop))
+        for marker in sorted(missing, key=str):
+            print(f"Warning: Marker '{marker}' not found in '{name}'; its keyframes are placed at 0.", file=sys.stderr)
+        if not owners:
+            return comp_data
+
+        # One vectorized pass over all keyframes of the composition.
+        counts = np.array(counts, dtype=np.int64)
+        segment = np.repeat(np.arange(len(counts)), counts)
+        raw = np.array(raw, dtype=np.float64)
+        absolute = np.array(absolute, dtype=bool)
+        times = np.where(absolute, raw, np.repeat(offsets, counts) + raw * np.repeat(scales, counts))
+        times = np.floor(times * fps + 0.5) / fps
+        times[times == 0] = 0.0  # no -0.0 in the output
+        order = np.lexsort((np.arange(len(times)), times, segment))
+        times, segment = times[order], segment[order]
+        # Of the keys that land on the same frame, the last one wins (as it would in setValuesAtTimes).
+        keep = np.ones(len(times), dtype=bool)
+        keep[:-1] = (segment[1:] != segment[:-1]) | (times[1:] != times[:-1])
+        order, times, segment = order[keep], times[keep], segment[keep]
+        value_column = np.fromiter(values, dtype=object, count=len(values))[order]
+        ease_column = np.array(eases, dtype=np.float64).reshape(-1, 4)[order]
+        bounds = np.cumsum(np.bincount(segment, minlength=len(counts)))[:-1]
+
+        per_layer = {}
+        for (position, prop), t, v, e in zip(owners, np.split(times, bounds), np.split(value_column, bounds),
+                                             np.split(ease_column, bounds)):
+            per_layer.setdefault(position, {})[id(prop)] = KeyframeColumns(t, v, e)
+        self.properties += len(owners)
+        self.keyframes += len(times)
+        self.merged += int(counts.sum()) - len(times)
+        self.markers += int(absolute.sum())
+
+        new_layers = list(layers)
+        for position, columns in per_layer.items():
+            new_layers[position] = self._replace(layers[position], columns)
+        converted = dict(comp_data)
+        converted["layers"] = new_layers
+        return converted
+
+    def report(self):
+        print(f"Columnar keyframes: {self.keyframes} keyframes on {self.properties} properties "
+              f"({self.markers} marker times resolved, {self.merged} merged by frame snapping)")
@@ -0,0 +1,148 @@
+# keyframe_reduction.py
+#
+# Description: Keyframe reduction for dense (baked) animation.
+# Runs of plain {time, value} keyframes are simplified per property with the
+# Ramer-Douglas-Peucker algorithm, vectorized with NumPy: a keyframe is only
+# dropped when linear interpolation between the kept keyframes reproduces it
+# within the tolerance on every component (scalars, 2D/3D points, colors).
+# Keyframes carrying easing or any other data, and keyframes with marker or
+# timecode times, are always kept and split a property into separate runs.
+#
+
+import numpy as np
+
+MIN_RUN = 3  # two keyframes can't be simplified
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_plain(keyframe):
+    return (isinstance(keyframe, dict) and len(keyframe) == 2 and "value" in keyframe
+            and _is_number(keyframe.get("time")))
+
+
+def _value_matrix(keyframes):
+    """Returns the values as an (n, components) float array, or None if they aren't numeric vectors."""
+    first = keyframes[0]["value"]
+    if _is_number(first):
+        if not all(_is_number(kf["value"]) for kf in keyframes):
+            return None
+        return np.array([kf["value"] for kf in keyframes], dtype=float)[:, None]
+    if isinstance(first, list) and first:
+        size = len(first)
+        for kf in keyframes:
+            value = kf["value"]
+            if not isinstance(value, list) or len(value) != size or not all(map(_is_number, value)):
+                return None
+        return np.array([kf["value"] for kf in keyframes], dtype=float)
+    return None
+
+
+def rdp_mask(times, values, tolerance):
+    """Boolean mask of the keyframes to keep (Ramer-Douglas-Peucker, max-component error)."""
+    keep = np.zeros(len(times), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(times) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        fraction = (times[first + 1:last] - times[first]) / (times[last] - times[first])
+        line = values[first] + fraction[:, None] * (values[last] - values[first])
+        error = np.abs(values[first + 1:last] - line).max(axis=1)
+        worst = int(error.argmax())
+        if error[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def interpolation_error(times, values, keep):
+    """Largest component error of linear interpolation through the kept keyframes."""
+    kept_times = times[keep]
+    error = 0.0
+    for component in range(values.shape[1]):
+        approx = np.interp(times, kept_times, values[keep, component])
+        error = max(error, float(np.abs(values[:, component] - approx).max()))
+    return error
+
+
+class KeyframeReducer:
+    """Simplifies keyframe lists in place of the originals (copy-on-write) and keeps totals for the report."""
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.properties = 0
+        self.before = 0
+        self.removed = 0
+        self.max_error = 0.0
+
+    def _simplify_run(self, run):
+        if len(run) < MIN_RUN:
+            return run
+        values = _value_matrix(run)
+        if values is None:
+            return run
+        times = np.array([kf["time"] for kf in run], dtype=float)
+        if not np.all(np.diff(times) > 0):
+            return run
+        keep = rdp_mask(times, values, self.tolerance)
+        if keep.all():
+            return run
+        self.max_error = max(self.max_error, interpolation_error(times, values, keep))
+        return [kf for kf, kept in zip(run, keep) if kept]
+
+    def simplify(self, keyframes):
+        """Returns the reduced keyframe list, or 'keyframes' itself when nothing could be removed."""
+        reduced, run = [], []
+        for keyframe in keyframes:
+            if _is_plain(keyframe):
+                run.append(keyframe)
+                continue
+            reduced.extend(self._simplify_run(run))
+            reduced.append(keyframe)
+            run = []
+        reduced.extend(self._simplify_run(run))
+        self.properties += 1
+        self.before += len(keyframes)
+        if len(reduced) == len(keyframes):
+            return keyframes
+        self.removed += len(keyframes) - len(reduced)
+        return reduced
+
+    def reduce(self, node):
+        """Walks a composition (or any subtree); shared subtrees are copied, never modified."""
+        if isinstance(node, dict):
+            rebuilt = None
+            for k, v in node.items():
+                if k == "keyframes" and isinstance(v, list) and v:
+                    new = self.simplify(v)
+                elif isinstance(v, (dict, list)):
+                    new = self.reduce(v)
+                else:
+                    continue
+                if new is not v:
+                    if rebuilt is None:
+                        rebuilt = dict(node)
+                    rebuilt[k] = new
+            return node if rebuilt is None else rebuilt
+        if isinstance(node, list):
+            rebuilt = None
+            for i, v in enumerate(node):
+                if isinstance(v, (dict, list)):
+                    new = self.reduce(v)
+                    if new is not v:
+                        if rebuilt is None:
+                            rebuilt = list(node)
+                        rebuilt[i] = new
+            return node if rebuilt is None else rebuilt
+        return node
+
+    def report(self):
+        share = f" ({self.removed / self.before:.0%})" if self.before else ""
+        print(f"Keyframe reduction (tolerance {self.tolerance:g}): removed {self.removed} of {self.before} "
+              f"keyframes{share} on {self.properties} properties, max error {self.max_error:.6g}")
@@ -0,0 +1,276 @@
+# manifest_cache.py
+#
+# Description: Compiled snapshot of 'effects_manifest.json'.
+# The JSON manifest is compiled once into a binary cache file that is
+# memory-mapped on load. Effects are unpickled lazily, one at a time, the
+# first time they are looked up. The cache is keyed by the source file's
+# mtime, size and SHA-256 and is rebuilt automatically when the JSON changes.
+# Each effect is stored together with its flattened property table, so
+# ManifestIndex lookups never walk the 'groups' list.
+#
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+
+CACHE_DIRNAME = ".aigen_cache"
+CACHE_MAGIC = b"AIGENMC1"
+CACHE_FORMAT_VERSION = 2
+
+# magic, format version, source mtime_ns, source size, source sha256, index length
+_HEADER = struct.Struct("<8sIQQ32sQ")
+
+PropertyInfo = namedtuple("PropertyInfo", ["index", "matchName", "valueType", "min", "max"])
+
+
+def cache_path_for(manifest_path):
+    """Returns the compiled cache path used for a given manifest file."""
+    manifest_path = os.path.abspath(manifest_path)
+    cache_dir = os.path.join(os.path.dirname(manifest_path), CACHE_DIRNAME)
+    return os.path.join(cache_dir, os.path.basename(manifest_path) + ".mcache")
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def flatten_properties(effect_info):
+    """
+    Flattens an effect's groups into {property name or matchName: PropertyInfo}.
+    When a name appears in several groups the first group wins, matching the
+    order translate_effect always used.
+    """
+    table = {}
+    if not isinstance(effect_info, dict):
+        return table
+    for group in effect_info.get("groups", []):
+        for prop_name, details in group.get("properties", {}).items():
+            entry = PropertyInfo(details.get("index"), details.get("matchName"), details.get("valueType"),
+                                 details.get("min"), details.get("max"))
+            table.setdefault(prop_name, entry)
+            if entry.matchName:
+                table.setdefault(entry.matchName, entry)
+    return table
+
+
+def effect_aliases(manifest):
+    """Maps each effect matchName to its display name (first one wins)."""
+    aliases = {}
+    for name, info in manifest.items():
+        if isinstance(info, dict) and info.get("matchName"):
+            aliases.setdefault(info["matchName"], name)
+    return aliases
+
+
+def compile_manifest(manifest_path, cache_path=None, manifest=None):
+    """
+    Compiles the JSON manifest into the binary cache format.
+    Layout: fixed header, pickled index {name: (offset, length)} plus the
+    matchName aliases, then one pickled (effect, property table) blob per
+    effect. Written to a temp file and swapped in atomically.
+    """
+    cache_path = cache_path or cache_path_for(manifest_path)
+    st = os.stat(manifest_path)
+    digest = file_sha256(manifest_path)
+    if manifest is None:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    blobs = []
+    offsets = {}
+    position = 0
+    for name, info in manifest.items():
+        blob = pickle.dumps((info, flatten_properties(info)), protocol=pickle.HIGHEST_PROTOCOL)
+        offsets[name] = (position, len(blob))
+        blobs.append(blob)
+        position += len(blob)
+
+    index_blob = pickle.dumps({"effects": offsets, "aliases": effect_aliases(manifest)},
+                              protocol=pickle.HIGHEST_PROTOCOL)
+    header = _HEADER.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, st.st_mtime_ns, st.st_size, digest, len(index_blob))
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(index_blob)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, cache_path)
+    return manifest
+
+
+class CompiledManifest(Mapping):
+    """
+    Read-only, dict-like view over a memory-mapped compiled manifest.
+    Behaves like the dict returned by json.load, but only the effects that
+    are actually looked up get unpickled.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        with open(cache_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, mtime_ns, size, digest, index_len = _HEADER.unpack_from(self._mm, 0)
+            if magic != CACHE_MAGIC or version != CACHE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported manifest cache format: {cache_path}")
+            index_start = _HEADER.size
+            index = pickle.loads(self._mm[index_start:index_start + index_len])
+        except Exception:
+            self._mm.close()
+            raise
+        self.source_mtime_ns = mtime_ns
+        self.source_size = size
+        self.source_sha256 = digest
+        self._data_start = index_start + index_len
+        self._offsets = index["effects"]
+        self.aliases = index["aliases"]
+        self._loaded = {}
+
+    @property
+    def fingerprint(self):
+        """Hex SHA-256 of the JSON manifest this cache was compiled from."""
+        return self.source_sha256.hex()
+
+    def is_fresh_for(self, manifest_path):
+        """Cheap stat check first; falls back to hashing when the mtime moved."""
+        st = os.stat(manifest_path)
+        if st.st_mtime_ns == self.source_mtime_ns and st.st_size == self.source_size:
+            return True
+        if st.st_size != self.source_size or file_sha256(manifest_path) != self.source_sha256:
+            return False
+        self._restamp(st.st_mtime_ns)
+        return True
+
+    def _restamp(self, mtime_ns):
+        """
+        Stores a new source mtime after a hash match (touched or re-checked-out
+        manifest), so later loads take the stat fast path again. Written to a
+        temp file and swapped in atomically; if that fails the cache still
+        works, it just keeps hashing.
+        """
+        fields = list(_HEADER.unpack_from(self._mm, 0))
+        fields[2] = mtime_ns
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(_HEADER.pack(*fields))
+                f.write(self._mm[_HEADER.size:])
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # Read-only checkout, or the cache is mapped by another process (Windows).
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self.source_mtime_ns = mtime_ns
+
+    def _entry(self, name):
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        offset, length = self._offsets[name]
+        start = self._data_start + offset
+        entry = pickle.loads(self._mm[start:start + length])
+        self._loaded[name] = entry
+        return entry
+
+    def __getitem__(self, name):
+        return self._entry(name)[0]
+
+    def properties_of(self, name):
+        """Precompiled flattened property table for one effect."""
+        return self._entry(name)[1]
+
+    def __contains__(self, name):
+        return name in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def close(self):
+        self._mm.close()
+
+
+def load_manifest(manifest_path, cache_path=None):
+    """
+    Returns a CompiledManifest for 'manifest_path', compiling or rebuilding
+    the cache when it is missing or stale. If the cache directory cannot be
+    written, the parsed JSON dict is returned instead.
+    """
+    cache_path = cache_path or cache_path_for(manifest_path)
+    if os.path.exists(cache_path):
+        try:
+            compiled = CompiledManifest(cache_path)
+            if compiled.is_fresh_for(manifest_path):
+                return compiled
+            compiled.close()
+        except (ValueError, OSError, pickle.UnpicklingError, struct.error, KeyError) as e:
+            print(f"Warning: Ignoring unreadable manifest cache ({e}); rebuilding.", file=sys.stderr)
+
+    manifest = None
+    try:
+        manifest = compile_manifest(manifest_path, cache_path)
+        return CompiledManifest(cache_path)
+    except OSError as e:
+        # Read-only checkout or a cache file held open by another process (Windows).
+        print(f"Warning: Could not write manifest cache '{cache_path}': {e}", file=sys.stderr)
+        if manifest is None:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        return manifest
+
+
+class ManifestIndex:
+    """
+    O(1) lookups of effects and their properties, built once per manifest load.
+    Effects resolve by display name or matchName; properties resolve by
+    display name or matchName within the resolved effect.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest if manifest is not None else {}
+        aliases = getattr(self.manifest, "aliases", None)
+        self._aliases = aliases if aliases is not None else effect_aliases(self.manifest)
+        self._tables = {}
+
+    def resolve_effect(self, key):
+        """Returns the manifest (display) name for 'key', or None if unknown."""
+        if not key:
+            return None
+        if key in self.manifest:
+            return key
+        return self._aliases.get(key)
+
+    def properties(self, effect_name):
+        table = self._tables.get(effect_name)
+        if table is None:
+            if hasattr(self.manifest, "properties_of"):
+                table = self.manifest.properties_of(effect_name)
+            else:
+                table = flatten_properties(self.manifest[effect_name])
+            self._tables[effect_name] = table
+        return table
+
+    def lookup(self, effect_key, prop_name):
+        """Returns PropertyInfo for (effect, property), or None if either is unknown."""
+        effect_name = self.resolve_effect(effect_key)
+        if effect_name is None:
+            return None
+        return self.properties(effect_name).get(prop_name)
@@ -0,0 +1,219 @@
+# manifest_search.py
+#
+# Description: Persistent fuzzy search over 'effects_manifest.json'.
+# Effect names, effect matchNames, tags and property names are indexed by
+# their trigrams (each word padded like PostgreSQL's pg_trgm: two spaces
+# before, one after); property matchNames ("ADBE Glo2-0001"), which only
+# differ in their numbers, are matched exactly instead. The index is stored
+# next to the compiled manifest in .aigen_cache and rebuilt when the
+# manifest changes. Candidates are scored by the trigrams they share with
+# the query (the mean of the Jaccard similarity and the share of the
+# query's trigrams found), so typos ("Gausian Blur") and fragments ("blur")
+# both find their targets.
+#
+
+import json
+import os
+import pickle
+import re
+import struct
+import sys
+from collections import Counter, namedtuple
+from itertools import chain
+
+import manifest_cache
+
+SEARCH_MAGIC = b"AIGENSX1"
+SEARCH_FORMAT_VERSION = 1
+
+# magic, format version, source mtime_ns, source size, source sha256
+_HEADER = struct.Struct("<8sIQQ32s")
+
+KINDS = ("effect", "matchName", "tag", "property", "propertyMatchName")
+MIN_SCORE = 0.3
+SUGGEST_SCORE = 0.5  # "did you mean" only offers fairly close matches
+
+_WORD = re.compile(r"[^\W_]+")
+
+# A hit: 'effects' are the effects the text belongs to (as 'kind').
+Match = namedtuple("Match", ["score", "text", "kind", "effects"])
+
+# Manifest path -> (mtime_ns, size, SearchIndex), so long-running processes load the index once.
+_loaded = {}
+
+
+def search_path_for(manifest_path):
+    """Returns the search index path used for a given manifest file."""
+    return os.path.splitext(manifest_cache.cache_path_for(manifest_path))[0] + ".sindex"
+
+
+def trigrams(text):
+    """The set of padded, lowercased word trigrams of 'text'."""
+    grams = set()
+    for word in _WORD.findall(str(text).lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """Trigram postings over every name in the manifest."""
+
+    def __init__(self, texts, owners, postings, sizes, exact):
+        self.texts = texts        # indexed names, as written in the manifest
+        self.owners = owners      # per text: ((kind, effect display name), ...)
+        self.postings = postings  # trigram -> text ids
+        self.sizes = sizes        # per text: number of distinct trigrams
+        self.exact = exact        # lowercased property matchName -> ((matchName, effect), ...)
+
+    @classmethod
+    def build(cls, manifest):
+        ids, texts, owners, exact = {}, [], [], {}
+
+        def add(text, kind, effect):
+            if not text:
+                return
+            i = ids.get(text)
+            if i is None:
+                i = ids[text] = len(texts)
+                texts.append(text)
+                owners.append([])
+            if (kind, effect) not in owners[i]:
+                owners[i].append((kind, effect))
+
+        for name, info in manifest.items():
+            if name == "_meta" or not isinstance(info, dict):
+                continue
+            add(name, "effect", name)
+            add(info.get("matchName"), "matchName", name)
+            for tag in info.get("tags") or []:
+                add(tag, "tag", name)
+            for group in info.get("groups", []):
+                for prop_name, details in group.get("properties", {}).items():
+                    add(prop_name, "property", name)
+                    match_name = details.get("matchName")
+                    if match_name:
+                        exact.setdefault(match_name.lower(), []).append((match_name, name))
+
+        postings, sizes = {}, []
+        for i, text in enumerate(texts):
+            grams = trigrams(text)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        return cls(texts, [tuple(o) for o in owners], {g: tuple(p) for g, p in postings.items()}, sizes,
+                   {k: tuple(v) for k, v in exact.items()})
+
+    def search(self, query, kinds=None, effect=None, limit=10, min_score=MIN_SCORE):
+        """
+        Best matches for 'query', highest score first. 'kinds' limits the
+        kinds of names searched; 'effect' limits hits to one effect's names.
+        """
+        hits = []
+        if kinds is None or "propertyMatchName" in kinds:
+            for text, owner in self.exact.get(str(query).strip().lower(), ()):
+                if effect is None or owner == effect:
+                    hits.append(Match(1.0, text, "propertyMatchName", (owner,)))
+        grams = trigrams(query)
+        if not grams:
+            return hits[:limit]
+        shared = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        q = len(grams)
+        least = min_score * q  # the score never exceeds shared / q
+        sizes = self.sizes
+        for i, n in shared.items():
+            if n < least:
+                continue
+            score = (n / (q + sizes[i] - n) + n / q) / 2
+            if score < min_score:
+                continue
+            by_kind = {}
+            for kind, owner in self.owners[i]:
+                if (kinds is None or kind in kinds) and (effect is None or owner == effect):
+                    by_kind.setdefault(kind, []).append(owner)
+            for kind, effects in by_kind.items():
+                hits.append(Match(round(score, 3), self.texts[i], kind, tuple(effects)))
+        hits.sort(key=lambda m: (-m.score, KINDS.index(m.kind), m.text))
+        return hits[:limit]
+
+    def suggest_effect(self, name, limit=3):
+        """Effect display names close to an unknown effect name or matchName."""
+        names = []
+        for match in self.search(name, ("effect", "matchName", "tag"), limit=limit * 4, min_score=SUGGEST_SCORE):
+            for effect in match.effects:
+                if effect not in names:
+                    names.append(effect)
+        return names[:limit]
+
+    def suggest_property(self, effect, name, limit=3):
+        """Property names of 'effect' close to an unknown property name."""
+        names = []
+        for match in self.search(name, ("property", "propertyMatchName"), effect, limit * 4, SUGGEST_SCORE):
+            if match.text not in names:
+                names.append(match.text)
+        return names[:limit]
+
+
+def build_search_index(manifest_path, index_path=None):
+    """Builds the index for 'manifest_path' and writes it atomically. Returns the SearchIndex."""
+    index_path = index_path or search_path_for(manifest_path)
+    st = os.stat(manifest_path)
+    digest = manifest_cache.file_sha256(manifest_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        index = SearchIndex.build(json.load(f))
+    blob = pickle.dumps((index.texts, index.owners, index.postings, index.sizes, index.exact),
+                        protocol=pickle.HIGHEST_PROTOCOL)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(SEARCH_MAGIC, SEARCH_FORMAT_VERSION, st.st_mtime_ns, st.st_size, digest))
+        f.write(blob)
+    os.replace(tmp_path, index_path)
+    return index
+
+
+def _read_index(index_path, manifest_path):
+    """The stored index if it was built from the current manifest, else None."""
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    magic, version, mtime_ns, size, digest = _HEADER.unpack_from(data, 0)
+    if magic != SEARCH_MAGIC or version != SEARCH_FORMAT_VERSION:
+        return None
+    st = os.stat(manifest_path)
+    if st.st_size != size:
+        return None
+    if st.st_mtime_ns != mtime_ns and manifest_cache.file_sha256(manifest_path) != digest:
+        return None
+    return SearchIndex(*pickle.loads(data[_HEADER.size:]))
+
+
+def load_search_index(manifest_path, index_path=None):
+    """
+    Returns the SearchIndex for 'manifest_path', building it when it is
+    missing or stale. If the cache directory cannot be written, the index is
+    built in memory only. Raises OSError if the manifest can't be read.
+    """
+    key = os.path.abspath(manifest_path)
+    st = os.stat(manifest_path)
+    loaded = _loaded.get(key)
+    if loaded is not None and loaded[:2] == (st.st_mtime_ns, st.st_size) and index_path is None:
+        return loaded[2]
+
+    index_path = index_path or search_path_for(manifest_path)
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = _read_index(index_path, manifest_path)
+        except (ValueError, pickle.UnpicklingError, struct.error, EOFError, TypeError) as e:
+            print(f"Warning: Ignoring unreadable search index ({e}); rebuilding.", file=sys.stderr)
+    if index is None:
+        try:
+            index = build_search_index(manifest_path, index_path)
+        except OSError as e:
+            if not os.path.exists(manifest_path):
+                raise
+            print(f"Warning: Could not write search index '{index_path}': {e}", file=sys.stderr)
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                index = SearchIndex.build(json.load(f))
+    _loaded[key] = (st.st_mtime_ns, st.st_size, index)
+    return index
@@ -0,0 +1,305 @@
+# project_diff.py
+#
+# Description: Structural diff of two project JSON files (exporter output or
+# translated blueprints), e.g. an export against its round trip through
+# json_to_aigen.py and the translator.
+# Both sides are first normalized like roundtrip_check.py does (Transform
+# groups flattened, effect properties keyed by their manifest index, asset
+# paths and matchName/name metadata dropped), so the two forms compare;
+# --raw diffs the files as they are.
+# The walk is top-down over Merkle hashes: an object's hash combines its
+# keys with its children's hashes and an array's the hashes of its items,
+# so each node is serialized once and the hashes are memoized by identity.
+# Shallow subtrees (keyframe arrays, vectors) are hashed from their canonical
+# JSON by orjson, or json, in one call. Two objects or arrays are only
+# walked when their hashes differ, so identical compositions, layers and
+# keyframe arrays are skipped by one comparison.
+# Compositions and layers are matched by name, effects by matchName and
+# assets by id (repeated keys by occurrence), so reordering shows up as one
+# 'reordered' entry instead of a cascade of changes; other arrays are
+# compared item by item. Hashes are exact; numbers that differ within the
+# tolerance make their subtrees walk, and the leaves compare as equal.
+# The report is JSON: every difference has a path, a kind (changed, added,
+# removed, reordered) and the values on either side.
+# Usage: python project_diff.py LEFT.json RIGHT.json [--tolerance T] [--raw]
+#        [--report OUT.json] [--json] [--limit N]
+#
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+TOLERANCE = 1e-6
+# array name -> key its items are matched by
+MATCH_KEYS = {"compositions": "name", "layers": "name", "effects": "matchName", "assets": "id"}
+LIMIT = 20  # differences printed without --json
+LEAF_HEIGHT = 3  # subtrees this deep or less are hashed as one canonical JSON leaf
+
+def load_json(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def normalize(left, right):
+    """Normalizes both documents in place like roundtrip_check.py (needs the effects manifest)."""
+    import roundtrip_check
+    import aigen_to_json_translator as translator
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = translator.load_effects_index()
+    return roundtrip_check.normalize_blueprint(left, index), roundtrip_check.normalize_blueprint(right, index)
+
+
+def canonical(node):
+    """Canonical JSON bytes of a subtree (sorted keys, no whitespace)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(node, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(node, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class TreeHasher:
+    """
+    Merkle hashes of subtrees, memoized by identity. An object hashes its
+    sorted keys with its members' hashes and an array its items' hashes, so
+    each node is serialized once however deep it sits. Subtrees at most
+    LEAF_HEIGHT levels deep (keyframe arrays, vectors) are hashed from their
+    canonical JSON in one call instead of node by node.
+    """
+
+    def __init__(self):
+        self.hashes = {}  # id(object or array) -> digest, for nodes above LEAF_HEIGHT
+        self.leaves = {}  # id(object or array) -> digest, for leaf subtrees the diff walked into
+
+    def digest(self, node):
+        key = id(node)
+        found = self.hashes.get(key) or self.leaves.get(key)
+        if found is None:
+            if self._visit(node) <= LEAF_HEIGHT:
+                found = self.leaves[key] = _leaf_digest(canonical(node))
+            else:
+                found = self.hashes[key]
+        return found
+
+    def _visit(self, node):
+        """Returns the height of a subtree and stores the digest of every node in it above LEAF_HEIGHT."""
+        if id(node) in self.hashes:
+            return LEAF_HEIGHT + 1
+        is_dict = type(node) is dict
+        height, nested = 1, {}
+        for k, v in node.items() if is_dict else enumerate(node):
+            if type(v) is dict or type(v) is list:
+                child_height = nested[k] = self._visit(v)
+                if child_height >= height:
+                    height = child_height + 1
+        if height <= LEAF_HEIGHT:
+            return height
+        if is_dict:
+            # Members that are leaves go in as one canonical object, then each deeper member's key and hash.
+            h = hashlib.blake2b(b"{", digest_size=16)
+            deep = sorted(k for k, child_height in nested.items() if child_height > LEAF_HEIGHT)
+            h.update(_framed(canonical({k: v for k, v in node.items() if k not in deep} if deep else node)))
+            for k in deep:
+                h.update(_framed(canonical(k)))
+                h.update(self.hashes[id(node[k])])
+        else:
+            h = hashlib.blake2b(b"[", digest_size=16)
+            for i, v in enumerate(node):
+                if nested.get(i, 0) > LEAF_HEIGHT:
+                    h.update(b"#" + self.hashes[id(v)])
+                else:
+                    h.update(_framed(canonical(v)))
+        self.hashes[id(node)] = h.digest()
+        return height
+
+
+def _framed(data):
+    return b"=" + len(data).to_bytes(4, "little") + data
+
+
+def _leaf_digest(data):
+    return hashlib.blake2b(b"=" + data, digest_size=16).digest()
+
+
+def _keyed(items, key):
+    """{match key: item} for a list of objects that all have 'key' (repeats get '#2', '#3'...), else None."""
+    keyed, seen = {}, {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get(key), (str, int)):
+            return None
+        name = str(item[key])
+        seen[name] = seen.get(name, 0) + 1
+        keyed[name if seen[name] == 1 else f"{name}#{seen[name]}"] = item
+    return keyed
+
+
+class ProjectDiff:
+    """Walks two documents side by side, skipping subtrees whose Merkle hashes match."""
+
+    def __init__(self, tolerance=TOLERANCE):
+        self.tolerance = tolerance
+        self.hasher = TreeHasher()
+        self.differences = []
+        self.skipped = 0   # equal subtrees skipped by hash
+        self.compared = 0  # objects and arrays walked
+
+    def _add(self, path, kind, **values):
+        self.differences.append(dict(path=path or "/", kind=kind, **values))
+
+    def _equal_leaves(self, a, b):
+        numbers = (int, float)
+        if isinstance(a, numbers) and isinstance(b, numbers) and not isinstance(a, bool) and not isinstance(b, bool):
+            return a == b or math.isclose(a, b, rel_tol=self.tolerance, abs_tol=self.tolerance)
+        return type(a) is type(b) and a == b
+
+    def compare(self, left, right, path="", name=None):
+        containers = (dict, list)
+        if not isinstance(left, containers) or not isinstance(right, containers) or type(left) is not type(right):
+            if not self._equal_leaves(left, right):
+                self._add(path, "changed", left=left, right=right)
+            return
+        if self.hasher.digest(left) == self.hasher.digest(right):
+            self.skipped += 1
+            return
+        self.compared += 1
+        if isinstance(left, dict):
+            for key in list(left) + [k for k in right if k not in left]:
+                child = f"{path}/{key}"
+                if key not in right:
+                    self._add(child, "removed", left=left[key])
+                elif key not in left:
+                    self._add(child, "added", right=right[key])
+                else:
+                    self.compare(left[key], right[key], child, key)
+            return
+        match_key = MATCH_KEYS.get(name)
+        left_keyed = _keyed(left, match_key) if match_key else None
+        right_keyed = _keyed(right, match_key) if left_keyed is not None else None
+        if right_keyed is None:
+            for i, (a, b) in enumerate(zip(left, right)):
+                self.compare(a, b, f"{path}[{i}]")
+            for i in range(len(right), len(left)):
+                self._add(f"{path}[{i}]", "removed", left=left[i])
+            for i in range(len(left), len(right)):
+                self._add(f"{path}[{i}]", "added", right=right[i])
+            return
+        common = [key for key in left_keyed if key in right_keyed]
+        if common != [key for key in right_keyed if key in left_keyed]:
+            self._add(path, "reordered", left=common, right=[key for key in right_keyed if key in left_keyed])
+        for key, item in left_keyed.items():
+            child = f"{path}[{json.dumps(key, ensure_ascii=False)}]"
+            if key in right_keyed:
+                self.compare(item, right_keyed[key], child)
+            else:
+                self._add(child, "removed", left=item)
+        for key, item in right_keyed.items():
+            if key not in left_keyed:
+                self._add(f"{path}[{json.dumps(key, ensure_ascii=False)}]", "added", right=item)
+
+    def summary(self):
+        kinds = {}
+        for difference in self.differences:
+            kinds[difference["kind"]] = kinds.get(difference["kind"], 0) + 1
+        return {"differences": len(self.differences), "byKind": kinds, "subtreesSkipped": self.skipped,
+                "subtreesCompared": self.compared, "subtreesHashed": len(self.hasher.hashes)}
+
+
+def diff_files(left_path, right_path, tolerance=TOLERANCE, raw=False):
+    """Returns the JSON report comparing two project files."""
+    start = time.perf_counter()
+    left, right = load_json(left_path), load_json(right_path)
+    loaded = time.perf_counter()
+    if not raw:
+        left, right = normalize(left, right)
+    normalized = time.perf_counter()
+    differ = ProjectDiff(tolerance)
+    differ.compare(left, right)
+    done = time.perf_counter()
+    return {
+        "left": left_path,
+        "right": right_path,
+        "tolerance": tolerance,
+        "normalized": not raw,
+        "equal": not differ.differences,
+        "summary": differ.summary(),
+        "seconds": {"load": round(loaded - start, 4), "normalize": round(normalized - loaded, 4),
+                    "diff": round(done - normalized, 4)},
+        "differences": differ.differences,
+    }
+
+
+def _short(value, width=60):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def print_report(report, limit=LIMIT):
+    summary = report["summary"]
+    if report["equal"]:
+        print(f"No differences ({summary['subtreesSkipped']} subtree(s) matched by hash, "
+              f"{report['seconds']['diff'] * 1000:.1f} ms).")
+        return
+    for difference in report["differences"][:limit]:
+        kind, path = difference["kind"], difference["path"]
+        if kind == "changed":
+            print(f"  ~ {path}: {_short(difference['left'])} -> {_short(difference['right'])}")
+        elif kind == "removed":
+            print(f"  - {path}: {_short(difference['left'])}")
+        elif kind == "added":
+            print(f"  + {path}: {_short(difference['right'])}")
+        else:
+            print(f"  ^ {path}: order {_short(difference['left'])} -> {_short(difference['right'])}")
+    if len(report["differences"]) > limit:
+        print(f"  ... and {len(report['differences']) - limit} more (see --report / --json)")
+    kinds = ", ".join(f"{count} {kind}" for kind, count in sorted(summary["byKind"].items()))
+    print(f"{summary['differences']} difference(s): {kinds}; {summary['subtreesSkipped']} subtree(s) matched by "
+          f"hash, {summary['subtreesCompared']} walked ({report['seconds']['diff'] * 1000:.1f} ms).")
+
+
+def add_arguments(parser):
+    parser.add_argument("left", help="Project JSON (exporter output or blueprint)")
+    parser.add_argument("right", help="Project JSON to compare it with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"Numbers closer than this (absolute or relative) are equal (default: {TOLERANCE}).")
+    parser.add_argument("--raw", action="store_true",
+                        help="Compare the files as they are, without normalizing exporter and blueprint forms.")
+    parser.add_argument("--report", default=None, metavar="OUT.json", help="Write the JSON report to OUT.json.")
+    parser.add_argument("--json", action="store_true", help="Print the JSON report instead of a summary.")
+    parser.add_argument("--limit", type=int, default=LIMIT, help=f"Differences printed (default: {LIMIT}).")
+
+
+def run(args, parser):
+    """Exits with 0 when the files match, 1 when they differ and 2 when one can't be read."""
+    try:
+        report = diff_files(args.left, args.right, args.tolerance, args.raw)
+    except (OSError, ValueError) as e:
+        print(f"Cannot compare: {e}", file=sys.stderr)
+        sys.exit(2)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, args.limit)
+        if args.report:
+            print(f"Report written to {args.report}")
+    sys.exit(0 if report["equal"] else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Structural diff of two project JSON files (exports or blueprints).")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
@@ -0,0 +1,525 @@
+# project_model.py
+#
+# Description: Slotted in-memory project model shared by the translator and
+# json_to_aigen.py: Project, Asset, Composition, Layer, Effect, Property and
+# Keyframe. Every node keeps the keys it knows in slots, anything else in
+# 'extra', and its source key order as a key tuple shared by all nodes of
+# the same shape, so to_dict() gives back exactly the data it was parsed
+# from while a layer or keyframe costs a slotted object instead of a dict.
+# The shape of a property (bare value, value, keyframe list, compact run,
+# group or plain mapping) is decided once, when it is parsed, and kept in
+# Property.kind, so the converters dispatch on it instead of re-testing
+# dict keys.
+# Parsing is lazy. Project.open keeps each composition of a JSON file as
+# its source text (chunk files of a chunked blueprint are not even read)
+# until one of its attributes is used; within a composition, layer
+# properties and keyframe lists become model objects on first access, so
+# a layer that is only passed through (as the translator does) costs its
+# shell and gives back its source data untouched.
+#
+
+import functools
+import json
+import os
+
+READ_CHUNK = 1 << 20
+STREAMED_SECTION = "compositions"
+
+# Property.kind
+BARE = "bare"            # not a mapping: number, string, list...
+VALUE = "value"          # {value, ...} (also with a 'keyframes' that is neither a list nor a mapping)
+KEYFRAMES = "keyframes"  # {keyframes: [...], ...}
+RUN = "run"              # {keyframes: {start, step, values}, ...}
+GROUP = "group"          # exporter group: {matchName, name, properties: {...}}
+MAPPING = "mapping"      # any other mapping: sourceParameters, audio specs, columnar arrays...
+
+_key_tuples = {}
+
+
+def _keys(data):
+    """The key tuple of a mapping, shared by every node whose keys are the same, in the same order."""
+    keys = tuple(data)
+    return _key_tuples.setdefault(keys, keys)
+
+
+TIME_VALUE = _keys(("time", "value"))
+INDEX_VALUE_DATA = _keys(("index", "value_data"))
+BLUEPRINT_EFFECT = _keys(("matchName", "name", "properties"))
+
+
+# ---------------------------------------------------------------------------
+# Nodes
+# ---------------------------------------------------------------------------
+
+class Node:
+    """Base of the model classes: FIELDS maps the keys kept in slots to their slot names."""
+
+    __slots__ = ("extra", "keys")
+    FIELDS = {}
+
+    def _fill(self, data):
+        self.keys = _keys(data)
+        self.extra = None
+        fields = self.FIELDS
+        for key, value in data.items():
+            slot = fields.get(key)
+            if slot is not None:
+                setattr(self, slot, self._parse_field(key, value))
+            elif self.extra is None:
+                self.extra = {key: value}
+            else:
+                self.extra[key] = value
+
+    @classmethod
+    def parse(cls, data):
+        node = cls()
+        node._fill(data)
+        return node
+
+    def _parse_field(self, key, value):
+        return value
+
+    def _emit_field(self, key, value):
+        return value
+
+    def has(self, key):
+        return key in self.keys
+
+    def field(self, key):
+        """The value of 'key' in source form (nested nodes turned back into dicts and lists)."""
+        slot = self.FIELDS.get(key)
+        if slot is None:
+            return self.extra[key]
+        return self._emit_field(key, getattr(self, slot))
+
+    def to_dict(self):
+        return {key: self.field(key) for key in self.keys}
+
+
+def _emit(item):
+    return item.to_dict() if isinstance(item, Node) else item
+
+
+class Keyframe(Node):
+    __slots__ = ("time", "value")
+    FIELDS = {"time": "time", "value": "value"}
+
+    def __init__(self, time=None, value=None, extra=None, keys=TIME_VALUE):
+        self.time = time
+        self.value = value
+        self.extra = extra
+        self.keys = keys
+
+    @classmethod
+    def parse(cls, data):
+        keys = tuple(data)
+        if keys == TIME_VALUE:
+            return cls(data["time"], data["value"])
+        keys = _key_tuples.setdefault(keys, keys)
+        extra = {k: v for k, v in data.items() if k != "time" and k != "value"} or None
+        return cls(data.get("time"), data.get("value"), extra, keys)
+
+    def is_plain(self):
+        """True for a bare {time, value} keyframe (no easing or other keys)."""
+        return self.extra is None and len(self.keys) == 2
+
+    def to_dict(self):
+        if self.keys is TIME_VALUE:
+            return {"time": self.time, "value": self.value}
+        return Node.to_dict(self)
+
+
+class Property(Node):
+    """
+    One property value. 'kind' says which slots are used: 'value' (BARE and
+    VALUE), 'keyframes' (KEYFRAMES: a list of Keyframes and raw items, made
+    on first access; RUN: the run mapping), 'children' (GROUP and MAPPING,
+    name -> Property).
+    """
+
+    __slots__ = ("kind", "value", "_keyframes", "_keyframes_parsed", "children", "match_name")
+    FIELDS = {"value": "value", "keyframes": "_keyframes", "matchName": "match_name"}
+
+    def __init__(self, kind=BARE, value=None):
+        self.kind = kind
+        self.value = value
+        self._keyframes = None
+        self._keyframes_parsed = False
+        self.children = None
+        self.match_name = None
+        self.extra = None
+        self.keys = ()
+
+    @classmethod
+    def parse(cls, data):
+        if not isinstance(data, dict):
+            return cls(BARE, data)
+        prop = cls()
+        if isinstance(data.get("properties"), dict):
+            prop.kind = GROUP
+            prop._fill(data)
+            prop.children = {k: cls.parse(v) for k, v in prop.extra.pop("properties").items()}
+            prop.extra = prop.extra or None
+        elif "value" not in data and "keyframes" not in data:
+            prop.kind = MAPPING
+            prop.keys = _keys(data)
+            prop.children = {k: cls.parse(v) for k, v in data.items()}
+            prop.match_name = data.get("matchName")
+        else:
+            prop._fill(data)
+            keyframes = prop._keyframes
+            prop.kind = KEYFRAMES if isinstance(keyframes, list) else RUN if isinstance(keyframes, dict) else VALUE
+        return prop
+
+    @property
+    def keyframes(self):
+        if self.kind is KEYFRAMES and not self._keyframes_parsed:
+            parse = Keyframe.parse
+            self._keyframes = [parse(kf) if type(kf) is dict else kf for kf in self._keyframes]
+            self._keyframes_parsed = True
+        return self._keyframes
+
+    def _emit_field(self, key, value):
+        if key == "keyframes" and self._keyframes_parsed and type(value) is list:
+            return [kf.to_dict() if type(kf) is Keyframe else kf for kf in value]
+        return value
+
+    def field(self, key):
+        if key == "properties" and self.kind is GROUP:
+            return {k: child.to_dict() for k, child in self.children.items()}
+        return Node.field(self, key)
+
+    def to_dict(self):
+        if self.kind is BARE:
+            return self.value
+        if self.kind is MAPPING:
+            return {k: child.to_dict() for k, child in self.children.items()}
+        return Node.to_dict(self)
+
+
+def _properties(value):
+    """Parses a name -> value mapping of properties; anything else is kept as it is."""
+    if isinstance(value, dict):
+        return {name: Property.parse(prop) for name, prop in value.items()}
+    return value
+
+
+def _emit_properties(value):
+    if isinstance(value, dict):
+        return {name: prop.to_dict() for name, prop in value.items()}
+    return value
+
+
+class Effect(Node):
+    """
+    An effect in any of its three forms. 'properties' is name -> Property
+    (exporter and AIGEN form) or a list of (index, Property) pairs (blueprint
+    form; items that are not {index, value_data} stay as they are).
+    """
+
+    __slots__ = ("type", "match_name", "name", "properties")
+    FIELDS = {"type": "type", "matchName": "match_name", "name": "name", "properties": "properties"}
+
+    def __init__(self):
+        self.type = None
+        self.match_name = None
+        self.name = None
+        self.properties = None
+
+    @classmethod
+    def blueprint(cls, match_name, name, properties):
+        """A blueprint-form effect: {matchName, name, properties: [{index, value_data}]}."""
+        effect = cls()
+        effect.match_name = match_name
+        effect.name = name
+        effect.properties = properties
+        effect.extra = None
+        effect.keys = BLUEPRINT_EFFECT
+        return effect
+
+    def _parse_field(self, key, value):
+        if key != "properties":
+            return value
+        if isinstance(value, list):
+            return [(item["index"], Property.parse(item["value_data"]))
+                    if isinstance(item, dict) and _keys(item) is INDEX_VALUE_DATA else item for item in value]
+        return _properties(value)
+
+    def _emit_field(self, key, value):
+        if key != "properties":
+            return value
+        if isinstance(value, list):
+            return [{"index": item[0], "value_data": item[1].to_dict()} if type(item) is tuple else item
+                    for item in value]
+        return _emit_properties(value)
+
+
+class Layer(Node):
+    """
+    'properties' is name -> Property, parsed on first access (a layer that
+    is only passed through gives back its source mapping); 'effects' is a
+    list of Effects, or name -> Effect as exported.
+    """
+
+    __slots__ = ("name", "type", "_properties", "_properties_parsed", "effects")
+    FIELDS = {"name": "name", "type": "type", "properties": "_properties", "effects": "effects"}
+
+    def __init__(self):
+        self.name = None
+        self.type = None
+        self._properties = None
+        self._properties_parsed = False
+        self.effects = None
+
+    @property
+    def properties(self):
+        if not self._properties_parsed:
+            self._properties = _properties(self._properties)
+            self._properties_parsed = True
+        return self._properties
+
+    def _parse_field(self, key, value):
+        if key == "effects":
+            if isinstance(value, list):
+                return [Effect.parse(effect) if isinstance(effect, dict) else effect for effect in value]
+            if isinstance(value, dict):
+                return {name: Effect.parse(effect) if isinstance(effect, dict) else effect
+                        for name, effect in value.items()}
+        return value
+
+    def _emit_field(self, key, value):
+        if key == "properties":
+            return _emit_properties(value) if self._properties_parsed else value
+        if key == "effects":
+            if isinstance(value, list):
+                return [_emit(effect) for effect in value]
+            if isinstance(value, dict):
+                return {name: _emit(effect) for name, effect in value.items()}
+        return value
+
+
+class Asset(Node):
+    __slots__ = ("id", "path")
+    FIELDS = {"id": "id", "path": "path"}
+
+    def __init__(self):
+        self.id = None
+        self.path = None
+
+
+class Composition(Node):
+    """
+    A composition parsed on first access. 'source' is its dict, its JSON
+    text, or a function returning either; nothing is parsed (or read) until
+    an attribute is used.
+    """
+
+    __slots__ = ("name", "layers", "_source")
+    FIELDS = {"name": "name", "layers": "layers"}
+
+    def __init__(self, source):
+        self._source = source
+
+    def __getattr__(self, attr):
+        # Only reached for slots that are not set yet, i.e. before the composition is parsed.
+        if attr == "_source" or self._source is None:
+            raise AttributeError(attr)
+        self._load()
+        return object.__getattribute__(self, attr)
+
+    @property
+    def loaded(self):
+        return self._source is None
+
+    def _load(self):
+        source = self._source
+        if callable(source):
+            source = source()
+        if isinstance(source, (str, bytes)):
+            source = json.loads(source)
+        self.name = None
+        self.layers = None
+        self._fill(source)
+        self._source = None
+
+    @classmethod
+    def parse(cls, data):
+        return cls(data)
+
+    def _parse_field(self, key, value):
+        if key == "layers" and isinstance(value, list):
+            return [Layer.parse(layer) if isinstance(layer, dict) else layer for layer in value]
+        return value
+
+    def _emit_field(self, key, value):
+        if key == "layers" and isinstance(value, list):
+            return [_emit(layer) for layer in value]
+        return value
+
+
+class Project(Node):
+    """Top-level sections; 'compositions' holds Compositions (parsed on first access)."""
+
+    __slots__ = ("assets", "compositions")
+    FIELDS = {"assets": "assets", "compositions": "compositions"}
+
+    def __init__(self):
+        self.assets = None
+        self.compositions = None
+
+    def _parse_field(self, key, value):
+        if not isinstance(value, list):
+            return value
+        if key == "assets":
+            return [Asset.parse(asset) if isinstance(asset, dict) else asset for asset in value]
+        return [Composition(comp) if isinstance(comp, dict) else comp for comp in value]
+
+    def _emit_field(self, key, value):
+        if isinstance(value, list):
+            return [_emit(item) for item in value]
+        return value
+
+    @classmethod
+    def open(cls, json_path):
+        """
+        Reads a project JSON file (export or blueprint, chunked too). Each
+        composition is kept as its source text until it is first used.
+        """
+        sections = {}
+        with open(json_path, 'r', encoding='utf-8') as f:
+            for key, value in read_sections(f, json_path, keep_text=True):
+                sections[key] = list(value) if key == STREAMED_SECTION and hasattr(value, "__next__") else value
+        return cls.parse(sections)
+
+
+# ---------------------------------------------------------------------------
+# Incremental JSON reading
+# ---------------------------------------------------------------------------
+
+class JsonSectionReader:
+    """
+    Reads a top-level JSON object section by section. Every section is
+    decoded whole except 'compositions', whose items are decoded one by one.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=READ_CHUNK):
+        if self._eof:
+            return False
+        data = self._f.read(size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos}, found '{self._buf[self._pos]}'")
+        self._pos += 1
+
+    def read_value(self, keep_text=False):
+        """
+        Decodes the next value, reading more input (in growing chunks) until it
+        is complete. With 'keep_text', returns (value, its JSON text).
+        """
+        self._peek()
+        size = READ_CHUNK
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A number at the very end of the buffer may continue in the next chunk.
+                if end < len(self._buf) or self._eof or not isinstance(value, (int, float)):
+                    start, self._pos = self._pos, end
+                    return (value, self._buf[start:end]) if keep_text else value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+    def _separator(self, closing):
+        """Consumes ',' and returns True, or consumes 'closing' and returns False."""
+        char = self._peek()
+        self._pos += 1
+        if char == ",":
+            return True
+        if char != closing:
+            raise ValueError(f"Expected ',' or '{closing}' at offset {self._pos - 1}")
+        return False
+
+    def iter_items(self, keep_text=False):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value(keep_text)
+            if not self._separator("]"):
+                return
+
+    def iter_sections(self, keep_text=False):
+        """
+        Yields (key, value); the 'compositions' value is an iterator that must
+        be consumed first (of (item, JSON text) pairs with 'keep_text').
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            if key == STREAMED_SECTION and self._peek() == "[":
+                yield key, self.iter_items(keep_text)
+            else:
+                yield key, self.read_value()
+            if not self._separator("}"):
+                return
+
+
+def load_chunk(json_path, chunk):
+    """Reads one composition file of a chunked blueprint (its path is relative to the blueprint)."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(json_path)), chunk), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _compositions(items, json_path, keep_text):
+    for item in items:
+        value, text = item if keep_text else (item, None)
+        if isinstance(value, dict) and "chunk" in value:  # chunked blueprint
+            comp = Composition(functools.partial(load_chunk, json_path, value["chunk"]))
+        elif isinstance(value, dict):
+            comp = Composition(text if keep_text else value)
+        else:
+            comp = value
+        item = value = text = None  # the composition holds its source alone and drops it once parsed
+        yield comp
+
+
+def read_sections(f, json_path, keep_text=False):
+    """
+    Yields (key, value) for the sections of an open project JSON file; the
+    'compositions' value is an iterator of Compositions that must be consumed
+    first. With 'keep_text' each one holds its JSON text until it is used,
+    which is several times smaller than the decoded dicts.
+    """
+    for key, value in JsonSectionReader(f).iter_sections(keep_text):
+        if key == STREAMED_SECTION and hasattr(value, "__next__"):
+            value = _compositions(value, json_path, keep_text)
+        yield key, value
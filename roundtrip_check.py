@@ -0,0 +1,174 @@
+# roundtrip_check.py
+#
+# Description: Round-trip check for the JSON -> AIGEN -> JSON pipeline.
+# Each JSON file (exporter output or a translated blueprint) is converted
+# with json_to_aigen.py, translated back with aigen_to_json_translator.py,
+# and compared with the original after both sides are normalized:
+# the Transform group is flattened, matchName/name/animated metadata is
+# dropped, effect properties are keyed by their manifest index, asset paths
+# are ignored and numbers are compared with a small tolerance.
+#
+# Usage: python roundtrip_check.py [files or directories...]   (default: ExportTest/ and examples/json/)
+#
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+
+import aigen_to_json_translator as translator
+import json_to_aigen
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TARGETS = [os.path.join(SCRIPT_DIR, "ExportTest"), os.path.join(SCRIPT_DIR, "examples", "json")]
+TOLERANCE = 1e-6
+MAX_REPORTED = 10
+
+
+def _strip_property(prop):
+    if not isinstance(prop, dict):
+        return prop
+    if isinstance(prop.get("properties"), dict):
+        return {k: _strip_property(v) for k, v in prop["properties"].items()}
+    return {k: _strip_property(v) for k, v in prop.items() if k not in ("matchName", "name", "animated")}
+
+
+def _normalize_properties(properties):
+    normalized = {}
+    for name, prop in (properties or {}).items():
+        if not name.strip():
+            continue
+        if name == "Transform" and isinstance(prop, dict) and "value" not in prop:
+            group = prop.get("properties") if isinstance(prop.get("properties"), dict) else prop
+            for sub_name, sub_prop in group.items():
+                normalized[f"Transform.{sub_name}"] = _strip_property(sub_prop)
+        else:
+            normalized[name] = _strip_property(prop)
+    return normalized
+
+
+def _leaf_properties(properties):
+    for name, prop in properties.items():
+        if isinstance(prop, dict) and isinstance(prop.get("properties"), dict):
+            yield from _leaf_properties(prop["properties"])
+        else:
+            yield name, prop
+
+
+def _normalize_effects(effects, index):
+    """Both forms become [{matchName, name, properties: {index: value}}]."""
+    normalized = []
+    if isinstance(effects, dict):
+        for name, effect in effects.items():
+            effect_name = index.resolve_effect(effect.get("matchName")) or index.resolve_effect(name)
+            known = index.properties(effect_name) if effect_name else {}
+            props = {}
+            for prop_name, prop in _leaf_properties(effect.get("properties") or {}):
+                info = known.get(prop.get("matchName")) or known.get(prop_name)
+                if info is not None:
+                    props[str(info.index)] = _strip_property(prop)
+            normalized.append({"matchName": effect.get("matchName"), "name": name, "properties": props})
+    else:
+        for effect in effects or []:
+            props = {str(p.get("index")): _strip_property(p.get("value_data")) for p in effect.get("properties") or []}
+            normalized.append({"matchName": effect.get("matchName"), "name": effect.get("name"), "properties": props})
+    return normalized
+
+
+def normalize_blueprint(data, index):
+    for asset in data.get("assets") or []:
+        asset.pop("path", None)
+    for comp in data.get("compositions") or []:
+        for layer in comp.get("layers") or []:
+            if "properties" in layer:
+                layer["properties"] = _normalize_properties(layer["properties"])
+            if "effects" in layer:
+                layer["effects"] = _normalize_effects(layer["effects"], index)
+            for animator in layer.get("textAnimators") or []:
+                for ap in animator.get("animatorProperties") or []:
+                    if "value_data" in ap:
+                        ap["value_data"] = _strip_property(ap["value_data"])
+                for selector in animator.get("selectors") or []:
+                    if "properties" in selector:
+                        selector["properties"] = _normalize_properties(selector["properties"])
+    return data
+
+
+def compare(expected, actual, path="", diffs=None):
+    """Collects human-readable differences between two JSON values (numbers within TOLERANCE)."""
+    diffs = [] if diffs is None else diffs
+    numbers = (int, float)
+    if isinstance(expected, numbers) and isinstance(actual, numbers) \
+            and not isinstance(expected, bool) and not isinstance(actual, bool):
+        if not math.isclose(expected, actual, rel_tol=TOLERANCE, abs_tol=TOLERANCE):
+            diffs.append(f"{path}: {expected!r} != {actual!r}")
+    elif isinstance(expected, dict) and isinstance(actual, dict):
+        for k in expected.keys() | actual.keys():
+            if k not in actual:
+                diffs.append(f"{path}/{k}: missing after round trip")
+            elif k not in expected:
+                diffs.append(f"{path}/{k}: added by round trip")
+            else:
+                compare(expected[k], actual[k], f"{path}/{k}", diffs)
+    elif isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            diffs.append(f"{path}: {len(expected)} items != {len(actual)} items")
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            compare(a, b, f"{path}[{i}]", diffs)
+    elif expected != actual:
+        diffs.append(f"{path}: {expected!r} != {actual!r}")
+    return diffs
+
+
+def check_file(json_path, index, workdir):
+    """Returns a list of differences (empty when the round trip is faithful)."""
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    aigen_path = os.path.join(workdir, f"{name}.aigen")
+    output_path = os.path.join(workdir, f"{name}.json")
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        if json_to_aigen.convert_json_to_aigen(json_path, aigen_path) is None:
+            return ["json_to_aigen failed"]
+        translator.translate_file(aigen_path, output_path, index, translator.TranslationOptions(image_jobs=1))
+    with open(json_path, 'r', encoding='utf-8') as f:
+        expected = normalize_blueprint(json.load(f), index)
+    with open(output_path, 'r', encoding='utf-8') as f:
+        actual = normalize_blueprint(json.load(f), index)
+    return compare(expected, actual)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that JSON -> AIGEN -> JSON reproduces the blueprint.")
+    parser.add_argument("targets", nargs="*", help="JSON files or directories (default: ExportTest/ and examples/json/)")
+    args = parser.parse_args()
+
+    paths = []
+    for target in args.targets or DEFAULT_TARGETS:
+        paths.extend(sorted(glob.glob(os.path.join(target, "*.json"))) if os.path.isdir(target) else [target])
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = translator.load_effects_index()
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        for json_path in paths:
+            try:
+                diffs = check_file(json_path, index, workdir)
+            except Exception as e:
+                diffs = [f"error: {e}"]
+            if diffs:
+                failed += 1
+                print(f"  [FAIL] {json_path}: {len(diffs)} difference(s)")
+                for diff in diffs[:MAX_REPORTED]:
+                    print(f"         {diff}")
+            else:
+                print(f"  [OK]   {json_path}")
+    print(f"Round trip: {len(paths) - failed} of {len(paths)} file(s) reproduced.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# synthetic_project.py
+#
+# Description: Generates synthetic AIGEN projects of a configurable size for
+# benchmarking (see 'python benchmark.py scaling').
+# Effects and their properties are drawn from the real effects_manifest.json,
+# so every effect translates; layers animate their transforms and effect
+# properties with keyframes, use components, reference globals and show
+# image assets (small PNGs written next to the project). The same size and
+# seed always produce the same file.
+#
+# Usage: python synthetic_project.py OUT.aigen [--compositions N] [--layers N]
+#        [--effects N] [--keyframes N] [--components N] [--globals N]
+#        [--images N] [--seed N] [--manifest PATH] [--rgb-images]
+#
+
+import argparse
+import os
+import random
+import struct
+import sys
+import zlib
+
+import yaml
+
+from manifest_cache import ManifestIndex, load_manifest
+
+try:
+    from yaml import CSafeDumper as Dumper
+except ImportError:
+    from yaml import SafeDumper as Dumper
+
+# Size of a project; each key can be set on the command line.
+DEFAULT_SIZE = {
+    "compositions": 10,  # compositions in the project
+    "layers": 20,        # layers per composition
+    "effects": 3,        # effects per layer
+    "keyframes": 10,     # keyframes per animated property
+    "components": 5,     # components (about half of the layers use one)
+    "globals": 20,       # entries in the globals section (about a third of the layers reference them)
+    "images": 5,         # image assets (Footage layers show them)
+}
+
+# Value types the generator knows how to fill in; others are left at their defaults.
+VALUE_TYPES = ("Slider", "Point", "Point3D", "Color", "Checkbox", "Dropdown")
+ANIMATED_TYPES = ("Slider", "Point", "Point3D", "Color")
+ANIMATED_SHARE = 0.3  # share of the filled effect properties that get keyframes
+PROPERTIES_PER_EFFECT = 6
+IMAGE_SIZE = 64
+
+WIDTH, HEIGHT, FRAME_RATE, DURATION = 1920, 1080, 30, 10
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIR, "effects_manifest.json")
+
+
+def size_from(overrides=None):
+    """DEFAULT_SIZE updated with 'overrides' (unknown keys raise ValueError)."""
+    size = dict(DEFAULT_SIZE)
+    for key, value in (overrides or {}).items():
+        if key not in size:
+            raise ValueError(f"Unknown size key '{key}' (expected one of {', '.join(DEFAULT_SIZE)})")
+        size[key] = int(value)
+    return size
+
+
+def effect_catalog(manifest_index):
+    """(effect name, matchName, [(property name, PropertyInfo)]) for every effect with fillable properties."""
+    catalog = []
+    for name in sorted(k for k in manifest_index.manifest if k != "_meta"):
+        entry = manifest_index.manifest[name]
+        props = []
+        for prop_name, info in manifest_index.properties(name).items():
+            # The table holds each property under its display name and its matchName; keep the display name.
+            if prop_name != info.matchName and info.valueType in VALUE_TYPES:
+                props.append((prop_name, info))
+        if props:
+            catalog.append((name, entry.get("matchName"), sorted(props, key=lambda p: p[1].index)))
+    return catalog
+
+
+def write_png(path, color, alpha=True):
+    """Writes a small solid-color 8-bit PNG (RGBA, or RGB which the image fixer has to convert)."""
+    pixel = bytes(color) + (b"\xff" if alpha else b"")
+    raw = (b"\x00" + pixel * IMAGE_SIZE) * IMAGE_SIZE
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", IMAGE_SIZE, IMAGE_SIZE, 8, 6 if alpha else 2, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw))
+                + chunk(b"IEND", b""))
+
+
+class ProjectGenerator:
+    """Builds one synthetic project (a plain dict, as yaml.safe_load would return it)."""
+
+    def __init__(self, manifest_index, size=None, seed=0):
+        self.size = size_from(size)
+        self.rng = random.Random(seed)
+        self.catalog = effect_catalog(manifest_index)
+        if not self.catalog:
+            raise ValueError("The effects manifest has no usable effects")
+
+    def _number(self, low, high, digits=2):
+        return round(self.rng.uniform(low, high), digits)
+
+    def _static_value(self, value_type, info=None):
+        if value_type == "Slider":
+            low = info.min if info is not None and info.min is not None else 0
+            high = info.max if info is not None and info.max is not None else 100
+            low, high = max(low, -1000), min(high, 1000)
+            return self._number(low, high) if high > low else low
+        if value_type == "Point":
+            return [self._number(0, WIDTH, 1), self._number(0, HEIGHT, 1)]
+        if value_type == "Point3D":
+            return [self._number(0, WIDTH, 1), self._number(0, HEIGHT, 1), self._number(-500, 500, 1)]
+        if value_type == "Color":
+            return [self._number(0, 1, 3) for _ in range(3)]
+        if value_type == "Checkbox":
+            return self.rng.randint(0, 1)
+        return 1  # Dropdown: the first option always exists
+
+    def _keyframes(self, value_type, info=None):
+        count = self.size["keyframes"]
+        step = DURATION / max(count - 1, 1)
+        keyframes = []
+        for i in range(count):
+            keyframe = {"time": round(i * step, 3), "value": self._static_value(value_type, info)}
+            if i and self.rng.random() < 0.25:
+                keyframe["inEase"] = {"speed": 0, "influence": self._number(10, 90, 0)}
+            keyframes.append(keyframe)
+        return keyframes
+
+    def _property(self, value_type, info=None, animated=False):
+        if animated and self.size["keyframes"] > 1:
+            return {"keyframes": self._keyframes(value_type, info)}
+        return {"value": self._static_value(value_type, info)}
+
+    def effect(self):
+        name, match_name, props = self.rng.choice(self.catalog)
+        chosen = props if len(props) <= PROPERTIES_PER_EFFECT else self.rng.sample(props, PROPERTIES_PER_EFFECT)
+        properties = {}
+        for prop_name, info in sorted(chosen, key=lambda p: p[1].index):
+            animated = info.valueType in ANIMATED_TYPES and self.rng.random() < ANIMATED_SHARE
+            properties[prop_name] = self._property(info.valueType, info, animated)
+        effect = {"type": name}
+        if match_name:
+            effect["matchName"] = match_name
+        effect["properties"] = properties
+        return effect
+
+    def components(self):
+        components = []
+        for i in range(self.size["components"]):
+            component = {
+                "id": f"look_{i}",
+                "properties": {
+                    "Transform.Rotation": self._property("Slider", animated=True),
+                    "Transform.Anchor Point": {"value": [0, 0]},
+                },
+            }
+            if i % 2:
+                component["effects"] = [self.effect()]
+            components.append(component)
+        return components
+
+    def globals_map(self):
+        count = self.size["globals"]
+        colors = {f"c{i}": self._static_value("Color") for i in range(count - count // 2)}
+        titles = {f"t{i}": f"Title {i}" for i in range(count // 2)}
+        return {"palette": colors, "text": titles}
+
+    def layer(self, comp_index, layer_index, globals_map, precomp_targets):
+        layer = {"name": f"Layer {comp_index}-{layer_index}"}
+        kind = layer_index % 4
+        if kind == 1 and self.size["images"]:
+            layer["type"] = "Footage"
+            layer["assetId"] = f"image_{self.rng.randrange(self.size['images'])}"
+        elif kind == 3 and precomp_targets:
+            layer["type"] = "Pre-comp"
+            layer["refId"] = self.rng.choice(precomp_targets)
+        elif kind == 2:
+            layer["type"] = "Null"
+        else:
+            layer["type"] = "Solid"
+            layer["properties"] = {"sourceParameters": {"color": self._static_value("Color")}}
+
+        properties = layer.setdefault("properties", {})
+        properties["Transform.Position"] = self._property("Point", animated=True)
+        properties["Transform.Scale"] = {"value": [100, 100, 100]}
+        properties["Transform.Opacity"] = self._property("Slider", animated=self.rng.random() < 0.5)
+
+        if self.size["components"] and self.rng.random() < 0.5:
+            layer["useComponents"] = [f"look_{self.rng.randrange(self.size['components'])}"]
+        if globals_map["palette"] and self.rng.random() < 1 / 3:
+            color = self.rng.choice(list(globals_map["palette"]))
+            if layer["type"] == "Solid":
+                properties["sourceParameters"] = {"color": f"$globals.palette.{color}"}
+            if globals_map["text"]:
+                title = self.rng.choice(list(globals_map["text"]))
+                layer["name"] = f"${{globals.text.{title}}} {comp_index}-{layer_index}"
+        if layer["type"] != "Null":
+            layer["effects"] = [self.effect() for _ in range(self.size["effects"])]
+        return layer
+
+    def composition(self, comp_index, globals_map):
+        # Pre-comp layers only point at later compositions, so there are no cycles.
+        precomp_targets = [f"Comp {i}" for i in range(comp_index + 1, min(comp_index + 4, self.size["compositions"]))]
+        return {
+            "name": f"Comp {comp_index}",
+            "width": WIDTH,
+            "height": HEIGHT,
+            "frameRate": FRAME_RATE,
+            "duration": DURATION,
+            "layers": [self.layer(comp_index, i, globals_map, precomp_targets) for i in range(self.size["layers"])],
+        }
+
+    def project(self, image_dir="images"):
+        """The project dict; image assets point at '<image_dir>/image_N.png'."""
+        globals_map = self.globals_map()
+        return {
+            "projectSettings": {"width": WIDTH, "height": HEIGHT, "frameRate": FRAME_RATE, "duration": DURATION,
+                                "bitsPerChannel": 8},
+            "globals": globals_map,
+            "components": self.components(),
+            "assets": [{"id": f"image_{i}", "path": f"{image_dir}/image_{i}.png"}
+                       for i in range(self.size["images"])],
+            "compositions": [self.composition(i, globals_map) for i in range(self.size["compositions"])],
+        }
+
+
+def write_project(output_path, manifest_index, size=None, seed=0, rgb_images=False):
+    """
+    Writes a synthetic project to 'output_path' and its images to an
+    '<name>_images' folder next to it. RGBA images are used as they are by
+    the translator; RGB ones are re-encoded (into changed/). Returns the
+    size used.
+    """
+    generator = ProjectGenerator(manifest_index, size, seed)
+    base = os.path.splitext(os.path.basename(output_path))[0]
+    image_dir = f"{base}_images"
+    project = generator.project(image_dir)
+    if project["assets"]:
+        full_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), image_dir)
+        os.makedirs(full_dir, exist_ok=True)
+        for i in range(len(project["assets"])):
+            color = [generator.rng.randrange(256) for _ in range(3)]
+            write_png(os.path.join(full_dir, f"image_{i}.png"), color, alpha=not rgb_images)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        yaml.dump(project, f, Dumper=Dumper, sort_keys=False, default_flow_style=None, width=120)
+    return generator.size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic AIGEN project for benchmarking.")
+    parser.add_argument("output", help="Output .aigen file (images go to '<name>_images' next to it)")
+    for key, default in DEFAULT_SIZE.items():
+        parser.add_argument(f"--{key}", type=int, default=default, help=f"(default: {default})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--rgb-images", action="store_true",
+                        help="Write RGB images, which the translator has to re-encode.")
+    args = parser.parse_args()
+    try:
+        manifest_index = ManifestIndex(load_manifest(args.manifest))
+        size = write_project(args.output, manifest_index, {key: getattr(args, key) for key in DEFAULT_SIZE},
+                             args.seed, args.rgb_images)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Synthetic project written: {args.output} (" + ", ".join(f"{k} {v}" for k, v in size.items()) + ")")
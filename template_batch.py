@@ -0,0 +1,349 @@
+# template_batch.py
+#
+# Description: Data-driven templating: one AIGEN template x N data rows -> N
+# blueprints. The template is parsed and translated once, with a unique
+# placeholder in every slot that varies per row; the translated blueprint is
+# encoded once and split around the placeholders, so each row only joins
+# the fixed text with its own (JSON-encoded) values.
+# Rows come from a CSV file (header = column names) or a JSONL file (one
+# object per line) and are streamed to a worker pool in chunks.
+# Columns name their slot:
+#   globals.<path>      a value in the globals section ($globals.<path>)
+#   text.<layer name>   the sourceText of every layer with that name
+#   asset.<id>          the path of an asset (images are fixed like the translator does)
+#   name                the output file name (default: <template>_<row number>)
+# CSV cells for globals are read as JSON when they parse ('42', '[1, 0, 0]'),
+# else as text. Slots must not change the structure the translator builds
+# (layer types, components, keyframe runs), and value-rewriting stages
+# (--simplify, --columnar, --bake-expressions) are not available here.
+#
+# Usage: python aigen.py template TEMPLATE.aigen ROWS.csv|ROWS.jsonl OUT_DIR [--jobs N] [--format minified]
+#
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import secrets
+import sys
+import time
+
+import aigen_to_json_translator as translator
+
+SLOT_KINDS = ("globals", "text", "asset")
+NAME_COLUMN = "name"
+TEMPLATE_FORMATS = ("pretty", "minified")
+CHUNK_ROWS = 64       # rows per worker task
+IN_FLIGHT = 4         # tasks queued per worker, so rows stream instead of being read all at once
+
+_UNSAFE_NAME = re.compile(r"[^\w.\- ]+")
+
+_TEMPLATE = None
+
+
+class TemplateError(Exception):
+    pass
+
+
+def read_rows(path):
+    """Yields (row number, dict) from a CSV or JSONL file; CSV values are strings."""
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, 'r', encoding='utf-8') as f:
+            number = 0
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    raise TemplateError(f"{path}:{line_number}: {e}")
+                if not isinstance(row, dict):
+                    raise TemplateError(f"{path}:{line_number}: expected a JSON object")
+                number += 1
+                yield number, row
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield number, row
+
+
+def read_columns(path):
+    """The column names: the CSV header, or the keys of the first JSONL row."""
+    for _, row in read_rows(path):
+        return list(row)
+    return []
+
+
+def parse_slot(column):
+    """(kind, key) for a slot column, or None for other columns."""
+    kind, _, key = column.partition(".")
+    if kind in SLOT_KINDS and key:
+        return kind, key
+    return None
+
+
+def cell_value(kind, value):
+    """A CSV cell as the value to insert: globals are read as JSON when they parse."""
+    if kind == "globals" and isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def place_slot(data, column, kind, key, value):
+    """Puts a slot's value (or its placeholder) into a parsed template."""
+    if kind == "globals":
+        node = data.setdefault("globals", {})
+        path = key.split(".")
+        for part in path[:-1]:
+            node = node.setdefault(part, {}) if isinstance(node, dict) else None
+            if not isinstance(node, dict):
+                raise TemplateError(f"Column '{column}': 'globals.{'.'.join(path[:-1])}' is not a mapping")
+        node[path[-1]] = value
+    elif kind == "text":
+        found = 0
+        for comp in data.get("compositions") or []:
+            layers = comp.get("layers") if isinstance(comp, dict) else None
+            for layer in layers or []:
+                if isinstance(layer, dict) and layer.get("name") == key:
+                    layer["sourceText"] = value
+                    found += 1
+        if not found:
+            raise TemplateError(f"Column '{column}': no layer named '{key}' in the template")
+    else:
+        for asset in data.get("assets") or []:
+            if isinstance(asset, dict) and str(asset.get("id")) == key:
+                asset["path"] = value
+                return
+        raise TemplateError(f"Column '{column}': no asset with id '{key}' in the template")
+
+
+class Template:
+    """A pre-translated template, split around its slot placeholders."""
+
+    def __init__(self, template_path, columns, manifest_index, output_format="pretty"):
+        import yaml
+        import aigen_stream
+
+        if output_format not in TEMPLATE_FORMATS:
+            raise TemplateError(f"Template mode writes {' or '.join(TEMPLATE_FORMATS)} blueprints, "
+                                f"not '{output_format}'")
+        self.template_path = template_path
+        self.base_dir = os.path.dirname(os.path.abspath(template_path))
+        try:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                data = yaml.load(f, Loader=aigen_stream.SafeLoader) or {}
+        except (OSError, yaml.YAMLError) as e:
+            raise TemplateError(f"Error loading template: {e}")
+
+        self.slots = []  # (column, kind, key)
+        for column in columns:
+            slot = parse_slot(column)
+            if slot is not None:
+                self.slots.append((column,) + slot)
+            elif column != NAME_COLUMN:
+                print(f"Warning: Column '{column}' is not a slot (globals.*, text.*, asset.*); ignored.",
+                      file=sys.stderr)
+        token = secrets.token_hex(4)
+        placeholders = [f"__aigen_slot_{token}_{i}__" for i in range(len(self.slots))]
+        for (column, kind, key), placeholder in zip(self.slots, placeholders):
+            place_slot(data, column, kind, key, placeholder)
+
+        options = translator.TranslationOptions(image_jobs=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            blueprint, self.summary = translator.translate_data(data, template_path, manifest_index, options)
+        _check_keys(blueprint, token)
+        text = aigen_stream.encode_json(blueprint, pretty=output_format == "pretty")
+
+        # parts alternate literal text and (slot index, whole value?) references
+        pattern = re.compile(f'"__aigen_slot_{token}_(\\d+)__"|__aigen_slot_{token}_(\\d+)__')
+        self.parts, position = [], 0
+        used = set()
+        for match in pattern.finditer(text):
+            self.parts.append(text[position:match.start()])
+            whole = match.group(1) is not None
+            index = int(match.group(1) if whole else match.group(2))
+            self.parts.append((index, whole))
+            used.add(index)
+            position = match.end()
+        self.parts.append(text[position:])
+        for i, (column, kind, _) in enumerate(self.slots):
+            if i not in used:
+                print(f"Warning: Column '{column}' does not reach the blueprint (unused {kind} slot).",
+                      file=sys.stderr)
+
+    def asset_path(self, value):
+        """An asset slot's value as the translator would write it (images are fixed, cached)."""
+        import image_pipeline
+        if not isinstance(value, str) or not image_pipeline.is_image_path(value):
+            return value
+        full_path = value if os.path.isabs(value) else os.path.join(self.base_dir, value)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return image_pipeline.fix_images([full_path], jobs=1)[full_path]
+
+    def render(self, row):
+        """The blueprint text for one row. Raises TemplateError when the row lacks a slot's column."""
+        values = []
+        for column, kind, _ in self.slots:
+            if column not in row or row[column] is None:
+                raise TemplateError(f"missing value for '{column}'")
+            value = cell_value(kind, row[column])
+            if kind == "asset":
+                value = self.asset_path(value)
+            values.append(value)
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            index, whole = part
+            value = values[index]
+            if whole:
+                out.append(json.dumps(value, ensure_ascii=False))
+            else:
+                # Interpolated like GlobalsResolver does, then escaped for the surrounding JSON string
+                text = value if isinstance(value, str) else json.dumps(value)
+                out.append(json.dumps(text, ensure_ascii=False)[1:-1])
+        return "".join(out)
+
+
+def _check_keys(node, token):
+    """Slots end up as values only; a placeholder in a key would make the output depend on it structurally."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if token in str(key):
+                raise TemplateError(f"A slot is used as a key ('{key}'); it can't be patched per row")
+            _check_keys(value, token)
+    elif isinstance(node, list):
+        for value in node:
+            _check_keys(value, token)
+
+
+def output_name(template_path, number, row):
+    name = row.get(NAME_COLUMN)
+    if name:
+        name = _UNSAFE_NAME.sub("_", str(name)).strip(" .")
+    if not name:
+        name = f"{os.path.splitext(os.path.basename(template_path))[0]}_{number:05d}"
+    return name + ".json"
+
+
+def _render_chunk(chunk, output_dir):
+    """Worker: writes the blueprints of a chunk of rows. Returns (written, [(row number, error)])."""
+    written, failures = 0, []
+    for number, row in chunk:
+        try:
+            text = _TEMPLATE.render(row)
+            with open(os.path.join(output_dir, output_name(_TEMPLATE.template_path, number, row)), 'w',
+                      encoding='utf-8') as f:
+                f.write(text)
+            written += 1
+        except (TemplateError, OSError) as e:
+            failures.append((number, str(e)))
+    return written, failures
+
+
+def _init_worker(template_path, columns, output_format):
+    global _TEMPLATE
+    if _TEMPLATE is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _TEMPLATE = Template(template_path, columns, translator.load_effects_index(), output_format)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_rows(template_path, rows_path, output_dir, jobs=None, output_format="pretty", manifest_index=None):
+    """
+    Writes one blueprint per data row into 'output_dir'. Returns a summary
+    dict (rows, failed, seconds, blueprintsPerSecond, pretranslateSeconds).
+    """
+    global _TEMPLATE
+    from concurrent.futures import ProcessPoolExecutor
+
+    columns = read_columns(rows_path)
+    start = time.perf_counter()
+    if manifest_index is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            manifest_index = translator.load_effects_index()
+    _TEMPLATE = Template(template_path, columns, manifest_index, output_format)
+    pretranslate = time.perf_counter() - start
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = max(1, jobs or os.cpu_count() or 1)
+
+    written, failures = 0, []
+    render_start = time.perf_counter()
+    chunks = _chunks(read_rows(rows_path), CHUNK_ROWS)
+    if jobs == 1:
+        for chunk in chunks:
+            done, failed = _render_chunk(chunk, output_dir)
+            written += done
+            failures.extend(failed)
+    else:
+        # fork shares the pre-translated template; spawn rebuilds it once per worker in _init_worker.
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        context = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker,
+                                 initargs=(template_path, columns, output_format)) as pool:
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(_render_chunk, chunk, output_dir))
+                if len(pending) >= jobs * IN_FLIGHT:
+                    done, failed = pending.pop(0).result()
+                    written += done
+                    failures.extend(failed)
+            for future in pending:
+                done, failed = future.result()
+                written += done
+                failures.extend(failed)
+    seconds = time.perf_counter() - render_start
+    return {"rows": written + len(failures), "written": written, "failed": failures, "seconds": seconds,
+            "blueprintsPerSecond": written / seconds if seconds > 0 else 0.0,
+            "pretranslateSeconds": pretranslate, "slots": len(_TEMPLATE.slots), "jobs": jobs}
+
+
+def add_arguments(parser):
+    parser.add_argument("template", help="AIGEN template file")
+    parser.add_argument("rows", help="Data rows: a .csv file with a header, or a .jsonl file")
+    parser.add_argument("output_dir", help="Directory for the blueprints (one per row)")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--format", choices=TEMPLATE_FORMATS, default="pretty",
+                        help="Blueprint layout (default: pretty).")
+
+
+def run(args, parser):
+    print(f"--- AIGEN v3.1 Template Mode: {args.template} x {args.rows} ---")
+    try:
+        summary = render_rows(args.template, args.rows, args.output_dir, args.jobs, args.format)
+    except (TemplateError, translator.TranslationError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    for number, error in summary["failed"][:10]:
+        print(f"  [FAIL] row {number}: {error}", file=sys.stderr)
+    if len(summary["failed"]) > 10:
+        print(f"  ... and {len(summary['failed']) - 10} more failed row(s)", file=sys.stderr)
+    print(f"Template pre-translated in {summary['pretranslateSeconds'] * 1000:.1f} ms ({summary['slots']} slot(s)).")
+    print(f"Summary: {summary['written']} blueprint(s) written, {len(summary['failed'])} failed, "
+          f"{summary['seconds']:.2f} s with {summary['jobs']} worker(s), "
+          f"{summary['blueprintsPerSecond']:.0f} blueprints/s")
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render one AIGEN template for every row of a CSV/JSONL file.")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
@@ -0,0 +1,178 @@
+# translation_metrics.py
+#
+# Description: Per-stage profiling for the translator (--profile / --metrics).
+# Each stage (manifest, parse, globals, components, dedup, assets, probe, translate,
+# write, plus fingerprint in incremental builds) records wall time, CPU time and its
+# tracemalloc peak; stages entered more than once (streaming mode works one
+# composition at a time) accumulate. Without memory tracing the peaks are
+# None (not reported) rather than zero, in reports, files and merges alike.
+# Counters hold the size of the job: layers, effects, keyframes, images and
+# unknown effects/properties. A disabled instance costs next to nothing, so
+# the translator always calls it.
+#
+
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+METRICS_FORMAT = 1
+COUNTS = ("compositions", "layers", "effects", "keyframes", "imagesFixed", "imagesReused", "imagesSkipped",
+          "imagesFailed", "proxiesMade", "proxiesReused", "unknownEffects", "unknownProperties")
+
+
+def count_keyframes(node):
+    """Number of keyframes under a node, in list ('keyframes') or columnar ('times') form."""
+    if isinstance(node, dict):
+        total = 0
+        for k, v in node.items():
+            if k in ("keyframes", "times") and isinstance(v, list):
+                total += len(v)
+            elif isinstance(v, (dict, list)):
+                total += count_keyframes(v)
+        return total
+    if isinstance(node, list):
+        return sum(count_keyframes(v) for v in node if isinstance(v, (dict, list)))
+    return 0
+
+
+def max_peak(*peaks):
+    """Largest of the reported peaks, ignoring unreported (None) ones; None when none was reported."""
+    reported = [peak for peak in peaks if peak is not None]
+    return max(reported) if reported else None
+
+
+class TranslationMetrics:
+    """Stage timings and counters for one translation."""
+
+    def __init__(self, enabled=True, memory=True):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.stages = {}
+        self.counts = dict.fromkeys(COUNTS, 0) if enabled else {}
+        self.total = None
+        self._started_tracing = False
+        self._start = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds metrics returned in a translation summary (e.g. from a batch worker)."""
+        metrics = cls(memory=data.get("memory", True))  # files without the flag always traced memory
+        metrics.stages, metrics.counts, metrics.total = data["stages"], data["counts"], data["total"]
+        if not metrics.memory:
+            for record in list(metrics.stages.values()) + [metrics.total or {}]:
+                record["peakBytes"] = None
+        return metrics
+
+    def merge(self, other):
+        """Adds another translation's stages and counts to these (peaks take the maximum of those reported)."""
+        for name, s in other.stages.items():
+            record = self.stages.setdefault(name, self._new_record(None))
+            record["wallSeconds"] += s["wallSeconds"]
+            record["cpuSeconds"] += s["cpuSeconds"]
+            record["calls"] += s["calls"]
+            record["peakBytes"] = max_peak(record["peakBytes"], s.get("peakBytes"))
+        for key, amount in other.counts.items():
+            self.count(key, amount)
+
+    def _new_record(self, peak=0):
+        return {"wallSeconds": 0.0, "cpuSeconds": 0.0, "peakBytes": peak if self.memory else None, "calls": 0}
+
+    def start(self):
+        if not self.enabled:
+            return
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        if not self.enabled or self._start is None:
+            return
+        wall, cpu = self._start
+        self.total = {"wallSeconds": time.perf_counter() - wall, "cpuSeconds": time.process_time() - cpu,
+                      "peakBytes": max_peak(*(s["peakBytes"] for s in self.stages.values()))}
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._start = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the enclosed block as (part of) stage 'name'. Stages must not nest."""
+        if not self.enabled:
+            yield
+            return
+        if self.memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, self._new_record())
+            record["wallSeconds"] += time.perf_counter() - wall
+            record["cpuSeconds"] += time.process_time() - cpu
+            record["calls"] += 1
+            if self.memory:
+                record["peakBytes"] = max(record["peakBytes"], tracemalloc.get_traced_memory()[1])
+
+    def iterate(self, name, iterable):
+        """Yields from 'iterable', timing each step as stage 'name' (for lazily parsed input)."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, key, amount=1):
+        if self.enabled:
+            self.counts[key] = self.counts.get(key, 0) + amount
+
+    def counter(self):
+        """The counts dict for code that tallies into a plain dict (None when disabled)."""
+        return self.counts if self.enabled else None
+
+    def count_composition(self, comp):
+        """Counts the layers, effects and keyframes of a translated composition."""
+        if not self.enabled:
+            return
+        layers = [layer for layer in comp.get("layers") or [] if isinstance(layer, dict)]
+        self.count("compositions")
+        self.count("layers", len(layers))
+        self.count("effects", sum(len(layer.get("effects") or []) for layer in layers))
+        self.count("keyframes", count_keyframes(layers))
+
+    def count_unknown(self, unknown):
+        for entry in unknown:
+            self.count("unknownEffects" if entry["property"] is None else "unknownProperties")
+
+    def to_dict(self):
+        return {"format": METRICS_FORMAT, "memory": self.memory, "stages": self.stages, "counts": self.counts,
+                "total": self.total}
+
+    def report(self):
+        print("Profile (per stage):")
+        print(f"  {'stage':<12} {'wall ms':>10} {'cpu ms':>10} {'peak MiB':>10} {'calls':>7}")
+        rows = list(self.stages.items())
+        if self.total:
+            rows.append(("total", dict(self.total, calls="")))
+        for name, s in rows:
+            peak = f"{s['peakBytes'] / 1048576:10.2f}" if s.get("peakBytes") is not None else f"{'-':>10}"
+            print(f"  {name:<12} {s['wallSeconds'] * 1000:10.1f} {s['cpuSeconds'] * 1000:10.1f} {peak} {s['calls']:>7}")
+        if self.counts:
+            print("Counts: " + ", ".join(f"{k} {v}" for k, v in self.counts.items()))
+
+    def write(self, path, **extra):
+        """Writes the metrics (plus 'extra' fields) as JSON, atomically."""
+        data = dict(extra, **self.to_dict())
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+
+
+DISABLED = TranslationMetrics(enabled=False)
@@ -0,0 +1,362 @@
+# watch_translate.py
+#
+# Description: Long-running translation daemon.
+# Keeps the effects manifest index, the image plan cache and the incremental
+# build cache warm, watches the .aigen files (and the assets they reference)
+# and rewrites the blueprint atomically shortly after every save. Change
+# notifications use inotify on Linux and fall back to mtime polling elsewhere.
+#
+# Editor plugins can drive the daemon without starting Python themselves by
+# sending one JSON request per line, either on stdin (--stdin) or on a local
+# TCP socket (--port). Every request gets one JSON response line:
+#
+#   {"id": 1, "cmd": "translate", "input": "a.aigen", "output": "a.json"}
+#   {"id": 1, "ok": true, "ms": 12.4, "summary": {...}}
+#
+# Commands: translate, watch, unwatch, status, ping, shutdown.
+#
+# Usage: python watch_translate.py [input.aigen output.json] [--stdin] [--port N] [--poll]
+#
+
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import io
+import json
+import os
+import select
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+import aigen_to_json_translator as translator
+
+DEBOUNCE_SECONDS = 0.02  # editors often write a file in several steps
+POLL_INTERVAL = 0.05
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Portable watcher: compares (mtime, size) of every watched file."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._stats = {}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def set_paths(self, paths):
+        self._stats = {path: self._stats.get(path, self._stat(path)) for path in paths}
+
+    def wait(self, timeout):
+        """Returns the set of watched paths that changed, waiting at most 'timeout' seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, previous in self._stats.items():
+                current = self._stat(path)
+                if current != previous:
+                    self._stats[path] = current
+                    changed.add(path)
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux watcher: watches the parent directories, so atomic saves (write + rename) are seen too."""
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # directory -> watch descriptor
+        self._wds = {}  # watch descriptor -> directory
+        self._paths = set()
+
+    def set_paths(self, paths):
+        self._paths = set(paths)
+        wanted = {os.path.dirname(path) for path in self._paths}
+        for directory in set(self._dirs) - wanted:
+            self._libc.inotify_rm_watch(self._fd, self._dirs[directory])
+            del self._wds[self._dirs.pop(directory)]
+        for directory in wanted - set(self._dirs):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                print(f"Warning: Cannot watch {directory}: {os.strerror(ctypes.get_errno())}", file=sys.stderr)
+                continue
+            self._dirs[directory] = wd
+            self._wds[wd] = directory
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            directory = self._wds.get(wd)
+            if directory is not None:
+                path = os.path.join(directory, name)
+                if path in self._paths:
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def create_watcher(poll=False):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError) as e:
+            print(f"Warning: inotify unavailable ({e}), polling instead.", file=sys.stderr)
+    return PollingWatcher()
+
+
+class TranslationDaemon:
+    def __init__(self, watcher, image_jobs=None):
+        self.watcher = watcher
+        self.options = translator.TranslationOptions(image_jobs=image_jobs, incremental=True)
+        self.targets = {}  # absolute input path -> output path
+        self.results = {}  # absolute input path -> last response
+        self.stopped = threading.Event()
+        self._lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._out = sys.stdout
+        self._err = sys.stderr
+        self.manifest_path = os.path.abspath(translator.MANIFEST_FILENAME)
+        self.index = self._load_index()
+
+    def log(self, message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", file=self._err, flush=True)
+
+    def _load_index(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return translator.load_effects_index()
+
+    def translate(self, input_path, output_path):
+        """Translates one file with the warm caches. Returns a protocol response dict."""
+        input_path = os.path.abspath(input_path)
+        with self._lock:
+            log = io.StringIO()
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                    summary = translator.translate_file(input_path, output_path, self.index, self.options)
+                response = {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 1), "summary": summary}
+                self.log(f"{os.path.basename(input_path)} -> {output_path}: {summary['retranslated']} "
+                         f"retranslated, {summary['reused']} reused in {response['ms']} ms")
+            except Exception as e:
+                response = {"ok": False, "ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+                self.log(f"{os.path.basename(input_path)}: {e}")
+            detail = False  # indented lines after a forwarded header (e.g. the unknown effects) go with it
+            for line in log.getvalue().splitlines():
+                if line.startswith(("Warning", "Error", "CRITICAL", "  [Auto-Fix Error]")):
+                    self.log("  " + line.strip())
+                    detail = not line.startswith(" ")
+                elif detail and line.startswith(" ") and not line.lstrip().startswith("["):
+                    self.log("  " + line.rstrip())
+                else:
+                    detail = False
+            self.results[input_path] = response
+            if input_path in self.targets:
+                self._dirty.set()  # the asset list may have changed
+            return response
+
+    def watch(self, input_path, output_path):
+        input_path = os.path.abspath(input_path)
+        with self._lock:
+            self.targets[input_path] = output_path
+        response = self.translate(input_path, output_path)
+        self._dirty.set()
+        return response
+
+    def unwatch(self, input_path):
+        with self._lock:
+            removed = self.targets.pop(os.path.abspath(input_path), None)
+        self._dirty.set()
+        return {"ok": removed is not None}
+
+    def watched_paths(self):
+        paths = {self.manifest_path}
+        for input_path in self.targets:
+            paths.add(input_path)
+            summary = self.results.get(input_path, {}).get("summary") or {}
+            paths.update(os.path.abspath(asset) for asset in summary.get("assets", []))
+        return paths
+
+    def handle(self, request):
+        """Dispatches one protocol request (a dict) and returns the response dict."""
+        cmd = request.get("cmd")
+        input_path = request.get("input")
+        output_path = request.get("output") or (input_path and os.path.splitext(input_path)[0] + ".json")
+        if cmd in ("translate", "watch", "unwatch") and not input_path:
+            response = {"ok": False, "error": f"'{cmd}' needs an 'input' path"}
+        elif cmd == "translate":
+            response = self.translate(input_path, output_path)
+        elif cmd == "watch":
+            response = self.watch(input_path, output_path)
+        elif cmd == "unwatch":
+            response = self.unwatch(input_path)
+        elif cmd == "status":
+            with self._lock:
+                response = {"ok": True, "targets": dict(self.targets), "results": dict(self.results)}
+        elif cmd == "ping":
+            response = {"ok": True}
+        elif cmd == "shutdown":
+            self.stopped.set()
+            response = {"ok": True}
+        else:
+            response = {"ok": False, "error": f"Unknown command: {cmd}"}
+        if "id" in request:
+            response = dict(response, id=request["id"])  # translate() keeps its response in self.results
+        return response
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": f"Bad request: {e}"})
+        return json.dumps(self.handle(request))
+
+    def serve_stdin(self):
+        for line in sys.stdin:
+            if line.strip():
+                self._out.write(self.handle_line(line) + "\n")
+                self._out.flush()
+            if self.stopped.is_set():
+                break
+        self.stopped.set()
+
+    def run(self):
+        """Watch loop: rebuilds every target whose input, assets or the manifest changed."""
+        while not self.stopped.is_set():
+            if self._dirty.is_set():
+                self._dirty.clear()
+                with self._lock:
+                    self.watcher.set_paths(self.watched_paths())
+            changed = self.watcher.wait(0.25)
+            if not changed:
+                continue
+            while True:
+                more = self.watcher.wait(DEBOUNCE_SECONDS)
+                if not more:
+                    break
+                changed |= more
+            with self._lock:
+                if self.manifest_path in changed:
+                    self.log("Effects manifest changed, reloading.")
+                    self.index = self._load_index()
+                    stale = list(self.targets)
+                else:
+                    stale = [input_path for input_path in self.targets
+                             if input_path in changed or changed & self._asset_paths(input_path)]
+                for input_path in stale:
+                    self.translate(input_path, self.targets[input_path])
+        self.watcher.close()
+
+    def _asset_paths(self, input_path):
+        summary = self.results.get(input_path, {}).get("summary") or {}
+        return {os.path.abspath(asset) for asset in summary.get("assets", [])}
+
+
+class _ProtocolHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode("utf-8").strip()
+            if line:
+                self.wfile.write((self.server.daemon_ref.handle_line(line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+
+class ProtocolServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, daemon):
+        super().__init__(("127.0.0.1", port), _ProtocolHandler)
+        self.daemon_ref = daemon
+
+
+def add_arguments(parser):
+    parser.add_argument("input", nargs="?", help="AIGEN file to watch")
+    parser.add_argument("output", nargs="?", help="Blueprint JSON to keep up to date (default: input with .json)")
+    parser.add_argument("--stdin", action="store_true", help="Accept JSON-line requests on stdin.")
+    parser.add_argument("--port", type=int, default=None, help="Accept JSON-line requests on 127.0.0.1:PORT.")
+    parser.add_argument("--poll", action="store_true", help="Use mtime polling instead of inotify.")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for image fixing.")
+
+
+def run(args, parser):
+    if not (args.input or args.stdin or args.port):
+        parser.error("give an input file to watch, --stdin or --port")
+
+    daemon = TranslationDaemon(create_watcher(args.poll), image_jobs=args.jobs)
+    daemon.log(f"Watching with {type(daemon.watcher).__name__}; manifest loaded.")
+    if args.input:
+        daemon.watch(args.input, args.output or os.path.splitext(args.input)[0] + ".json")
+    server = None
+    if args.port:
+        server = ProtocolServer(args.port, daemon)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        daemon.log(f"Listening on 127.0.0.1:{server.server_address[1]}")
+    if args.stdin:
+        threading.Thread(target=daemon.serve_stdin, daemon=True).start()
+
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    daemon.log("Stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch AIGEN files and re-translate them on every save.")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
+
+
+if __name__ == "__main__":
+    main()